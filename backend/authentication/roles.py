@@ -0,0 +1,101 @@
+"""
+Roles (grupos) de un usuario resueltos una vez por request.
+
+Los permisos de compras preguntan varias veces por request si el usuario es
+admin u operador. ``roles_de_request`` arma el conjunto de nombres de grupo
+una sola vez y lo deja en ``request.user``; las demás preguntas no consultan
+la base.
+
+Entre requests los roles se guardan en la caché con una versión por
+usuario. Cambiar los grupos del usuario (o renombrar o borrar un grupo) le
+asigna una versión nueva (ver ``authentication.signals``), así lo guardado
+con la anterior deja de usarse. El access token lleva ``roles`` y
+``roles_version``; si la versión sigue vigente se usan los del token sin ir
+a la base. La clave de versión usa ``time.time_ns()`` y no un contador para
+que, si la caché se vacía o la versión vence, ningún token ni entrada vieja
+coincida con la nueva versión. La versión vence a los ``ROLES_TIMEOUT``
+segundos, como los roles guardados con ella.
+
+Los claims del token solo se usan con una caché compartida (``REDIS_URL``):
+con la LocMem de cada proceso la versión nueva queda en el worker que
+atendió el cambio y los demás seguirían aceptando los roles del token. Sin
+caché compartida los roles se guardan apenas ``CACHE_LOCAL_SEGUNDOS`` (ver
+``core.caches``).
+"""
+
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+from core.caches import cache_compartida, duracion
+
+ROLES_TIMEOUT = 60 * 10
+
+
+def _clave_version(user_id):
+    return f"roles:version:{user_id}"
+
+
+def _clave_roles(user_id, version):
+    return f"roles:{user_id}:{version}"
+
+
+def version_roles(user_id):
+    """Versión vigente de los roles del usuario (la crea si no hay)"""
+    version = cache.get(_clave_version(user_id))
+    if version is None:
+        cache.add(_clave_version(user_id), time.time_ns(), duracion(ROLES_TIMEOUT))
+        version = cache.get(_clave_version(user_id))
+    return version
+
+
+def invalidar_roles(*user_ids):
+    """Da versión nueva a los roles de los usuarios al confirmar la transacción"""
+    def invalidar():
+        version = time.time_ns()
+        cache.set_many({_clave_version(user_id): version for user_id in user_ids}, duracion(ROLES_TIMEOUT))
+
+    if user_ids:
+        transaction.on_commit(invalidar)
+
+
+def roles_de_usuario(user, token=None):
+    """
+    ``frozenset`` con los nombres de grupo de ``user``. Usa, en orden, lo ya
+    resuelto en este request, los claims de ``token`` si su versión sigue
+    vigente y la caché es compartida, la caché y por último la base.
+    """
+    if user is None:
+        return frozenset()
+    roles = getattr(user, "_roles", None)
+    if roles is not None:
+        return roles
+
+    if not user.is_authenticated:
+        roles = frozenset()
+    else:
+        version = version_roles(user.pk)
+        claims = token.get("roles") if token is not None and cache_compartida() else None
+        if claims is not None and token.get("roles_version") == version:
+            roles = frozenset(claims)
+        else:
+            roles = cache.get(_clave_roles(user.pk, version))
+            if roles is None:
+                roles = frozenset(user.groups.values_list("name", flat=True))
+                cache.set(_clave_roles(user.pk, version), roles, duracion(ROLES_TIMEOUT))
+    user._roles = roles
+    return roles
+
+
+def roles_de_request(request):
+    """Roles del usuario del request, usando los claims del access token si los tiene"""
+    token = request.auth if hasattr(request.auth, "get") else None
+    return roles_de_usuario(request.user, token)
+
+
+def agregar_claims_de_roles(token, user):
+    """Agrega ``roles`` y ``roles_version`` al token de ``user``"""
+    token["roles"] = sorted(roles_de_usuario(user))
+    token["roles_version"] = version_roles(user.pk)
+    return token
@@ -1,8 +1,16 @@
+import logging
+
 from rest_framework import serializers
+from rest_framework_simplejwt.serializers import TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from django.contrib.auth import authenticate
 from django.contrib.auth.password_validation import validate_password
 from django.core.exceptions import ValidationError
 from .models import User, UserProfile
+from .tokens import agregar_claims
+
+logger = logging.getLogger(__name__)
 
 
 class UserRegistrationSerializer(serializers.ModelSerializer):
@@ -34,51 +42,38 @@ class UserRegistrationSerializer(serializers.ModelSerializer):
     
     def validate_email(self, value):
         """Validar que el email sea único"""
-        print(f"📧 REGISTRO SERIALIZER - Validando email: {value}")
         if User.objects.filter(email=value).exists():
-            print(f"❌ REGISTRO SERIALIZER - Email ya existe: {value}")
             raise serializers.ValidationError(
                 "Ya existe un usuario con este correo electrónico."
             )
-        print(f"✅ REGISTRO SERIALIZER - Email válido: {value}")
         return value
     
     def validate_username(self, value):
         """Validar que el username sea único"""
-        print(f"👤 REGISTRO SERIALIZER - Validando username: {value}")
         if User.objects.filter(username=value).exists():
-            print(f"❌ REGISTRO SERIALIZER - Username ya existe: {value}")
             raise serializers.ValidationError(
                 "Ya existe un usuario con este nombre de usuario."
             )
-        print(f"✅ REGISTRO SERIALIZER - Username válido: {value}")
         return value
     
     def validate(self, attrs):
         """Validar que las contraseñas coincidan"""
-        print(f"🔍 REGISTRO SERIALIZER - Validando datos completos: {list(attrs.keys())}")
         password = attrs.get('password')
         password_confirm = attrs.pop('password_confirm', None)
         
-        print(f"🔐 REGISTRO SERIALIZER - Comparando contraseñas...")
         if password != password_confirm:
-            print(f"❌ REGISTRO SERIALIZER - Contraseñas no coinciden")
             raise serializers.ValidationError({
                 'password_confirm': 'Las contraseñas no coinciden.'
             })
         
         # Validar la fortaleza de la contraseña
-        print(f"🔒 REGISTRO SERIALIZER - Validando fortaleza de contraseña...")
         try:
             validate_password(password)
-            print(f"✅ REGISTRO SERIALIZER - Contraseña válida")
         except ValidationError as e:
-            print(f"❌ REGISTRO SERIALIZER - Contraseña inválida: {e.messages}")
             raise serializers.ValidationError({
                 'password': list(e.messages)
             })
         
-        print(f"✅ REGISTRO SERIALIZER - Validación completa exitosa")
         return attrs
     
     def create(self, validated_data):
@@ -105,53 +100,43 @@ class UserLoginSerializer(serializers.Serializer):
         identifier = attrs.get('identifier')
         password = attrs.get('password')
         
-        print(f"🔍 SERIALIZER - Validando: identifier='{identifier}', password={'*' * len(password) if password else 'None'}")
-        
         if identifier and password:
             # Intentar autenticar con email
             user = None
             if '@' in identifier:
-                print(f"📧 SERIALIZER - Intentando autenticar con email: {identifier}")
                 # Como USERNAME_FIELD = 'email', usamos el email directamente
                 user = authenticate(
                     request=self.context.get('request'),
                     username=identifier,  # Django usará esto como email debido a USERNAME_FIELD
                     password=password
                 )
-                print(f"🔐 SERIALIZER - Resultado autenticación: {user is not None}")
             else:
-                print(f"👤 SERIALIZER - Intentando autenticar con username: {identifier}")
                 # Para username, necesitamos obtener el email del usuario
                 try:
                     user_obj = User.objects.get(username=identifier)
-                    print(f"✅ SERIALIZER - Usuario encontrado por username: {user_obj.email}")
                     user = authenticate(
                         request=self.context.get('request'),
                         username=user_obj.email,  # Usar email para autenticación
                         password=password
                     )
-                    print(f"🔐 SERIALIZER - Resultado autenticación: {user is not None}")
                 except User.DoesNotExist:
-                    print(f"❌ SERIALIZER - No existe usuario con username: {identifier}")
                     pass
             
             if not user:
-                print(f"❌ SERIALIZER - Autenticación falló para: {identifier}")
+                logger.info('login rechazado', extra={'identificador': identifier, 'motivo': 'credenciales'})
                 raise serializers.ValidationError(
                     'Credenciales inválidas. Verifica tu email/usuario y contraseña.'
                 )
             
             if not user.is_active:
-                print(f"❌ SERIALIZER - Usuario inactivo: {identifier}")
+                logger.info('login rechazado', extra={'identificador': identifier, 'motivo': 'inactivo'})
                 raise serializers.ValidationError(
                     'Esta cuenta ha sido desactivada.'
                 )
             
-            print(f"✅ SERIALIZER - Validación exitosa para usuario: {user.username}")
             attrs['user'] = user
             return attrs
         else:
-            print(f"❌ SERIALIZER - Faltan credenciales: identifier={identifier}, password={bool(password)}")
             raise serializers.ValidationError(
                 'Debes proporcionar email/usuario y contraseña.'
             )
@@ -249,4 +234,20 @@ class ChangePasswordSerializer(serializers.Serializer):
         user = self.context['request'].user
         user.set_password(self.validated_data['new_password'])
         user.save()
-        return user
\ No newline at end of file
+        return user
+
+
+class TokenRefreshConClaimsSerializer(TokenRefreshSerializer):
+    """
+    Refresh que vuelve a armar los claims desde la base: sin esto el access
+    nuevo copia los del refresh, que pueden tener días (staff, roles, empresa)
+    """
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data['access'])
+        user = User.objects.get(pk=access[api_settings.USER_ID_CLAIM])
+        data['access'] = str(agregar_claims(access, user))
+        if 'refresh' in data:
+            data['refresh'] = str(agregar_claims(RefreshToken(data['refresh']), user))
+        return data
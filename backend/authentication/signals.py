@@ -0,0 +1,55 @@
+from django.contrib.auth.models import Group
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete, pre_save
+from django.dispatch import receiver
+
+from .models import User
+from .roles import invalidar_roles
+from .tokens import revocar_usuario
+
+
+@receiver(m2m_changed, sender=User.groups.through)
+def invalidar_roles_por_grupos(sender, instance, action, reverse, pk_set, **kwargs):
+    """Cambió la membresía: ``user.groups.add(...)`` o ``group.user_set.add(...)``"""
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            invalidar_roles(instance.pk)
+    elif action == "pre_clear":
+        # Después del clear ya no se sabe qué usuarios tenía el grupo
+        invalidar_roles(*instance.user_set.values_list("pk", flat=True))
+    elif action in ("post_add", "post_remove"):
+        invalidar_roles(*pk_set)
+
+
+@receiver(post_save, sender=Group)
+@receiver(pre_delete, sender=Group)
+def invalidar_roles_del_grupo(sender, instance, created=False, **kwargs):
+    """Renombrar o borrar un grupo cambia los roles de todos sus usuarios"""
+    if not created:
+        invalidar_roles(*instance.user_set.values_list("pk", flat=True))
+
+
+# Los tokens no se validan contra la base: desactivar o borrar un usuario, o
+# cambiarle staff o superusuario, tiene que revocar los que ya tiene
+# (authentication.tokens)
+PRIVILEGIOS = ("is_staff", "is_superuser")
+
+
+@receiver(pre_save, sender=User)
+def recordar_privilegios(sender, instance, update_fields=None, **kwargs):
+    if instance.pk is None or (update_fields is not None and not set(PRIVILEGIOS) & set(update_fields)):
+        instance._privilegios_anteriores = None
+        return
+    instance._privilegios_anteriores = User.objects.filter(pk=instance.pk).values_list(*PRIVILEGIOS).first()
+
+
+@receiver(post_save, sender=User)
+def revocar_tokens_de_usuario(sender, instance, **kwargs):
+    anteriores = getattr(instance, "_privilegios_anteriores", None)
+    privilegios = tuple(getattr(instance, campo) for campo in PRIVILEGIOS)
+    if not instance.is_active or (anteriores is not None and anteriores != privilegios):
+        revocar_usuario(instance.pk)
+
+
+@receiver(post_delete, sender=User)
+def revocar_tokens_de_usuario_borrado(sender, instance, **kwargs):
+    revocar_usuario(instance.pk)
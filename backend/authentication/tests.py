@@ -1,3 +1,230 @@
-from django.test import TestCase
+import io
+import json
+import logging
+from types import SimpleNamespace
 
-# Create your tests here.
+from django.contrib.auth.models import Group
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
+
+from core.logs import ColaHandler, ContextoFilter, MuestreoFilter, ocultar_sensibles
+from compras.permissions import ComprasBasePermission, OrdenCompraPermission
+from .models import User, UserProfile
+from .roles import _clave_roles, roles_de_usuario
+from .tokens import StatelessJWTAuthentication
+from .views import CustomTokenObtainPairSerializer
+
+
+class RolesCacheadosTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.admin = Group.objects.create(name='Compras Admin')
+        self.operador = Group.objects.create(name='Compras Operador')
+        self.usuario = User.objects.create_user(
+            username='operador', email='operador@example.com', password='secreta123'
+        )
+        self.usuario.groups.add(self.operador)
+
+    def token(self):
+        return CustomTokenObtainPairSerializer.get_token(self.usuario).access_token
+
+    def roles(self, token=None):
+        # Un objeto nuevo, como en cada request
+        return roles_de_usuario(User.objects.get(pk=self.usuario.pk), token)
+
+    @override_settings(CACHE_COMPARTIDA=True)
+    def test_permisos_con_el_token_no_consultan_la_base(self):
+        token = self.token()
+        self.assertEqual(token['roles'], ['Compras Operador'])
+        request = SimpleNamespace(user=User.objects.get(pk=self.usuario.pk), auth=token, method='PUT')
+        vista = SimpleNamespace(action='update')
+
+        with self.assertNumQueries(0):
+            self.assertTrue(ComprasBasePermission().has_permission(request, vista))
+            permiso = OrdenCompraPermission()
+            self.assertTrue(permiso.has_object_permission(request, vista, SimpleNamespace(estado='borrador')))
+            self.assertFalse(permiso.has_object_permission(request, vista, SimpleNamespace(estado='enviada')))
+            vista.action = 'destroy'
+            self.assertFalse(permiso.has_permission(request, vista))
+
+    def test_claims_solo_con_cache_compartida(self):
+        token = self.token()
+        # Roles guardados por otro worker: acá solo está la versión
+        cache.delete(_clave_roles(self.usuario.pk, token['roles_version']))
+        with self.settings(CACHE_COMPARTIDA=True), self.assertNumQueries(1):
+            self.assertEqual(self.roles(token), {'Compras Operador'})
+        with self.settings(CACHE_COMPARTIDA=False), self.assertNumQueries(2):
+            self.assertEqual(self.roles(token), {'Compras Operador'})
+
+    def test_todos_los_emisores_agregan_los_claims(self):
+        self.usuario.set_password('secreta123')
+        self.usuario.save()
+        emitidos = [
+            APIClient().post('/api/auth/login/', {'identifier': 'operador', 'password': 'secreta123'}),
+            APIClient().post('/api/auth/register/', {
+                'username': 'nuevo', 'email': 'nuevo@example.com', 'first_name': 'Nora', 'last_name': 'Nueva',
+                'password': 'Clave-Segura-42', 'password_confirm': 'Clave-Segura-42',
+            }),
+            APIClient().post('/api/auth/demo-login/', {'demo_type': 'retail'}),
+        ]
+        for respuesta in emitidos:
+            self.assertIn(respuesta.status_code, (200, 201), respuesta.content)
+            token = AccessToken(respuesta.json()['tokens']['access'])
+            self.assertIn('roles_version', token)
+            self.assertEqual(token['username'], respuesta.json()['user']['username'])
+        self.assertEqual(AccessToken(emitidos[0].json()['tokens']['access'])['roles'], ['Compras Operador'])
+
+    def test_sin_token_se_cachean_entre_requests(self):
+        primero, segundo = User.objects.get(pk=self.usuario.pk), User.objects.get(pk=self.usuario.pk)
+        with self.assertNumQueries(1):
+            self.assertEqual(roles_de_usuario(primero), {'Compras Operador'})
+            roles_de_usuario(primero)
+        with self.assertNumQueries(0):
+            self.assertEqual(roles_de_usuario(segundo), {'Compras Operador'})
+
+    def test_cambios_de_grupos_invalidan_token_y_cache(self):
+        token = self.token()
+        self.roles()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.usuario.groups.add(self.admin)
+        self.assertEqual(self.roles(token), {'Compras Admin', 'Compras Operador'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.operador.user_set.remove(self.usuario)
+        self.assertEqual(self.roles(), {'Compras Admin'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.name = 'Compras Supervisor'
+            self.admin.save()
+        self.assertEqual(self.roles(), {'Compras Supervisor'})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.admin.user_set.clear()
+        self.assertEqual(self.roles(), set())
+
+
+class StatelessJWTTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.usuario = User.objects.create_user(
+            username='tablero', email='tablero@example.com', password='secreta123', company_name='Lácteos Sur'
+        )
+
+    def cliente(self, usuario=None):
+        token = CustomTokenObtainPairSerializer.get_token(usuario or self.usuario).access_token
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {token}')
+        return api
+
+    def test_request_autenticado_sin_leer_el_usuario(self):
+        api = self.cliente()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = api.get('/api/finanzas/flujo/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertFalse([q for q in consultas if 'authentication_user' in q['sql']])
+
+    def test_el_usuario_se_carga_solo_si_hace_falta(self):
+        token = CustomTokenObtainPairSerializer.get_token(self.usuario).access_token
+        usuario = StatelessJWTAuthentication().get_user(token)
+        with self.assertNumQueries(0):
+            self.assertEqual(usuario.pk, self.usuario.pk)
+            self.assertEqual((usuario.username, usuario.company_name), ('tablero', 'Lácteos Sur'))
+            self.assertFalse(usuario.is_superuser)
+            self.assertTrue(usuario and usuario.is_authenticated)
+            self.assertEqual(roles_de_usuario(usuario, token), set())
+        with self.assertNumQueries(1):
+            self.assertIsInstance(usuario, User)
+            self.assertEqual(usuario.date_joined, self.usuario.date_joined)
+        self.assertEqual(UserProfile(user=usuario).user_id, self.usuario.pk)
+
+    def test_logout_y_desactivacion_revocan_el_token(self):
+        api = self.cliente()
+        self.assertEqual(api.post('/api/auth/logout/').status_code, 200)
+        self.assertEqual(api.get('/api/finanzas/flujo/').status_code, 401)
+        self.assertEqual(self.cliente().get('/api/finanzas/flujo/').status_code, 200)
+
+        otro = User.objects.create_user(username='chofer', email='chofer@example.com', password='secreta123')
+        api = self.cliente(otro)
+        otro.is_active = False
+        otro.save()
+        self.assertEqual(api.get('/api/finanzas/flujo/').status_code, 401)
+
+
+    def test_cambio_de_privilegios_revoca_y_el_refresh_trae_los_claims(self):
+        refresh = APIClient().post(
+            '/api/auth/login/', {'identifier': 'tablero', 'password': 'secreta123'}
+        ).json()['tokens']['refresh']
+        api = self.cliente()
+        self.usuario.last_login = None
+        self.usuario.save(update_fields=['last_login'])
+        self.assertEqual(api.get('/api/finanzas/flujo/').status_code, 200)
+
+        self.usuario.is_staff = True
+        self.usuario.save()
+        self.assertEqual(api.get('/api/finanzas/flujo/').status_code, 401)
+
+        respuesta = APIClient().post('/api/auth/token/refresh/', {'refresh': refresh})
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertTrue(AccessToken(respuesta.json()['access'])['is_staff'])
+        self.assertTrue(RefreshToken(respuesta.json()['refresh'])['is_staff'])
+
+
+class LogsEstructuradosTests(TestCase):
+    def setUp(self):
+        self.salida = io.StringIO()
+        self.handler = ColaHandler(self.salida)
+        self.handler.addFilter(ContextoFilter())
+        self.handler.addFilter(MuestreoFilter())
+        self.logger = logging.getLogger('authentication')
+        nivel, propaga = self.logger.level, self.logger.propagate
+        self.logger.addHandler(self.handler)
+        self.logger.setLevel(logging.INFO)
+        self.logger.propagate = False
+
+        def restaurar():
+            self.logger.removeHandler(self.handler)
+            self.logger.setLevel(nivel)
+            self.logger.propagate = propaga
+            self.handler.close()
+        self.addCleanup(restaurar)
+
+    def lineas(self):
+        # Cerrar vacía la cola del hilo que escribe
+        self.handler.close()
+        return [json.loads(linea) for linea in self.salida.getvalue().splitlines()]
+
+    def test_login_se_registra_sin_la_contrasena(self):
+        User.objects.create_user(username='vendedor', email='vendedor@example.com', password='secreta123')
+        respuesta = APIClient().post(
+            '/api/auth/login/', {'identifier': 'vendedor', 'password': 'equivocada'}, HTTP_X_REQUEST_ID='ruta-7'
+        )
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(respuesta['X-Request-ID'], 'ruta-7')
+        self.assertEqual(APIClient().post(
+            '/api/auth/login/', {'identifier': 'vendedor', 'password': 'secreta123'}
+        ).status_code, 200)
+
+        rechazo, ingreso = self.lineas()
+        self.assertEqual(
+            (rechazo['mensaje'], rechazo['motivo'], rechazo['request_id']), ('login rechazado', 'credenciales', 'ruta-7')
+        )
+        self.assertEqual(ingreso['mensaje'], 'login')
+        self.assertNotIn('equivocada', self.salida.getvalue())
+        self.assertNotIn('secreta123', self.salida.getvalue())
+
+    def test_ocultar_y_muestrear(self):
+        self.assertEqual(
+            ocultar_sensibles({'password': 'x', 'lote': [{'refresh_token': 'y', 'cliente': 3}]}),
+            {'password': '***', 'lote': [{'refresh_token': '***', 'cliente': 3}]},
+        )
+        self.logger.info('poll', extra={'muestreo': 0})
+        self.logger.info('poll', extra={'muestreo': 1})
+        self.logger.warning('lento', extra={'muestreo': 0, 'token': 'abc'})
+        self.assertEqual(
+            [(linea['mensaje'], linea.get('token')) for linea in self.lineas()], [('poll', None), ('lento', '***')]
+        )
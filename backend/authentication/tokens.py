@@ -0,0 +1,155 @@
+"""
+Autenticación JWT sin consultar la base en cada request.
+
+``JWTAuthentication`` de simplejwt lee el ``User`` en cada llamada aunque la
+vista solo mire el id o los permisos. ``StatelessJWTAuthentication`` devuelve
+un ``UsuarioDelToken`` armado con los claims que agrega ``agregar_claims``
+(id, usuario, email, empresa, staff, superusuario y roles). Todo lo que emite
+tokens (el par de simplejwt, el login, el registro y el login demo) los arma
+con ``tokens_para``, y ``TokenRefreshConClaimsSerializer`` los vuelve a leer
+de la base en cada refresh. Cualquier otro atributo, guardarlo en una FK o
+compararlo con ``isinstance`` carga el ``User`` completo la primera vez, como
+el ``request.user`` perezoso de Django.
+
+Como no se lee el usuario, la revocación se controla con una lista de
+denegación en la caché: los access tokens cerrados con logout (por ``jti``) y
+los usuarios desactivados, borrados o con cambios de staff o superusuario
+(todo token emitido hasta ese momento; el refresh trae los claims nuevos).
+Las entradas vencen junto con el último token al que pueden aplicar. Con la
+caché por defecto (LocMem) la lista es de cada proceso; con una caché
+compartida (Redis, Memcached) vale para todos.
+"""
+
+import copy
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils.functional import SimpleLazyObject, empty
+from django.utils.translation import gettext_lazy as _
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+from .roles import agregar_claims_de_roles
+
+
+def agregar_claims(token, user):
+    """Agrega a ``token`` los datos del usuario que se leen sin ir a la base"""
+    token['user_id'] = user.id
+    token['email'] = user.email
+    token['username'] = user.username
+    token['full_name'] = user.get_full_name()
+    token['company_name'] = user.company_name
+    token['is_staff'] = user.is_staff
+    token['is_superuser'] = user.is_superuser
+    # Roles para los permisos sin consultar la base (authentication.roles)
+    agregar_claims_de_roles(token, user)
+    return token
+
+
+def tokens_para(user):
+    """``RefreshToken`` con los claims de ``agregar_claims``; ``.access_token`` los copia"""
+    return agregar_claims(RefreshToken.for_user(user), user)
+
+
+def _clave_token(jti):
+    return f"jwt:denegado:{jti}"
+
+
+def _clave_usuario(user_id):
+    return f"jwt:revocado:{user_id}"
+
+
+def revocar_token(token):
+    """Deniega un access token hasta su vencimiento (logout)"""
+    restante = int(token["exp"] - time.time())
+    if restante > 0:
+        cache.set(_clave_token(token[api_settings.JTI_CLAIM]), True, restante)
+
+
+def revocar_usuario(user_id):
+    """Deniega todos los tokens emitidos hasta ahora para el usuario"""
+    cache.set(
+        _clave_usuario(user_id), int(time.time()), int(api_settings.ACCESS_TOKEN_LIFETIME.total_seconds())
+    )
+
+
+def esta_revocado(token):
+    """Una sola lectura de la caché por request"""
+    clave_token = _clave_token(token.get(api_settings.JTI_CLAIM))
+    clave_usuario = _clave_usuario(token[api_settings.USER_ID_CLAIM])
+    denegados = cache.get_many([clave_token, clave_usuario])
+    if clave_token in denegados:
+        return True
+    revocado_en = denegados.get(clave_usuario)
+    return revocado_en is not None and token.get("iat", 0) <= revocado_en
+
+
+def _claim(nombre):
+    """Atributo leído del token; si el token no lo trae se carga el usuario"""
+    def leer(self):
+        token = self.__dict__["token"]
+        if nombre in token:
+            return token[nombre]
+        if self._wrapped is empty:
+            self._setup()
+        return getattr(self._wrapped, nombre)
+    return property(leer)
+
+
+class UsuarioDelToken(SimpleLazyObject):
+    """``request.user`` hecho con los claims del token; el ``User`` se carga al usarlo"""
+
+    username = _claim("username")
+    email = _claim("email")
+    company_name = _claim("company_name")
+    is_staff = _claim("is_staff")
+    is_superuser = _claim("is_superuser")
+    is_active = True
+    is_authenticated = True
+    is_anonymous = False
+
+    def __init__(self, token):
+        User = get_user_model()
+        user_id = User._meta.pk.to_python(token[api_settings.USER_ID_CLAIM])
+        self.__dict__["token"] = token
+        self.__dict__["pk"] = self.__dict__["id"] = user_id
+        super().__init__(lambda: User.objects.get(pk=user_id))
+
+    def __bool__(self):
+        return True
+
+    # Roles ya resueltos en el request (authentication.roles): se guardan
+    # en el token perezoso para no cargar el usuario
+    @property
+    def _roles(self):
+        return self.__dict__.get("roles")
+
+    def __setattr__(self, nombre, valor):
+        if nombre == "_roles":
+            self.__dict__["roles"] = valor
+        else:
+            super().__setattr__(nombre, valor)
+
+    def __copy__(self):
+        if self._wrapped is empty:
+            self._setup()
+        return copy.copy(self._wrapped)
+
+    def __deepcopy__(self, memo):
+        if self._wrapped is empty:
+            self._setup()
+        return copy.deepcopy(self._wrapped, memo)
+
+
+class StatelessJWTAuthentication(JWTAuthentication):
+    """``JWTAuthentication`` que no lee el usuario de la base (ver el módulo)"""
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token:
+            raise InvalidToken(_("Token contained no recognizable user identification"))
+        if esta_revocado(validated_token):
+            raise AuthenticationFailed(_("Token revocado"), code="token_revoked")
+        return UsuarioDelToken(validated_token)
@@ -1,3 +1,5 @@
+import logging
+
 from rest_framework import status, generics, permissions
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.response import Response
@@ -11,6 +13,7 @@ from django.views.decorators.csrf import csrf_exempt
 from django.utils.decorators import method_decorator
 
 from .models import User, UserProfile
+from .tokens import agregar_claims, revocar_token, tokens_para
 from .serializers import (
     UserRegistrationSerializer,
     UserLoginSerializer,
@@ -20,6 +23,8 @@ from .serializers import (
     ChangePasswordSerializer
 )
 
+logger = logging.getLogger(__name__)
+
 
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
@@ -27,16 +32,7 @@ class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     """
     @classmethod
     def get_token(cls, user):
-        token = super().get_token(user)
-        
-        # Agregar información personalizada al token
-        token['user_id'] = user.id
-        token['email'] = user.email
-        token['username'] = user.username
-        token['full_name'] = user.get_full_name()
-        token['company_name'] = user.company_name
-        
-        return token
+        return agregar_claims(super().get_token(user), user)
 
 
 class CustomTokenObtainPairView(TokenObtainPairView):
@@ -54,21 +50,17 @@ class UserRegistrationView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
-        print(f"📝 REGISTRO - Datos recibidos: {request.data}")
         serializer = UserRegistrationSerializer(data=request.data)
         
-        print(f"🔍 REGISTRO - Validando serializer...")
         if serializer.is_valid():
-            print(f"✅ REGISTRO - Serializer válido, creando usuario...")
             try:
                 with transaction.atomic():
                     user = serializer.save()
-                    print(f"👤 REGISTRO - Usuario creado: {user.username} ({user.email})")
+                    logger.info('registro', extra={'usuario': user.pk})
                     
                     # Generar tokens JWT
-                    refresh = RefreshToken.for_user(user)
+                    refresh = tokens_para(user)
                     access_token = refresh.access_token
-                    print(f"🔑 REGISTRO - Tokens generados exitosamente")
                     
                     # Serializar datos del usuario
                     user_serializer = UserSerializer(user)
@@ -83,13 +75,13 @@ class UserRegistrationView(APIView):
                     }, status=status.HTTP_201_CREATED)
                     
             except Exception as e:
-                print(f"💥 REGISTRO - Error en transacción: {str(e)}")
+                logger.exception('registro fallido')
                 return Response({
                     'error': 'Error al crear el usuario',
                     'details': str(e)
                 }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
         
-        print(f"❌ REGISTRO - Errores de validación: {serializer.errors}")
+        logger.info('registro rechazado', extra={'campos': sorted(serializer.errors)})
         return Response({
             'error': 'Datos inválidos',
             'details': serializer.errors
@@ -104,20 +96,16 @@ class UserLoginView(APIView):
     permission_classes = [permissions.AllowAny]
     
     def post(self, request):
-        print(f"🔐 LOGIN - Datos recibidos: {request.data}")
-        
         serializer = UserLoginSerializer(
             data=request.data,
             context={'request': request}
         )
         
         if serializer.is_valid():
-            print("✅ LOGIN - Serializer válido")
             user = serializer.validated_data['user']
-            print(f"✅ LOGIN - Usuario encontrado: {user.username} ({user.email})")
             
             # Generar tokens JWT
-            refresh = RefreshToken.for_user(user)
+            refresh = tokens_para(user)
             access_token = refresh.access_token
             
             # Actualizar último login
@@ -126,7 +114,7 @@ class UserLoginView(APIView):
             # Serializar datos del usuario
             user_serializer = UserSerializer(user)
             
-            print("✅ LOGIN - Login exitoso, enviando respuesta")
+            logger.info('login', extra={'usuario': user.pk})
             return Response({
                 'message': 'Login exitoso',
                 'user': user_serializer.data,
@@ -136,7 +124,6 @@ class UserLoginView(APIView):
                 }
             }, status=status.HTTP_200_OK)
         
-        print(f"❌ LOGIN - Errores de validación: {serializer.errors}")
         return Response({
             'error': 'Credenciales inválidas',
             'details': serializer.errors
@@ -151,6 +138,9 @@ class UserLogoutView(APIView):
     
     def post(self, request):
         try:
+            # El access token deja de valer ya, no al vencer
+            if hasattr(request.auth, 'payload'):
+                revocar_token(request.auth)
             refresh_token = request.data.get('refresh_token')
             if refresh_token:
                 token = RefreshToken(refresh_token)
@@ -315,7 +305,7 @@ def demo_login(request):
             UserProfile.objects.create(user=user)
         
         # Generar tokens JWT
-        refresh = RefreshToken.for_user(user)
+        refresh = tokens_para(user)
         access_token = refresh.access_token
         
         # Serializar datos del usuario
@@ -5,4 +5,10 @@ set -o errexit
 pip install -r requirements.txt
 
 python manage.py collectstatic --no-input
-python manage.py migrate
\ No newline at end of file
+python manage.py migrate
+
+# Totales denormalizados (idempotente: solo corrige diferencias)
+python manage.py reconstruir_resumen_compras
+python manage.py reconstruir_estadisticas_precios
+python manage.py reconciliar_saldos_clientes
+python manage.py reconstruir_flujo_diario
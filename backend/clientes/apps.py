@@ -4,3 +4,11 @@ from django.apps import AppConfig
 class ClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clientes'
+
+    def ready(self):
+        from django.db.models.signals import post_migrate
+
+        import clientes.signals
+        from .busqueda import actualizar_indice_busqueda
+
+        post_migrate.connect(actualizar_indice_busqueda, sender=self)
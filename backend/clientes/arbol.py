@@ -0,0 +1,70 @@
+"""
+TreeView de clientes agrupado por inicial del nombre.
+
+``tree/`` devuelve solo las letras con su cantidad de clientes (un único
+``GROUP BY`` sobre el índice de la inicial) y ``tree/<letra>/`` los clientes
+de una letra, paginados por cursor sobre ``(nombre, id)``. Los conteos sin
+filtros se guardan en la caché y se invalidan al crear, renombrar o eliminar
+clientes (ver ``clientes.signals``).
+
+La invalidación solo llega a todos los workers con una caché compartida
+(``REDIS_URL``). Con la LocMem por defecto cada proceso guarda sus conteos y
+no se entera de lo que borró otro, así que se guardan apenas
+``CACHE_LOCAL_SEGUNDOS`` (ver ``core.caches``): es lo que pueden tardar en
+reflejar un cliente nuevo.
+"""
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Count
+
+from core.caches import duracion
+from core.paginacion import PaginacionCursor
+
+from .models import Inicial
+
+CLAVE_CONTEOS = 'clientes:arbol:conteos'
+DURACION_CONTEOS = 60 * 10
+SIN_INICIAL = '#'
+
+# Debe coincidir con la expresión del índice ``cliente_inicial_nombre_idx``
+INICIAL = Inicial('nombre')
+
+
+def conteos_por_inicial(queryset):
+    """``[{'label': 'A', 'total': 12}, ...]`` ordenado por letra"""
+    filas = (
+        queryset.order_by()
+        .annotate(inicial=INICIAL)
+        .values('inicial')
+        .annotate(total=Count('id'))
+        .order_by('inicial')
+    )
+    return [{'label': fila['inicial'] or SIN_INICIAL, 'total': fila['total']} for fila in filas]
+
+
+def conteos_en_cache(queryset):
+    conteos = cache.get(CLAVE_CONTEOS)
+    if conteos is None:
+        conteos = conteos_por_inicial(queryset)
+        cache.set(CLAVE_CONTEOS, conteos, duracion(DURACION_CONTEOS))
+    return conteos
+
+
+def invalidar_conteos():
+    """Descarta los conteos cuando la transacción actual confirma"""
+    transaction.on_commit(lambda: cache.delete(CLAVE_CONTEOS))
+
+
+def clientes_de_inicial(queryset, letra):
+    inicial = '' if letra == SIN_INICIAL else letra
+    return queryset.annotate(inicial=INICIAL).filter(inicial=inicial)
+
+
+class PaginacionArbol(PaginacionCursor):
+    """Cursor por nombre (desempata por id) sin importar el ``ordering`` pedido"""
+    ordering = ('nombre', 'id')
+    page_size = 50
+
+    def get_ordering(self, request, queryset, view):
+        return self.ordering
@@ -0,0 +1,160 @@
+"""
+Búsqueda indexada de clientes.
+
+Cada cliente guarda en ``Cliente.busqueda`` el texto normalizado (minúsculas,
+sin acentos) de nombre, identificación, teléfono, correo y zona. Sobre esa
+columna:
+
+* en PostgreSQL se usan índices GIN de trigramas y de texto completo
+  (``to_tsvector('simple', ...)``) y el orden combina ``ts_rank`` con la
+  similitud de trigramas;
+* en SQLite se usa la tabla FTS5 ``clientes_cliente_fts`` (contenido externo,
+  sincronizada por triggers, con índices de prefijos de 2 a 4 letras)
+  ordenada por ``bm25``.
+
+Los términos se normalizan igual que la columna, de modo que "Peña" encuentra
+"pena" y viceversa, y cada palabra se busca como prefijo.
+"""
+
+import re
+import unicodedata
+
+from django.db import connections
+from django.db.models import Q
+from rest_framework.filters import BaseFilterBackend
+
+TABLA_FTS = 'clientes_cliente_fts'
+CAMPOS = ('nombre', 'identificacion', 'telefono', 'correo', 'zona')
+
+
+def normalizar(texto):
+    """Minúsculas y sin diacríticos: "Lácteos Peña" -> "lacteos pena" """
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def texto_busqueda(cliente):
+    """Texto indexado de un cliente (también sirve con modelos históricos)"""
+    partes = [normalizar(getattr(cliente, campo, '')) for campo in CAMPOS]
+    # Identificación y teléfono también sin separadores: "20-123" se encuentra como "20123"
+    for campo in ('identificacion', 'telefono'):
+        digitos = re.sub(r'\D', '', getattr(cliente, campo, '') or '')
+        if digitos and digitos != getattr(cliente, campo):
+            partes.append(digitos)
+    return ' '.join(parte for parte in partes if parte)
+
+
+def terminos(texto):
+    return re.findall(r'\w+', normalizar(texto))
+
+
+def buscar_clientes(queryset, texto):
+    """Filtra ``queryset`` por ``texto`` y lo ordena por relevancia"""
+    palabras = terminos(texto)
+    if not palabras:
+        return queryset
+    if connections[queryset.db].vendor == 'postgresql':
+        return _buscar_postgresql(queryset, palabras)
+    if connections[queryset.db].vendor == 'sqlite':
+        return _buscar_sqlite(queryset, palabras)
+
+    filtro = Q()
+    for palabra in palabras:
+        filtro &= Q(busqueda__contains=palabra)
+    return queryset.filter(filtro)
+
+
+def _buscar_postgresql(queryset, palabras):
+    from django.contrib.postgres.search import (
+        SearchQuery, SearchRank, SearchVector, TrigramWordSimilarity,
+    )
+
+    texto = ' '.join(palabras)
+    vector = SearchVector('busqueda', config='simple')
+    consulta = SearchQuery(' & '.join(f'{palabra}:*' for palabra in palabras), search_type='raw', config='simple')
+    return queryset.annotate(
+        documento=vector,
+        rango=SearchRank(vector, consulta) + TrigramWordSimilarity(texto, 'busqueda'),
+    ).filter(
+        Q(documento=consulta) | Q(busqueda__trigram_word_similar=texto)
+    ).order_by('-rango', 'nombre', 'id')
+
+
+def _buscar_sqlite(queryset, palabras):
+    consulta = ' '.join(f'"{palabra}"*' for palabra in palabras)
+    # extra() es la única forma de cruzar con la tabla virtual: el MATCH
+    # recorre el índice FTS5 y cada fila se une a clientes_cliente por rowid.
+    return queryset.extra(
+        tables=[TABLA_FTS],
+        where=[f'{TABLA_FTS}.rowid = clientes_cliente.id', f'{TABLA_FTS} MATCH %s'],
+        params=[consulta],
+        select={'rango': f'{TABLA_FTS}.rank'},
+    ).order_by('rango', 'nombre')
+
+
+class BusquedaClienteFilter(BaseFilterBackend):
+    """
+    Reemplaza a ``SearchFilter`` para clientes (mismo parámetro ``search``).
+    Debe ir después de ``OrderingFilter``: si no se pidió ``ordering`` los
+    resultados quedan ordenados por relevancia.
+    """
+    search_param = 'search'
+
+    def filter_queryset(self, request, queryset, view):
+        texto = request.query_params.get(self.search_param, '')
+        if not texto.strip():
+            return queryset
+        ordering = queryset.query.order_by
+        resultado = buscar_clientes(queryset, texto)
+        if request.query_params.get('ordering'):
+            resultado = resultado.order_by(*ordering)
+        return resultado
+
+
+def asegurar_indice_sqlite(using='default'):
+    """
+    Crea (si falta) la tabla FTS5 y sus triggers y la reconstruye cuando hubo
+    que crear algo. Se ejecuta en ``post_migrate`` porque en SQLite las
+    migraciones que rehacen ``clientes_cliente`` descartan los triggers.
+    """
+    conexion = connections[using]
+    if conexion.vendor != 'sqlite':
+        return
+    with conexion.cursor() as cursor:
+        if 'clientes_cliente' not in conexion.introspection.table_names(cursor):
+            return
+        columnas = {columna.name for columna in conexion.introspection.get_table_description(cursor, 'clientes_cliente')}
+        if 'busqueda' not in columnas:
+            return  # Migraciones de clientes todavía sin aplicar
+
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE name IN (%s, %s, %s, %s)",
+            [TABLA_FTS, f'{TABLA_FTS}_ai', f'{TABLA_FTS}_ad', f'{TABLA_FTS}_au']
+        )
+        if cursor.fetchone()[0] == 4:
+            return
+
+        cursor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_FTS} USING fts5("
+            f"busqueda, content='clientes_cliente', content_rowid='id', "
+            f"tokenize='unicode61 remove_diacritics 2', prefix='2 3 4')"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ai AFTER INSERT ON clientes_cliente BEGIN "
+            f"INSERT INTO {TABLA_FTS}(rowid, busqueda) VALUES (new.id, new.busqueda); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_ad AFTER DELETE ON clientes_cliente BEGIN "
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, busqueda) VALUES ('delete', old.id, old.busqueda); END"
+        )
+        cursor.execute(
+            f"CREATE TRIGGER IF NOT EXISTS {TABLA_FTS}_au AFTER UPDATE OF busqueda ON clientes_cliente BEGIN "
+            f"INSERT INTO {TABLA_FTS}({TABLA_FTS}, rowid, busqueda) VALUES ('delete', old.id, old.busqueda); "
+            f"INSERT INTO {TABLA_FTS}(rowid, busqueda) VALUES (new.id, new.busqueda); END"
+        )
+        cursor.execute(f"INSERT INTO {TABLA_FTS}({TABLA_FTS}) VALUES ('rebuild')")
+
+
+def actualizar_indice_busqueda(sender, using='default', **kwargs):
+    """Receptor de ``post_migrate`` de la app clientes"""
+    asegurar_indice_sqlite(using)
@@ -0,0 +1,185 @@
+"""
+Importación masiva de clientes desde CSV.
+
+El archivo subido se guarda en una ``ImportacionClientes`` y se procesa en un
+hilo aparte: se lee en streaming (``csv.DictReader`` sobre el archivo, sin
+cargarlo entero en memoria), cada lote de filas se valida en Python y se
+guarda con un único ``bulk_create(update_conflicts=True)`` sobre la clave
+``(identificacion, sucursal)``, de modo que reimportar el mismo archivo
+actualiza en lugar de duplicar. Cada lote es una transacción que además
+registra el avance y los errores de sus filas.
+
+Si el proceso se corta (reinicio del servidor) la importación queda en
+"procesando"; ``procesar_importaciones_clientes --reintentar`` la vuelve a
+ejecutar desde el principio, lo que es seguro por ser un upsert.
+"""
+
+import csv
+import io
+import logging
+import threading
+from decimal import Decimal, InvalidOperation
+from itertools import islice
+
+from django.core.exceptions import ValidationError
+from django.db import connections, transaction
+from django.utils import timezone
+
+from .arbol import invalidar_conteos
+from .busqueda import texto_busqueda
+from .models import Cliente, ErrorImportacionCliente, ImportacionClientes
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 1000
+COLUMNAS_REQUERIDAS = ('nombre', 'identificacion')
+CAMPOS_TEXTO = ('nombre', 'identificacion', 'sucursal', 'direccion', 'telefono', 'correo', 'zona', 'tipo')
+# Lo que se pisa cuando la fila ya existe (fecha_creacion y rubro se conservan)
+CAMPOS_ACTUALIZABLES = [
+    'nombre', 'direccion', 'telefono', 'correo', 'zona', 'tipo',
+    'limite_credito', 'activo', 'busqueda', 'fecha_actualizacion',
+]
+VERDADEROS = {'true', '1', 'si', 'sí', 'yes', 'verdadero'}
+FALSOS = {'false', '0', 'no', 'falso'}
+
+
+def _decimal(valor):
+    valor = (valor or '').strip()
+    if not valor:
+        return Decimal('0')
+    try:
+        return Decimal(valor)
+    except InvalidOperation:
+        raise ValidationError({'limite_credito': f'"{valor}" no es un número válido'})
+
+
+def _booleano(valor):
+    valor = (valor or '').strip().lower()
+    if not valor or valor in VERDADEROS:
+        return True
+    if valor in FALSOS:
+        return False
+    raise ValidationError({'activo': f'"{valor}" no es un valor válido (true/false)'})
+
+
+def _mensaje(error):
+    if hasattr(error, 'message_dict'):
+        return '; '.join(f"{campo}: {' '.join(mensajes)}" for campo, mensajes in error.message_dict.items())
+    return ' '.join(error.messages)
+
+
+def cliente_desde_fila(fila):
+    """Construye y valida (sin consultar la base) el cliente de una fila del CSV"""
+    valores = {campo: (fila.get(campo) or '').strip() for campo in CAMPOS_TEXTO}
+    cliente = Cliente(
+        **valores,
+        limite_credito=_decimal(fila.get('limite_credito')),
+        activo=_booleano(fila.get('activo')),
+    )
+    cliente.tipo = cliente.tipo or 'minorista'
+    cliente.full_clean(exclude=['rubro'], validate_unique=False, validate_constraints=False)
+    cliente.busqueda = texto_busqueda(cliente)
+    return cliente
+
+
+def guardar_lote(importacion, filas):
+    """
+    Valida y guarda un lote de ``(numero_de_fila, fila)``. Devuelve
+    ``(creados, actualizados, errores)``.
+    """
+    clientes = {}
+    errores = []
+    for numero, fila in filas:
+        try:
+            cliente = cliente_desde_fila(fila)
+        except ValidationError as error:
+            errores.append(ErrorImportacionCliente(
+                importacion=importacion, fila=numero,
+                identificacion=(fila.get('identificacion') or '')[:100], mensaje=_mensaje(error)
+            ))
+            continue
+        # Una clave repetida dentro del lote no puede ir dos veces en el mismo
+        # INSERT ... ON CONFLICT: gana la última fila, como en lotes sucesivos
+        clientes[(cliente.identificacion, cliente.sucursal)] = cliente
+
+    existentes = set(
+        Cliente.objects.filter(identificacion__in={clave[0] for clave in clientes})
+        .values_list('identificacion', 'sucursal')
+    ) if clientes else set()
+    actualizados = len(existentes.intersection(clientes))
+
+    Cliente.objects.bulk_create(
+        clientes.values(),
+        update_conflicts=True,
+        unique_fields=['identificacion', 'sucursal'],
+        update_fields=CAMPOS_ACTUALIZABLES,
+    )
+    ErrorImportacionCliente.objects.bulk_create(errores)
+    return len(clientes) - actualizados, actualizados, len(errores)
+
+
+def procesar_importacion(importacion_id, lote=TAMANO_LOTE):
+    """Procesa una importación pendiente (no hace nada si otro proceso la tomó)"""
+    tomada = ImportacionClientes.objects.filter(pk=importacion_id, estado='pendiente').update(
+        estado='procesando', fecha_inicio=timezone.now()
+    )
+    if not tomada:
+        return
+    importacion = ImportacionClientes.objects.get(pk=importacion_id)
+    avance = {'filas_procesadas': 0, 'creados': 0, 'actualizados': 0, 'filas_con_error': 0}
+
+    try:
+        with importacion.archivo.open('rb') as binario:
+            lector = csv.DictReader(io.TextIOWrapper(binario, encoding='utf-8-sig', newline=''))
+            faltantes = [columna for columna in COLUMNAS_REQUERIDAS if columna not in (lector.fieldnames or [])]
+            if faltantes:
+                raise ValueError(f"Faltan columnas requeridas: {', '.join(faltantes)}")
+
+            # La fila 1 es el encabezado
+            filas = enumerate(lector, start=2)
+            while True:
+                filas_lote = list(islice(filas, lote))
+                if not filas_lote:
+                    break
+                with transaction.atomic():
+                    creados, actualizados, errores = guardar_lote(importacion, filas_lote)
+                    avance['filas_procesadas'] += len(filas_lote)
+                    avance['creados'] += creados
+                    avance['actualizados'] += actualizados
+                    avance['filas_con_error'] += errores
+                    ImportacionClientes.objects.filter(pk=importacion_id).update(
+                        bytes_leidos=binario.tell(), **avance
+                    )
+    except (ValueError, UnicodeDecodeError, csv.Error, OSError) as error:
+        # UnicodeDecodeError es un ValueError: el archivo no está en UTF-8
+        logger.warning('Importación de clientes %s fallida: %s', importacion_id, error)
+        ImportacionClientes.objects.filter(pk=importacion_id).update(
+            estado='fallida', mensaje=str(error), fecha_fin=timezone.now()
+        )
+    except Exception as error:
+        logger.exception('Error inesperado en la importación de clientes %s', importacion_id)
+        ImportacionClientes.objects.filter(pk=importacion_id).update(
+            estado='fallida', mensaje=str(error), fecha_fin=timezone.now()
+        )
+    else:
+        ImportacionClientes.objects.filter(pk=importacion_id).update(
+            estado='terminada', bytes_leidos=importacion.tamano, fecha_fin=timezone.now()
+        )
+    finally:
+        if avance['creados'] or avance['actualizados']:
+            invalidar_conteos()
+
+
+def _ejecutar_en_hilo(importacion_id):
+    try:
+        procesar_importacion(importacion_id)
+    finally:
+        connections.close_all()
+
+
+def iniciar_en_segundo_plano(importacion):
+    """Lanza el procesamiento en un hilo cuando la transacción actual confirma"""
+    transaction.on_commit(lambda: threading.Thread(
+        target=_ejecutar_en_hilo, args=(importacion.pk,),
+        name=f'importacion-clientes-{importacion.pk}', daemon=True,
+    ).start())
@@ -0,0 +1 @@
+# Management commands for clientes app
\ No newline at end of file
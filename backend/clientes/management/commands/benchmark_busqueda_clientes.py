@@ -0,0 +1,98 @@
+"""
+Comando para medir la búsqueda de clientes sobre un volumen grande.
+
+Carga ``--clientes`` clientes sintéticos con bulk_create (el texto de
+búsqueda se completa igual que en ``Cliente.save``), mide cada término con
+la búsqueda indexada (primera página de 20 resultados) y con el filtro
+``icontains`` anterior, y borra los datos al terminar salvo ``--conservar``.
+"""
+
+import random
+import time
+import uuid
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from clientes.busqueda import buscar_clientes, texto_busqueda
+from clientes.models import Cliente
+
+NOMBRES = ['Lácteos', 'Almacén', 'Distribuidora', 'Kiosco', 'Panadería', 'Pizzería', 'Supermercado', 'Fábrica']
+APELLIDOS = ['Peña', 'Gómez', 'Núñez', 'Rodríguez', 'Martínez', 'López', 'Fernández', 'Díaz', 'Pérez', 'Sosa']
+ZONAS = ['Centro', 'Norte', 'Sur', 'Córdoba', 'Villa María', 'Río Cuarto', 'Alta Gracia']
+
+
+class Command(BaseCommand):
+    help = 'Mide la búsqueda indexada de clientes contra icontains'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--clientes',
+            type=int,
+            default=500_000,
+            help='Clientes sintéticos a cargar (default: 500.000)'
+        )
+        parser.add_argument(
+            '--terminos',
+            nargs='+',
+            default=['pena', 'lact gomez', 'cordoba', 'nunez sur', '3515'],
+            help='Textos a buscar'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=5000,
+            help='Filas por bulk_create (default: 5000)'
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No borrar los clientes sintéticos al terminar'
+        )
+
+    def handle(self, *args, **options):
+        marca = f'BENCH-{uuid.uuid4().hex[:8]}'
+        self.cargar(options['clientes'], options['lote'], marca)
+        try:
+            self.medir(options['terminos'])
+        finally:
+            if not options['conservar']:
+                Cliente.objects.filter(identificacion__startswith=marca).delete()
+
+    def cargar(self, cantidad, lote, marca):
+        azar = random.Random(42)
+        inicio = time.perf_counter()
+        for desde in range(0, cantidad, lote):
+            clientes = []
+            for numero in range(desde, min(desde + lote, cantidad)):
+                cliente = Cliente(
+                    nombre=f'{azar.choice(NOMBRES)} {azar.choice(APELLIDOS)} {numero}',
+                    identificacion=f'{marca}-{numero}',
+                    telefono=f'351 {azar.randint(1000000, 9999999)}',
+                    correo=f'cliente{numero}@example.com',
+                    zona=azar.choice(ZONAS),
+                )
+                cliente.busqueda = texto_busqueda(cliente)
+                clientes.append(cliente)
+            with transaction.atomic():
+                Cliente.objects.bulk_create(clientes)
+        self.stdout.write(f'{cantidad} clientes cargados en {time.perf_counter() - inicio:.1f}s')
+
+    def medir(self, terminos):
+        self.stdout.write(f'{"Término":<16} {"Indexada (ms)":>14} {"icontains (ms)":>15} {"Resultados":>11}')
+        for termino in terminos:
+            inicio = time.perf_counter()
+            resultados = list(buscar_clientes(Cliente.objects.all(), termino)[:20])
+            indexada = time.perf_counter() - inicio
+
+            filtro = Q()
+            for campo in ('nombre', 'identificacion', 'telefono', 'correo', 'zona'):
+                filtro |= Q(**{f'{campo}__icontains': termino})
+            inicio = time.perf_counter()
+            list(Cliente.objects.filter(filtro).order_by('nombre')[:20])
+            anterior = time.perf_counter() - inicio
+
+            self.stdout.write(
+                f'{termino:<16} {indexada * 1000:>14.1f} {anterior * 1000:>15.1f} {len(resultados):>11}'
+            )
@@ -0,0 +1,43 @@
+"""
+Comando para recalcular los productos sugeridos desde el historial de ventas.
+El cálculo completo está pensado para correr una vez por día; ``--incremental``
+solo recalcula los clientes con ventas nuevas y puede correr seguido.
+"""
+
+from django.core.management.base import BaseCommand
+
+from clientes.recomendaciones import TOP, VECINOS, actualizar_recomendaciones, calcular_recomendaciones
+
+
+class Command(BaseCommand):
+    help = 'Calcula los productos sugeridos por cliente y por rubro'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--incremental',
+            action='store_true',
+            help='Recalcular solo los clientes con ventas posteriores al último cálculo'
+        )
+        parser.add_argument(
+            '--top',
+            type=int,
+            default=TOP,
+            help=f'Productos guardados por cliente y por rubro (default: {TOP})'
+        )
+        parser.add_argument(
+            '--vecinos',
+            type=int,
+            default=VECINOS,
+            help=f'Productos relacionados guardados por producto (default: {VECINOS})'
+        )
+
+    def handle(self, *args, **options):
+        if options.get('incremental'):
+            calculo = actualizar_recomendaciones(top=options['top'])
+        else:
+            calculo = calcular_recomendaciones(top=options['top'], vecinos=options['vecinos'])
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Cálculo {calculo.modo}: {calculo.lineas} líneas, {calculo.clientes} clientes, '
+            f'{calculo.productos} productos en {calculo.segundos:.1f}s'
+        ))
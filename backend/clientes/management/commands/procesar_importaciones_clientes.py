@@ -0,0 +1,53 @@
+"""
+Comando para procesar importaciones de clientes sin pasar por el hilo de la
+vista: las pendientes (por ejemplo si el servidor se reinició antes de
+lanzarlas) y, con ``--reintentar``, las que quedaron a medias o fallaron.
+Reprocesar un archivo es seguro porque cada lote es un upsert.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clientes.importacion import TAMANO_LOTE, procesar_importacion
+from clientes.models import ErrorImportacionCliente, ImportacionClientes
+
+
+class Command(BaseCommand):
+    help = 'Procesa las importaciones de clientes pendientes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--reintentar',
+            action='store_true',
+            help='Volver a procesar también las importaciones "procesando" o "fallida"'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=TAMANO_LOTE,
+            help=f'Filas por lote (default: {TAMANO_LOTE})'
+        )
+
+    def handle(self, *args, **options):
+        if options.get('reintentar'):
+            with transaction.atomic():
+                reintentos = ImportacionClientes.objects.filter(estado__in=['procesando', 'fallida'])
+                ErrorImportacionCliente.objects.filter(importacion__in=reintentos).delete()
+                reintentos.update(
+                    estado='pendiente', bytes_leidos=0, filas_procesadas=0, creados=0,
+                    actualizados=0, filas_con_error=0, mensaje='', fecha_inicio=None, fecha_fin=None
+                )
+
+        pendientes = list(
+            ImportacionClientes.objects.filter(estado='pendiente')
+            .order_by('fecha_creacion').values_list('pk', flat=True)
+        )
+        for importacion_id in pendientes:
+            procesar_importacion(importacion_id, lote=options.get('lote') or TAMANO_LOTE)
+            importacion = ImportacionClientes.objects.get(pk=importacion_id)
+            self.stdout.write(
+                f'{importacion}: {importacion.creados} creados, {importacion.actualizados} actualizados, '
+                f'{importacion.filas_con_error} con error'
+            )
+
+        self.stdout.write(self.style.SUCCESS(f'{len(pendientes)} importaciones procesadas'))
@@ -0,0 +1,78 @@
+"""
+Comando para regenerar los saldos de clientes desde ventas y pagos, y con
+ellos los comprobantes pendientes de cobro. Sirve para la carga inicial y
+para reparar desvíos (por ejemplo después de modificar ventas o pagos con
+``QuerySet.update``, que no pasa por ``save``).
+"""
+
+import time
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from clientes.models import SaldoCliente
+from clientes.saldos import saldos_desde_historial
+from finanzas_reportes.cuentas_por_cobrar import regenerar_pendientes
+
+
+class Command(BaseCommand):
+    help = 'Regenera SaldoCliente y ComprobantePendiente a partir de Venta y PagoCliente'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar las diferencias, sin escribir'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas por lote de escritura (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+        lote = options.get('lote') or 1000
+        inicio = time.perf_counter()
+        vacio = (0, Decimal('0'), Decimal('0'))
+
+        with transaction.atomic():
+            esperado = saldos_desde_historial()
+            actual = {
+                saldo.cliente_id: saldo
+                for saldo in SaldoCliente.objects.select_for_update()
+            }
+
+            cambios = []
+            for cliente_id in esperado.keys() | actual.keys():
+                cantidad, ventas, pagos = esperado.get(cliente_id, vacio)
+                saldo = actual.get(cliente_id)
+                if saldo and (saldo.cantidad_ventas, saldo.total_ventas, saldo.total_pagos) == (cantidad, ventas, pagos):
+                    continue
+                cambios.append(SaldoCliente(
+                    cliente_id=cliente_id, cantidad_ventas=cantidad, total_ventas=ventas, total_pagos=pagos
+                ))
+
+            if not dry_run:
+                SaldoCliente.objects.bulk_create(
+                    cambios,
+                    batch_size=lote,
+                    update_conflicts=True,
+                    unique_fields=['cliente'],
+                    update_fields=['cantidad_ventas', 'total_ventas', 'total_pagos', 'fecha_actualizacion']
+                )
+                pendientes, pendientes_corregidos = regenerar_pendientes()
+
+        mensaje = (
+            f'Saldos de clientes: {len(esperado)} con movimientos, {len(cambios)} corregidos '
+            f'en {time.perf_counter() - inicio:.2f}s'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'MODO DRY-RUN: {mensaje}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
+            self.stdout.write(self.style.SUCCESS(
+                f'Comprobantes pendientes: {pendientes} abiertos, {pendientes_corregidos} corregidos'
+            ))
@@ -0,0 +1,30 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:55
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_add_rubro_model'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SaldoCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('cantidad_ventas', models.IntegerField(default=0)),
+                ('total_ventas', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('total_pagos', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('cliente', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='cuenta', to='clientes.cliente')),
+            ],
+            options={
+                'verbose_name': 'Saldo de Cliente',
+                'verbose_name_plural': 'Saldos de Clientes',
+            },
+        ),
+    ]
@@ -0,0 +1,74 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:57
+
+import re
+import unicodedata
+
+from django.db import migrations, models
+
+INDICE_TRIGRAMAS = 'cliente_busqueda_trgm_idx'
+INDICE_TEXTO = 'cliente_busqueda_fts_idx'
+CAMPOS = ('nombre', 'identificacion', 'telefono', 'correo', 'zona')
+
+
+def normalizar(texto):
+    descompuesto = unicodedata.normalize('NFKD', texto or '')
+    return ''.join(c for c in descompuesto if not unicodedata.combining(c)).lower().strip()
+
+
+def texto_busqueda(cliente):
+    """Copia de clientes.busqueda.texto_busqueda al momento de esta migración"""
+    partes = [normalizar(getattr(cliente, campo, '')) for campo in CAMPOS]
+    for campo in ('identificacion', 'telefono'):
+        digitos = re.sub(r'\D', '', getattr(cliente, campo, '') or '')
+        if digitos and digitos != getattr(cliente, campo):
+            partes.append(digitos)
+    return ' '.join(parte for parte in partes if parte)
+
+
+def completar_busqueda(apps, schema_editor):
+    Cliente = apps.get_model('clientes', 'Cliente')
+    pendientes = []
+    for cliente in Cliente.objects.using(schema_editor.connection.alias).iterator(chunk_size=2000):
+        cliente.busqueda = texto_busqueda(cliente)
+        pendientes.append(cliente)
+        if len(pendientes) >= 2000:
+            Cliente.objects.bulk_update(pendientes, ['busqueda'])
+            pendientes = []
+    Cliente.objects.bulk_update(pendientes, ['busqueda'])
+
+
+def indices_postgresql(apps, schema_editor):
+    """Índices GIN solo en PostgreSQL (en SQLite se usa la tabla FTS5, ver clientes.busqueda)"""
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    from django.contrib.postgres.indexes import GinIndex, OpClass
+    from django.contrib.postgres.search import SearchVector
+
+    Cliente = apps.get_model('clientes', 'Cliente')
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    schema_editor.add_index(Cliente, GinIndex(OpClass('busqueda', name='gin_trgm_ops'), name=INDICE_TRIGRAMAS))
+    schema_editor.add_index(Cliente, GinIndex(SearchVector('busqueda', config='simple'), name=INDICE_TEXTO))
+
+
+def quitar_indices_postgresql(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE_TRIGRAMAS}')
+    schema_editor.execute(f'DROP INDEX IF EXISTS {INDICE_TEXTO}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0005_saldocliente'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='cliente',
+            name='busqueda',
+            field=models.TextField(blank=True, default='', editable=False),
+        ),
+        migrations.RunPython(completar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(indices_postgresql, quitar_indices_postgresql),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:08
+
+import clientes.models
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0006_cliente_busqueda'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(clientes.models.Inicial('nombre'), models.F('nombre'), models.F('id'), name='cliente_inicial_nombre_idx'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:11
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def separar_sucursales(apps, schema_editor):
+    """
+    Hasta ahora las sucursales se distinguían solo por el nombre: en cada
+    identificación repetida el cliente más antiguo queda sin sucursal y el
+    resto toma su nombre como sucursal.
+    """
+    Cliente = apps.get_model('clientes', 'Cliente')
+    clientes = Cliente.objects.using(schema_editor.connection.alias)
+    repetidas = (
+        clientes.order_by().values('identificacion')
+        .annotate(cantidad=Count('id')).filter(cantidad__gt=1)
+        .values_list('identificacion', flat=True)
+    )
+    for identificacion in repetidas:
+        usadas = {''}
+        for cliente in clientes.filter(identificacion=identificacion).order_by('id')[1:]:
+            sucursal = cliente.nombre[:100]
+            if sucursal in usadas:
+                sucursal = f'{cliente.nombre[:80]} ({cliente.pk})'
+            usadas.add(sucursal)
+            cliente.sucursal = sucursal
+            cliente.save(update_fields=['sucursal'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0007_indice_inicial_nombre'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ErrorImportacionCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fila', models.PositiveIntegerField()),
+                ('identificacion', models.CharField(blank=True, max_length=100)),
+                ('mensaje', models.TextField()),
+            ],
+            options={
+                'verbose_name': 'Error de Importación de Clientes',
+                'verbose_name_plural': 'Errores de Importación de Clientes',
+                'ordering': ['importacion', 'fila'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ImportacionClientes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('archivo', models.FileField(upload_to='importaciones/clientes/%Y/%m/')),
+                ('nombre_archivo', models.CharField(blank=True, max_length=255)),
+                ('estado', models.CharField(choices=[('pendiente', 'Pendiente'), ('procesando', 'Procesando'), ('terminada', 'Terminada'), ('fallida', 'Fallida')], default='pendiente', max_length=20)),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('bytes_leidos', models.PositiveBigIntegerField(default=0)),
+                ('filas_procesadas', models.PositiveIntegerField(default=0)),
+                ('creados', models.PositiveIntegerField(default=0)),
+                ('actualizados', models.PositiveIntegerField(default=0)),
+                ('filas_con_error', models.PositiveIntegerField(default=0)),
+                ('mensaje', models.TextField(blank=True)),
+                ('fecha_creacion', models.DateTimeField(default=django.utils.timezone.now)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+            ],
+            options={
+                'verbose_name': 'Importación de Clientes',
+                'verbose_name_plural': 'Importaciones de Clientes',
+                'ordering': ['-fecha_creacion'],
+            },
+        ),
+        migrations.AddField(
+            model_name='cliente',
+            name='sucursal',
+            field=models.CharField(blank=True, default='', help_text='Distingue clientes con la misma identificación', max_length=100),
+        ),
+        migrations.RunPython(separar_sucursales, migrations.RunPython.noop),
+        migrations.AddField(
+            model_name='importacionclientes',
+            name='usuario',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddField(
+            model_name='errorimportacioncliente',
+            name='importacion',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='errores', to='clientes.importacionclientes'),
+        ),
+    ]
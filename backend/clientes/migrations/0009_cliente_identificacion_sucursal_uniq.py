@@ -0,0 +1,19 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    # Separada de 0008: en PostgreSQL no se puede alterar la tabla en la misma
+    # transacción en la que se actualizaron sus filas
+
+    dependencies = [
+        ('clientes', '0008_importacion_clientes'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='cliente',
+            constraint=models.UniqueConstraint(fields=('identificacion', 'sucursal'), name='cliente_identificacion_sucursal_uniq'),
+        ),
+    ]
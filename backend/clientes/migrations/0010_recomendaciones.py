@@ -0,0 +1,92 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:15
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0009_cliente_identificacion_sucursal_uniq'),
+        ('productos', '0005_producto_entradas_acumuladas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalculoRecomendaciones',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('modo', models.CharField(choices=[('completo', 'Completo'), ('incremental', 'Incremental')], max_length=20)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('ultima_venta_id', models.BigIntegerField(default=0)),
+                ('lineas', models.PositiveIntegerField(default=0)),
+                ('clientes', models.PositiveIntegerField(default=0)),
+                ('productos', models.PositiveIntegerField(default=0)),
+                ('segundos', models.FloatField(default=0)),
+            ],
+            options={
+                'verbose_name': 'Cálculo de Recomendaciones',
+                'verbose_name_plural': 'Cálculos de Recomendaciones',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductoRelacionado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('puntaje', models.FloatField()),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='relacionados', to='productos.producto')),
+                ('relacionado', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Producto Relacionado',
+                'verbose_name_plural': 'Productos Relacionados',
+                'ordering': ['producto', '-puntaje'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecomendacionCliente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('puntaje', models.FloatField()),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recomendaciones', to='clientes.cliente')),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Recomendación para Cliente',
+                'verbose_name_plural': 'Recomendaciones para Clientes',
+                'ordering': ['cliente', 'posicion'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RecomendacionRubro',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('posicion', models.PositiveSmallIntegerField()),
+                ('puntaje', models.FloatField()),
+                ('fecha_calculo', models.DateTimeField(default=django.utils.timezone.now)),
+                ('producto', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='productos.producto')),
+                ('rubro', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='recomendaciones', to='clientes.rubro')),
+            ],
+            options={
+                'verbose_name': 'Recomendación por Rubro',
+                'verbose_name_plural': 'Recomendaciones por Rubro',
+                'ordering': ['rubro', 'posicion'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='productorelacionado',
+            constraint=models.UniqueConstraint(fields=('producto', 'relacionado'), name='producto_relacionado_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='recomendacioncliente',
+            constraint=models.UniqueConstraint(fields=('cliente', 'posicion'), name='recomendacion_cliente_posicion_uniq'),
+        ),
+        migrations.AddIndex(
+            model_name='recomendacionrubro',
+            index=models.Index(fields=['rubro', 'posicion'], name='recomendacion_rubro_pos_idx'),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:34
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0010_recomendaciones'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='rubro',
+            name='fecha_actualizacion',
+            field=models.DateTimeField(auto_now=True),
+        ),
+    ]
@@ -1,8 +1,19 @@
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Func
 from django.utils import timezone
 from decimal import Decimal
 
 
+class Inicial(Func):
+    """
+    Primera letra en mayúsculas. La posición va escrita en la plantilla (y no
+    como parámetro) para que la consulta coincida con el índice de expresión.
+    """
+    template = 'UPPER(SUBSTR(%(expressions)s, 1, 1))'
+    output_field = models.CharField()
+
+
 class Rubro(models.Model):
     """
     Modelo para almacenar los diferentes rubros/tipos de negocio de los clientes.
@@ -12,6 +23,7 @@ class Rubro(models.Model):
     descripcion = models.TextField(blank=True, help_text="Descripción opcional del rubro")
     activo = models.BooleanField(default=True)
     fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ['nombre']
@@ -31,6 +43,8 @@ class Cliente(models.Model):
     # Información básica
     nombre = models.CharField(max_length=100)
     identificacion = models.CharField(max_length=20)  # Removido unique=True para permitir sucursales
+    sucursal = models.CharField(max_length=100, blank=True, default='',
+                                help_text="Distingue clientes con la misma identificación")
     direccion = models.CharField(max_length=200, blank=True)
     telefono = models.CharField(max_length=20, blank=True)
     correo = models.EmailField(blank=True)
@@ -47,44 +61,237 @@ class Cliente(models.Model):
     fecha_creacion = models.DateTimeField(default=timezone.now)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     ultima_compra = models.DateTimeField(null=True, blank=True)
+
+    # Texto normalizado para la búsqueda indexada (ver clientes.busqueda)
+    busqueda = models.TextField(blank=True, default='', editable=False)
     
     class Meta:
         ordering = ['nombre']
         verbose_name = 'Cliente'
         verbose_name_plural = 'Clientes'
+        indexes = [
+            # Conteos del TreeView y clientes de cada letra ordenados (ver clientes.arbol)
+            models.Index(Inicial('nombre'), F('nombre'), F('id'), name='cliente_inicial_nombre_idx'),
+        ]
+        constraints = [
+            # Clave de la importación masiva (upsert, ver clientes.importacion)
+            models.UniqueConstraint(fields=['identificacion', 'sucursal'], name='cliente_identificacion_sucursal_uniq'),
+        ]
 
     def __str__(self):
         return self.nombre
+
+    def save(self, *args, **kwargs):
+        from .busqueda import CAMPOS, texto_busqueda
+
+        self.busqueda = texto_busqueda(self)
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and set(CAMPOS).intersection(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'busqueda'}
+        super().save(*args, **kwargs)
     
+    def _cuenta(self):
+        """Saldo denormalizado del cliente (None si todavía no tiene movimientos)"""
+        try:
+            return self.cuenta
+        except SaldoCliente.DoesNotExist:
+            return None
+
     @property
     def deuda(self):
         """
         Calcula la deuda del cliente:
-        total de ventas a crédito - total de pagos.
+        total de ventas - total de pagos (nunca negativa).
         """
-        try:
-            total_ventas = sum(v.total for v in self.ventas.filter(metodo_pago='credito'))
-            total_pagos = sum(p.monto for p in self.pagos.all())
-            return max(0, total_ventas - total_pagos)
-        except:
-            return 0
+        cuenta = self._cuenta()
+        return cuenta.deuda if cuenta else Decimal('0')
     
     @property
     def promedio_pedido(self):
         """
         Calcula el promedio de pedidos del cliente.
         """
-        try:
-            ventas = self.ventas.all()
-            if ventas.exists():
-                return sum(v.total for v in ventas) / ventas.count()
-            return 0
-        except:
-            return 0
+        cuenta = self._cuenta()
+        return cuenta.promedio_pedido if cuenta else Decimal('0')
     
     @property
     def saldo(self):
         """
         Calcula el saldo del cliente (alias para deuda para compatibilidad).
         """
-        return self.deuda
\ No newline at end of file
+        return self.deuda
+
+
+class SaldoCliente(models.Model):
+    """
+    Totales de cuenta corriente de un cliente.
+
+    Se actualiza en la misma transacción que cada ``Venta`` y ``PagoCliente``
+    (ver clientes.saldos); el comando ``reconciliar_saldos_clientes`` lo
+    regenera desde el historial.
+    """
+    cliente = models.OneToOneField(Cliente, on_delete=models.CASCADE, related_name='cuenta')
+    cantidad_ventas = models.IntegerField(default=0)
+    total_ventas = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    total_pagos = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = 'Saldo de Cliente'
+        verbose_name_plural = 'Saldos de Clientes'
+
+    def __str__(self):
+        return f"Saldo de {self.cliente_id}: {self.deuda}"
+
+    @property
+    def deuda(self):
+        return max(Decimal('0'), self.total_ventas - self.total_pagos)
+
+    @property
+    def promedio_pedido(self):
+        if not self.cantidad_ventas:
+            return Decimal('0')
+        return (self.total_ventas / self.cantidad_ventas).quantize(Decimal('0.01'))
+
+class ImportacionClientes(models.Model):
+    """
+    Importación masiva de clientes desde un CSV, procesada en segundo plano
+    por lotes (ver clientes.importacion). Guarda el avance para consultarlo
+    mientras corre y los errores por fila en ``ErrorImportacionCliente``.
+    """
+    ESTADO_CHOICES = [
+        ('pendiente', 'Pendiente'),
+        ('procesando', 'Procesando'),
+        ('terminada', 'Terminada'),
+        ('fallida', 'Fallida'),
+    ]
+
+    archivo = models.FileField(upload_to='importaciones/clientes/%Y/%m/')
+    nombre_archivo = models.CharField(max_length=255, blank=True)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True)
+    estado = models.CharField(max_length=20, choices=ESTADO_CHOICES, default='pendiente')
+    tamano = models.PositiveBigIntegerField(default=0)
+    bytes_leidos = models.PositiveBigIntegerField(default=0)
+    filas_procesadas = models.PositiveIntegerField(default=0)
+    creados = models.PositiveIntegerField(default=0)
+    actualizados = models.PositiveIntegerField(default=0)
+    filas_con_error = models.PositiveIntegerField(default=0)
+    mensaje = models.TextField(blank=True)
+    fecha_creacion = models.DateTimeField(default=timezone.now)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-fecha_creacion']
+        verbose_name = 'Importación de Clientes'
+        verbose_name_plural = 'Importaciones de Clientes'
+
+    def __str__(self):
+        return f"{self.nombre_archivo or self.archivo.name} ({self.get_estado_display()})"
+
+    @property
+    def progreso(self):
+        """Porcentaje leído del archivo"""
+        if self.estado == 'terminada':
+            return 100
+        if not self.tamano:
+            return 0
+        return min(99, int(self.bytes_leidos * 100 / self.tamano))
+
+
+class ErrorImportacionCliente(models.Model):
+    importacion = models.ForeignKey(ImportacionClientes, on_delete=models.CASCADE, related_name='errores')
+    fila = models.PositiveIntegerField()
+    identificacion = models.CharField(max_length=100, blank=True)
+    mensaje = models.TextField()
+
+    class Meta:
+        ordering = ['importacion', 'fila']
+        verbose_name = 'Error de Importación de Clientes'
+        verbose_name_plural = 'Errores de Importación de Clientes'
+
+    def __str__(self):
+        return f"Fila {self.fila}: {self.mensaje}"
+
+
+class RecomendacionCliente(models.Model):
+    """Productos sugeridos para un cliente, por posición (ver clientes.recomendaciones)"""
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name='recomendaciones')
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='+')
+    posicion = models.PositiveSmallIntegerField()
+    puntaje = models.FloatField()
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['cliente', 'posicion']
+        verbose_name = 'Recomendación para Cliente'
+        verbose_name_plural = 'Recomendaciones para Clientes'
+        constraints = [
+            models.UniqueConstraint(fields=['cliente', 'posicion'], name='recomendacion_cliente_posicion_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.cliente_id} #{self.posicion}: {self.producto_id}"
+
+
+class RecomendacionRubro(models.Model):
+    """Productos más elegidos por los clientes de un rubro (sin rubro: todos los clientes)"""
+    rubro = models.ForeignKey(Rubro, on_delete=models.CASCADE, null=True, blank=True, related_name='recomendaciones')
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='+')
+    posicion = models.PositiveSmallIntegerField()
+    puntaje = models.FloatField()
+    fecha_calculo = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['rubro', 'posicion']
+        verbose_name = 'Recomendación por Rubro'
+        verbose_name_plural = 'Recomendaciones por Rubro'
+        indexes = [
+            models.Index(fields=['rubro', 'posicion'], name='recomendacion_rubro_pos_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.rubro_id or 'general'} #{self.posicion}: {self.producto_id}"
+
+
+class ProductoRelacionado(models.Model):
+    """Vecinos más cercanos de cada producto por compras conjuntas (similitud coseno)"""
+    producto = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='relacionados')
+    relacionado = models.ForeignKey('productos.Producto', on_delete=models.CASCADE, related_name='+')
+    puntaje = models.FloatField()
+
+    class Meta:
+        ordering = ['producto', '-puntaje']
+        verbose_name = 'Producto Relacionado'
+        verbose_name_plural = 'Productos Relacionados'
+        constraints = [
+            models.UniqueConstraint(fields=['producto', 'relacionado'], name='producto_relacionado_uniq'),
+        ]
+
+    def __str__(self):
+        return f"{self.producto_id} -> {self.relacionado_id} ({self.puntaje:.3f})"
+
+
+class CalculoRecomendaciones(models.Model):
+    """Registro de cada ejecución de ``calcular_recomendaciones``"""
+    MODO_CHOICES = [
+        ('completo', 'Completo'),
+        ('incremental', 'Incremental'),
+    ]
+
+    modo = models.CharField(max_length=20, choices=MODO_CHOICES)
+    fecha = models.DateTimeField(default=timezone.now)
+    # Última venta incluida: el modo incremental procesa las posteriores
+    ultima_venta_id = models.BigIntegerField(default=0)
+    lineas = models.PositiveIntegerField(default=0)
+    clientes = models.PositiveIntegerField(default=0)
+    productos = models.PositiveIntegerField(default=0)
+    segundos = models.FloatField(default=0)
+
+    class Meta:
+        ordering = ['-fecha']
+        verbose_name = 'Cálculo de Recomendaciones'
+        verbose_name_plural = 'Cálculos de Recomendaciones'
+
+    def __str__(self):
+        return f"{self.get_modo_display()} {self.fecha:%Y-%m-%d %H:%M}"
@@ -0,0 +1,89 @@
+"""
+Perfil 360 de un cliente (``ClienteViewSet.perfil``).
+
+Se arma con tres consultas sin importar el largo del historial: el cliente
+con rubro y saldo denormalizado (``select_related``) y las últimas ventas y
+pagos con ``Prefetch`` recortados. Los totales salen de ``SaldoCliente``.
+
+El resultado se guarda en la caché por ``CLIENTES_PERFIL_CACHE_SEGUNDOS``
+(0 lo desactiva) y se descarta al confirmar cualquier cambio del cliente, de
+sus ventas o de sus pagos (ver ``clientes.signals`` y ``clientes.saldos``).
+El cliente se lee siempre, antes de mirar la caché, así el 404 y los permisos
+no dependen de lo guardado.
+
+Descartar el perfil solo alcanza a todos los workers con una caché compartida
+(``REDIS_URL``). Con la LocMem de cada proceso el perfil se guarda como mucho
+``CACHE_LOCAL_SEGUNDOS`` (ver ``core.caches``), que es lo que puede tardar otro
+worker en mostrar una venta o un pago nuevos.
+"""
+
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import Prefetch
+
+from core.caches import duracion
+
+LIMITE_HISTORIAL = 50
+
+
+def clave_perfil(cliente_id):
+    return f'clientes:perfil:{cliente_id}'
+
+
+def invalidar_perfil(*cliente_ids):
+    """Descarta los perfiles guardados cuando la transacción actual confirma"""
+    claves = [clave_perfil(cliente_id) for cliente_id in cliente_ids if cliente_id is not None]
+    if claves:
+        transaction.on_commit(lambda: cache.delete_many(claves))
+
+
+def duracion_cache():
+    return duracion(getattr(settings, 'CLIENTES_PERFIL_CACHE_SEGUNDOS', 0))
+
+
+def prefetch_perfil():
+    from finanzas_reportes.models import PagoCliente
+    from ventas.models import Venta
+
+    return [
+        Prefetch(
+            'ventas',
+            queryset=Venta.objects.only('id', 'cliente_id', 'fecha', 'total')
+            .order_by('-fecha', '-id')[:LIMITE_HISTORIAL],
+            to_attr='ultimas_ventas',
+        ),
+        Prefetch(
+            'pagos',
+            queryset=PagoCliente.objects.only('id', 'cliente_id', 'fecha', 'monto', 'medio')
+            .order_by('-fecha', '-id')[:LIMITE_HISTORIAL],
+            to_attr='ultimos_pagos',
+        ),
+    ]
+
+
+def armar_perfil(cliente, datos_cliente):
+    """``cliente`` debe venir con ``prefetch_perfil()`` y ``select_related('cuenta')``"""
+    cuenta = cliente._cuenta()
+    total_ventas = cuenta.total_ventas if cuenta else Decimal('0')
+    total_pagos = cuenta.total_pagos if cuenta else Decimal('0')
+    return {
+        'cliente': datos_cliente,
+        'historial_ventas': [
+            {'id': venta.id, 'fecha': venta.fecha, 'total': str(venta.total)}
+            for venta in cliente.ultimas_ventas
+        ],
+        # Compra registra compras a proveedores y no tiene cliente; la clave
+        # se mantiene por compatibilidad de la respuesta
+        'historial_compras': [],
+        'pagos': [
+            {'id': pago.id, 'fecha': pago.fecha, 'monto': str(pago.monto), 'medio': pago.medio}
+            for pago in cliente.ultimos_pagos
+        ],
+        'saldo': str((total_ventas - total_pagos).quantize(Decimal('0.01'))),
+        'total_ventas': str(total_ventas),
+        'total_compras': '0',
+        'total_pagos': str(total_pagos),
+    }
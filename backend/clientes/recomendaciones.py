@@ -0,0 +1,320 @@
+"""
+Productos sugeridos a partir del historial de ventas.
+
+El cálculo completo (``calcular_recomendaciones``, pensado para correr de noche)
+recorre las líneas de venta una vez y arma con SciPy:
+
+* la matriz dispersa de afinidad cliente x producto, donde cada compra pesa
+  según su antigüedad (vida media de ``VIDA_MEDIA_DIAS``) y cada fila se
+  normaliza para que los clientes grandes no dominen;
+* la similitud coseno producto x producto por compras conjuntas, recortada a
+  los ``VECINOS`` más cercanos de cada producto (``ProductoRelacionado``).
+
+El puntaje de un cliente combina lo que ya compra (recompra) con los productos
+relacionados a lo que compra; se guardan los ``TOP`` mejores por cliente
+(``RecomendacionCliente``) y por rubro (``RecomendacionRubro``, sin rubro =
+todos los clientes). El modo incremental recalcula solo los clientes con
+ventas nuevas usando los vecinos guardados.
+
+Las líneas sin producto se identifican por su descripción cuando coincide con
+el nombre de un producto (ventas cargadas antes de existir la relación).
+"""
+
+import time
+
+from django.db import transaction
+from django.db.models import Max
+from django.utils import timezone
+
+from .busqueda import normalizar
+from .models import (
+    CalculoRecomendaciones, Cliente, ProductoRelacionado, RecomendacionCliente, RecomendacionRubro,
+)
+
+TOP = 20
+VECINOS = 30
+VIDA_MEDIA_DIAS = 90
+PESO_RECOMPRA = 0.6  # El resto corresponde a productos relacionados
+LIMITE_SUGERIDOS = 10
+
+
+def _lineas(ventas=None):
+    """``(cliente_id, producto_id, fecha)`` de las líneas con producto identificable"""
+    from productos.models import Producto
+    from ventas.models import LineaVenta
+
+    por_nombre = {normalizar(nombre): pk for pk, nombre in Producto.objects.values_list('id', 'nombre')}
+    lineas = LineaVenta.objects.order_by()
+    if ventas is not None:
+        lineas = lineas.filter(venta__in=ventas)
+    filas = lineas.values_list('venta__cliente_id', 'producto_id', 'descripcion', 'venta__fecha')
+    for cliente_id, producto_id, descripcion, fecha in filas.iterator(chunk_size=5000):
+        producto_id = producto_id or por_nombre.get(normalizar(descripcion))
+        if producto_id:
+            yield cliente_id, producto_id, fecha
+
+
+def matriz_afinidad(lineas, hoy=None, productos_ids=None):
+    """
+    Devuelve ``(A, clientes_ids, productos_ids)`` con ``A`` dispersa (CSR) de
+    clientes x productos y filas normalizadas a suma 1. Si se pasa
+    ``productos_ids`` (ordenado) las columnas siguen ese índice.
+    """
+    import numpy as np
+    from scipy import sparse
+
+    hoy = hoy or timezone.localdate()
+    clientes, productos, edades = [], [], []
+    for cliente_id, producto_id, fecha in lineas:
+        clientes.append(cliente_id)
+        productos.append(producto_id)
+        edades.append((hoy - fecha).days if fecha else 0)
+
+    clientes_ids, filas = np.unique(np.asarray(clientes, dtype=np.int64), return_inverse=True)
+    productos = np.asarray(productos, dtype=np.int64)
+    if productos_ids is None:
+        productos_ids, columnas = np.unique(productos, return_inverse=True)
+    else:
+        productos_ids = np.union1d(productos_ids, productos)
+        columnas = np.searchsorted(productos_ids, productos)
+
+    pesos = 0.5 ** (np.maximum(np.asarray(edades, dtype=np.float64), 0) / VIDA_MEDIA_DIAS)
+    # Las compras repetidas de un mismo producto se suman al construir la matriz
+    afinidad = sparse.csr_matrix(
+        (pesos, (filas, columnas)), shape=(len(clientes_ids), len(productos_ids))
+    )
+    totales = np.asarray(afinidad.sum(axis=1)).ravel()
+    totales[totales == 0] = 1
+    return (sparse.diags(1 / totales) @ afinidad).tocsr(), clientes_ids, productos_ids
+
+
+def similitud_productos(afinidad, vecinos=VECINOS):
+    """Similitud coseno por compras conjuntas (clientes en común), top ``vecinos`` por fila"""
+    import numpy as np
+    from scipy import sparse
+
+    compro = afinidad.copy()
+    compro.data[:] = 1
+    conjuntas = (compro.T @ compro).tocsr()
+    compradores = np.sqrt(conjuntas.diagonal())
+    compradores[compradores == 0] = 1
+    similitud = (sparse.diags(1 / compradores) @ conjuntas @ sparse.diags(1 / compradores)).tocsr()
+    # Todo producto de la matriz tuvo al menos un comprador: la diagonal ya existe
+    similitud.setdiag(0)
+    return _top_por_fila(similitud, vecinos)
+
+
+def mejores_por_fila(matriz, cantidad):
+    """
+    Los ``cantidad`` valores más altos de cada fila de una matriz CSR, en un
+    único ordenamiento vectorizado. Devuelve arrays ``(filas, columnas,
+    valores, posiciones)`` ordenados por fila y posición (desde 1).
+    """
+    import numpy as np
+
+    matriz = matriz.tocsr()
+    matriz.eliminate_zeros()
+    matriz.sort_indices()
+    filas = np.repeat(np.arange(matriz.shape[0]), np.diff(matriz.indptr))
+    # Por fila y de mayor a menor valor con un único argsort: la clave es la
+    # fila más el valor complementado en [0, 1) (a igual valor, menor columna)
+    maximo = matriz.data.max() if matriz.nnz else 1
+    orden = np.argsort(filas + (1 - matriz.data / maximo) * 0.5, kind='stable')
+    filas = filas[orden]
+    posiciones = np.arange(len(orden)) - matriz.indptr[filas]
+    quedan = posiciones < cantidad
+    return filas[quedan], matriz.indices[orden][quedan], matriz.data[orden][quedan], posiciones[quedan] + 1
+
+
+def _top_por_fila(matriz, cantidad):
+    from scipy import sparse
+
+    filas, columnas, valores, _posiciones = mejores_por_fila(matriz, cantidad)
+    return sparse.csr_matrix((valores, (filas, columnas)), shape=matriz.shape)
+
+
+def puntajes(afinidad, similitud):
+    """Recompra más productos relacionados a lo que el cliente compra"""
+    return (PESO_RECOMPRA * afinidad + (1 - PESO_RECOMPRA) * (afinidad @ similitud)).tocsr()
+
+
+def _recomendaciones_de_clientes(matriz, clientes_ids, productos_ids, top, fecha):
+    filas, columnas, valores, posiciones = mejores_por_fila(matriz, top)
+    return [
+        RecomendacionCliente(
+            cliente_id=cliente_id, producto_id=producto_id, posicion=posicion, puntaje=puntaje, fecha_calculo=fecha,
+        )
+        for cliente_id, producto_id, puntaje, posicion in zip(
+            clientes_ids[filas].tolist(), productos_ids[columnas].tolist(), valores.tolist(), posiciones.tolist()
+        )
+    ]
+
+
+def _recomendaciones_de_rubros(afinidad, clientes_ids, productos_ids, top, fecha):
+    """Popularidad por rubro: cada cliente aporta su fila normalizada (peso 1)"""
+    import numpy as np
+    from scipy import sparse
+
+    rubro_de = dict(Cliente.objects.filter(pk__in=clientes_ids.tolist()).values_list('pk', 'rubro_id'))
+    rubros = sorted({rubro_de.get(cliente_id) for cliente_id in clientes_ids.tolist()} - {None})
+    indice = {rubro_id: posicion for posicion, rubro_id in enumerate(rubros)}
+    # Una fila por rubro más una última con todos los clientes
+    filas, columnas = [], []
+    for columna, cliente_id in enumerate(clientes_ids.tolist()):
+        rubro_id = rubro_de.get(cliente_id)
+        if rubro_id is not None:
+            filas.append(indice[rubro_id])
+            columnas.append(columna)
+        filas.append(len(rubros))
+        columnas.append(columna)
+    grupos = sparse.csr_matrix(
+        (np.ones(len(filas)), (filas, columnas)), shape=(len(rubros) + 1, len(clientes_ids))
+    )
+    popularidad = (grupos @ afinidad).tocsr()
+
+    grupos_ids = rubros + [None]
+    filas, columnas, valores, posiciones = mejores_por_fila(popularidad, top)
+    return [
+        RecomendacionRubro(
+            rubro_id=grupos_ids[fila], producto_id=producto_id, posicion=posicion, puntaje=puntaje, fecha_calculo=fecha,
+        )
+        for fila, producto_id, puntaje, posicion in zip(
+            filas.tolist(), productos_ids[columnas].tolist(), valores.tolist(), posiciones.tolist()
+        )
+    ]
+
+
+def _relacionados(similitud, productos_ids):
+    similitud = similitud.tocoo()
+    return [
+        ProductoRelacionado(
+            producto_id=int(productos_ids[fila]), relacionado_id=int(productos_ids[columna]), puntaje=valor
+        )
+        for fila, columna, valor in zip(similitud.row.tolist(), similitud.col.tolist(), similitud.data.tolist())
+    ]
+
+
+def _ultima_venta_id():
+    from ventas.models import Venta
+
+    return Venta.objects.aggregate(ultima=Max('id'))['ultima'] or 0
+
+
+def calcular_recomendaciones(top=TOP, vecinos=VECINOS, lote=2000):
+    """Recalcula todo desde el historial. Devuelve el ``CalculoRecomendaciones`` creado"""
+    inicio = time.perf_counter()
+    ultima_venta_id = _ultima_venta_id()
+    lineas = list(_lineas())
+    fecha = timezone.now()
+
+    por_cliente, por_rubro, relacionados = [], [], []
+    clientes = productos = 0
+    if lineas:
+        afinidad, clientes_ids, productos_ids = matriz_afinidad(lineas)
+        similitud = similitud_productos(afinidad, vecinos)
+        por_cliente = _recomendaciones_de_clientes(
+            puntajes(afinidad, similitud), clientes_ids, productos_ids, top, fecha
+        )
+        por_rubro = _recomendaciones_de_rubros(afinidad, clientes_ids, productos_ids, top, fecha)
+        relacionados = _relacionados(similitud, productos_ids)
+        clientes, productos = len(clientes_ids), len(productos_ids)
+
+    with transaction.atomic():
+        RecomendacionCliente.objects.all().delete()
+        RecomendacionRubro.objects.all().delete()
+        ProductoRelacionado.objects.all().delete()
+        RecomendacionCliente.objects.bulk_create(por_cliente, batch_size=lote)
+        RecomendacionRubro.objects.bulk_create(por_rubro, batch_size=lote)
+        ProductoRelacionado.objects.bulk_create(relacionados, batch_size=lote)
+        return CalculoRecomendaciones.objects.create(
+            modo='completo', fecha=fecha, ultima_venta_id=ultima_venta_id, lineas=len(lineas),
+            clientes=clientes, productos=productos, segundos=time.perf_counter() - inicio,
+        )
+
+
+def actualizar_recomendaciones(top=TOP, lote=2000):
+    """
+    Modo incremental: recalcula los clientes con ventas posteriores al último
+    cálculo usando los productos relacionados guardados. Sin cálculo previo
+    hace el completo.
+    """
+    import numpy as np
+    from scipy import sparse
+    from ventas.models import Venta
+
+    anterior = CalculoRecomendaciones.objects.order_by('-fecha', '-id').first()
+    if anterior is None:
+        return calcular_recomendaciones(top=top, lote=lote)
+
+    inicio = time.perf_counter()
+    ultima_venta_id = _ultima_venta_id()
+    clientes_nuevos = Venta.objects.filter(id__gt=anterior.ultima_venta_id).values('cliente_id')
+    # Todo el historial de esos clientes: la afinidad es relativa a sus compras
+    lineas = list(_lineas(Venta.objects.filter(cliente_id__in=clientes_nuevos)))
+    fecha = timezone.now()
+
+    por_cliente, clientes_ids, productos_ids = [], [], []
+    if lineas:
+        vecinos = list(ProductoRelacionado.objects.values_list('producto_id', 'relacionado_id', 'puntaje'))
+        conocidos = np.unique(np.asarray([par[:2] for par in vecinos], dtype=np.int64).reshape(-1))
+        afinidad, clientes_ids, productos_ids = matriz_afinidad(lineas, productos_ids=conocidos)
+        if vecinos:
+            origen, destino, valores = zip(*vecinos)
+            similitud = sparse.csr_matrix(
+                (valores, (np.searchsorted(productos_ids, origen), np.searchsorted(productos_ids, destino))),
+                shape=(len(productos_ids), len(productos_ids)),
+            )
+        else:
+            similitud = sparse.csr_matrix((len(productos_ids), len(productos_ids)))
+        por_cliente = _recomendaciones_de_clientes(
+            puntajes(afinidad, similitud), clientes_ids, productos_ids, top, fecha
+        )
+
+    with transaction.atomic():
+        RecomendacionCliente.objects.filter(cliente_id__in=list(map(int, clientes_ids))).delete()
+        RecomendacionCliente.objects.bulk_create(por_cliente, batch_size=lote)
+        return CalculoRecomendaciones.objects.create(
+            modo='incremental', fecha=fecha, ultima_venta_id=ultima_venta_id, lineas=len(lineas),
+            clientes=len(clientes_ids), productos=len(productos_ids), segundos=time.perf_counter() - inicio,
+        )
+
+
+def productos_sugeridos(cliente_id=None, rubro_id=None, limite=LIMITE_SUGERIDOS):
+    """
+    Sugerencias guardadas para un cliente (o un rubro) con una consulta por
+    nivel: las del cliente, si no tiene las de su rubro, si no las generales y,
+    antes del primer cálculo, los productos con más stock. Lanza
+    ``Cliente.DoesNotExist`` si ``cliente_id`` no existe.
+    """
+    from productos.models import Producto
+
+    campos = ('producto_id', 'producto__nombre', 'producto__precio', 'producto__stock')
+    disponibles = {'producto__activo': True, 'producto__stock__gt': 0}
+
+    filas = []
+    if cliente_id is not None:
+        filas = list(
+            RecomendacionCliente.objects.filter(cliente_id=cliente_id, **disponibles)
+            .order_by('posicion').values_list(*campos)[:limite]
+        )
+        if not filas:
+            rubro_id = Cliente.objects.values_list('rubro_id', flat=True).get(pk=cliente_id)
+    if not filas and rubro_id is not None:
+        filas = list(
+            RecomendacionRubro.objects.filter(rubro_id=rubro_id, **disponibles)
+            .order_by('posicion').values_list(*campos)[:limite]
+        )
+    if not filas:
+        filas = list(
+            RecomendacionRubro.objects.filter(rubro__isnull=True, **disponibles)
+            .order_by('posicion').values_list(*campos)[:limite]
+        )
+    if not filas:
+        filas = list(
+            Producto.objects.filter(activo=True, stock__gt=0).order_by('-stock')
+            .values_list('id', 'nombre', 'precio', 'stock')[:limite]
+        )
+    return [
+        {'id': str(producto_id), 'nombre': nombre, 'precio': float(precio), 'stock': float(stock)}
+        for producto_id, nombre, precio, stock in filas
+    ]
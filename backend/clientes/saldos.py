@@ -0,0 +1,164 @@
+"""
+Cuenta corriente denormalizada de clientes.
+
+``SaldoCliente`` guarda cantidad y total de ventas y total de pagos por
+cliente. ``Venta.save`` y ``PagoCliente.save`` restan la contribución anterior
+y suman la nueva dentro de la misma transacción, y las bajas se descuentan
+desde ``clientes.signals``; así ``Cliente.deuda`` y ``promedio_pedido`` se
+leen sin recorrer el historial. Cada ajuste actualiza también los
+comprobantes pendientes del cliente (``finanzas_reportes.cuentas_por_cobrar``).
+Las altas masivas (``ventas.lote``) usan ``aplicar_diferencias``, que ajusta
+e imputa a todos los clientes del lote con un número fijo de consultas.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, IntegerField, Sum, Value, When
+
+from .models import SaldoCliente
+from .perfil import invalidar_perfil
+
+# Clientes por UPDATE en ``aplicar_diferencias``
+TAMANO_BLOQUE = 200
+
+CAMPOS_SALDO = (
+    ('cantidad_ventas', IntegerField()),
+    ('total_ventas', DecimalField(max_digits=14, decimal_places=2)),
+    ('total_pagos', DecimalField(max_digits=14, decimal_places=2)),
+)
+
+
+def _monto(valor):
+    return Decimal(valor or 0).quantize(Decimal('0.01'))
+
+
+def aplicar_diferencia(cliente_id, cantidad_ventas=0, total_ventas=0, total_pagos=0, reimputar=False):
+    """
+    Suma las diferencias (pueden ser negativas) al saldo del cliente y
+    vuelve a imputar sus pagos a los comprobantes pendientes. Con
+    ``reimputar`` imputa aunque el saldo no cambie (una venta cambió de fecha).
+    """
+    from finanzas_reportes.cuentas_por_cobrar import imputar_cliente
+
+    if cantidad_ventas or total_ventas or total_pagos:
+        cambios = {
+            'cantidad_ventas': F('cantidad_ventas') + cantidad_ventas,
+            'total_ventas': F('total_ventas') + total_ventas,
+            'total_pagos': F('total_pagos') + total_pagos,
+        }
+        saldos = SaldoCliente.objects.filter(cliente_id=cliente_id)
+        if not saldos.update(**cambios):
+            try:
+                with transaction.atomic():
+                    SaldoCliente.objects.create(
+                        cliente_id=cliente_id, cantidad_ventas=cantidad_ventas,
+                        total_ventas=total_ventas, total_pagos=total_pagos
+                    )
+            except IntegrityError:
+                # Otra transacción creó el saldo mientras tanto
+                saldos.update(**cambios)
+    elif not reimputar:
+        return
+    imputar_cliente(cliente_id)
+    # Después de escribir: fuera de una transacción on_commit corre en el acto
+    invalidar_perfil(cliente_id)
+
+
+def aplicar_diferencias(diferencias, desde=None):
+    """
+    ``aplicar_diferencia`` para muchos clientes. ``diferencias`` es
+    ``{cliente_id: (cantidad_ventas, total_ventas, total_pagos)}`` y ``desde``
+    ``{cliente_id: fecha}`` con la venta más vieja que cambió de cada uno
+    (ver ``imputar_clientes``). Crea los saldos que faltan con un INSERT y
+    ajusta los existentes con un UPDATE por bloque de ``TAMANO_BLOQUE``.
+    """
+    from finanzas_reportes.cuentas_por_cobrar import imputar_clientes
+
+    diferencias = {cliente_id: valores for cliente_id, valores in diferencias.items() if any(valores)}
+    if not diferencias:
+        return
+    desde = desde or {}
+    ids = sorted(diferencias)
+    SaldoCliente.objects.bulk_create(
+        [SaldoCliente(cliente_id=cliente_id) for cliente_id in ids],
+        batch_size=TAMANO_BLOQUE, ignore_conflicts=True
+    )
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        bloque = ids[inicio:inicio + TAMANO_BLOQUE]
+        cambios = {}
+        for posicion, (campo, tipo) in enumerate(CAMPOS_SALDO):
+            valores = {cliente_id: diferencias[cliente_id][posicion] for cliente_id in bloque}
+            if any(valores.values()):
+                cambios[campo] = F(campo) + Case(
+                    *[When(cliente_id=cliente_id, then=Value(valor)) for cliente_id, valor in valores.items()],
+                    default=Value(0), output_field=tipo,
+                )
+        SaldoCliente.objects.filter(cliente_id__in=bloque).update(**cambios)
+    imputar_clientes({cliente_id: desde.get(cliente_id) for cliente_id in ids})
+    invalidar_perfil(*ids)
+
+
+def registrar_venta(venta, anterior=None):
+    """
+    Ajusta el saldo después de guardar ``venta``. ``anterior`` es la tupla
+    ``(cliente_id, total, fecha)`` previa, o ``None`` si la venta es nueva.
+    Un cambio de fecha no mueve el saldo pero sí qué ventas quedan pendientes.
+    """
+    total = _monto(venta.total)
+    if anterior is None:
+        aplicar_diferencia(venta.cliente_id, cantidad_ventas=1, total_ventas=total)
+        return
+
+    cliente_id, total_anterior, fecha_anterior = anterior
+    if cliente_id == venta.cliente_id:
+        fecha = venta._meta.get_field('fecha').to_python(venta.fecha)
+        aplicar_diferencia(
+            cliente_id, total_ventas=total - total_anterior, reimputar=fecha != fecha_anterior
+        )
+    else:
+        aplicar_diferencia(cliente_id, cantidad_ventas=-1, total_ventas=-total_anterior)
+        aplicar_diferencia(venta.cliente_id, cantidad_ventas=1, total_ventas=total)
+
+
+def quitar_venta(venta):
+    aplicar_diferencia(venta.cliente_id, cantidad_ventas=-1, total_ventas=-_monto(venta.total))
+
+
+def registrar_pago(pago, anterior=None):
+    """Igual que ``registrar_venta`` para un ``PagoCliente``"""
+    monto = _monto(pago.monto)
+    if anterior is None:
+        aplicar_diferencia(pago.cliente_id, total_pagos=monto)
+        return
+
+    cliente_id, monto_anterior = anterior
+    if cliente_id == pago.cliente_id:
+        aplicar_diferencia(cliente_id, total_pagos=monto - monto_anterior)
+    else:
+        aplicar_diferencia(cliente_id, total_pagos=-monto_anterior)
+        aplicar_diferencia(pago.cliente_id, total_pagos=monto)
+
+
+def quitar_pago(pago):
+    aplicar_diferencia(pago.cliente_id, total_pagos=-_monto(pago.monto))
+
+
+def saldos_desde_historial():
+    """
+    Recalcula los saldos desde ventas y pagos con dos consultas agrupadas.
+    Devuelve ``{cliente_id: (cantidad_ventas, total_ventas, total_pagos)}``.
+    """
+    from finanzas_reportes.models import PagoCliente
+    from ventas.models import Venta
+
+    saldos = {}
+    ventas = Venta.objects.order_by().values('cliente_id').annotate(cantidad=Count('id'), total=Sum('total'))
+    for fila in ventas:
+        saldos[fila['cliente_id']] = (fila['cantidad'], fila['total'] or Decimal('0'), Decimal('0'))
+
+    pagos = PagoCliente.objects.order_by().values('cliente_id').annotate(total=Sum('monto'))
+    for fila in pagos:
+        cantidad, total_ventas, _pagos = saldos.get(fila['cliente_id'], (0, Decimal('0'), Decimal('0')))
+        saldos[fila['cliente_id']] = (cantidad, total_ventas, fila['total'] or Decimal('0'))
+    return saldos
@@ -1,5 +1,6 @@
+from django.urls import reverse
 from rest_framework import serializers
-from .models import Cliente, Rubro
+from .models import Cliente, ImportacionClientes, Rubro
 
 
 class RubroSerializer(serializers.ModelSerializer):
@@ -19,7 +20,7 @@ class ClienteSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = [
-            'id', 'nombre', 'identificacion', 'direccion', 'telefono', 'correo',
+            'id', 'nombre', 'identificacion', 'sucursal', 'direccion', 'telefono', 'correo',
             'zona', 'tipo', 'limite_credito', 'rubro', 'rubro_nombre', 'activo', 'fecha_creacion', 
             'fecha_actualizacion', 'ultima_compra', 'deuda', 'promedio_pedido', 'saldo'
         ]
@@ -33,6 +34,28 @@ class ClienteListSerializer(serializers.ModelSerializer):
     class Meta:
         model = Cliente
         fields = [
-            'id', 'nombre', 'identificacion', 'telefono', 'correo',
+            'id', 'nombre', 'identificacion', 'sucursal', 'telefono', 'correo',
             'zona', 'tipo', 'limite_credito', 'rubro', 'rubro_nombre', 'activo', 'ultima_compra', 'deuda'
         ]
+
+
+class ImportacionClientesSerializer(serializers.ModelSerializer):
+    """Estado de una importación masiva de clientes"""
+    progreso = serializers.ReadOnlyField()
+    reporte_errores = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ImportacionClientes
+        fields = [
+            'id', 'nombre_archivo', 'estado', 'progreso', 'filas_procesadas', 'creados',
+            'actualizados', 'filas_con_error', 'mensaje', 'reporte_errores',
+            'fecha_creacion', 'fecha_inicio', 'fecha_fin'
+        ]
+        read_only_fields = fields
+
+    def get_reporte_errores(self, obj):
+        if not obj.filas_con_error:
+            return None
+        url = reverse('cliente-errores-importacion', kwargs={'importacion_id': obj.pk})
+        request = self.context.get('request')
+        return request.build_absolute_uri(url) if request else url
@@ -0,0 +1,41 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .arbol import invalidar_conteos
+from .perfil import invalidar_perfil
+from .saldos import quitar_pago, quitar_venta
+
+
+@receiver(post_delete, sender="ventas.Venta")
+def descontar_venta_del_saldo(sender, instance, **kwargs):
+    """Quita la venta eliminada del saldo del cliente"""
+    quitar_venta(instance)
+    invalidar_perfil(instance.cliente_id)
+
+
+@receiver(post_delete, sender="finanzas_reportes.PagoCliente")
+def descontar_pago_del_saldo(sender, instance, **kwargs):
+    """Quita el pago eliminado del saldo del cliente"""
+    quitar_pago(instance)
+    invalidar_perfil(instance.cliente_id)
+
+
+@receiver(post_save, sender="clientes.Cliente")
+def invalidar_arbol_al_guardar(sender, instance, created, update_fields=None, **kwargs):
+    """Altas y posibles cambios de nombre modifican los conteos por inicial"""
+    if created or update_fields is None or "nombre" in update_fields:
+        invalidar_conteos()
+    invalidar_perfil(instance.pk)
+
+
+@receiver(post_delete, sender="clientes.Cliente")
+def invalidar_arbol_al_eliminar(sender, instance, **kwargs):
+    invalidar_conteos()
+    invalidar_perfil(instance.pk)
+
+
+@receiver(post_save, sender="ventas.Venta")
+@receiver(post_save, sender="finanzas_reportes.PagoCliente")
+def invalidar_perfil_del_cliente(sender, instance, **kwargs):
+    """El cliente anterior de una venta o pago reasignado lo invalida clientes.saldos"""
+    invalidar_perfil(instance.cliente_id)
@@ -1,3 +1,370 @@
-from django.test import TestCase
+import csv
+import tempfile
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.http import StreamingHttpResponse
+from rest_framework.test import APIClient
+
+from finanzas_reportes.models import PagoCliente
+from productos.models import Producto
+from ventas.models import LineaVenta, Venta
+from .importacion import procesar_importacion
+from .models import (
+    CalculoRecomendaciones, Cliente, ImportacionClientes, ProductoRelacionado, RecomendacionCliente, Rubro,
+    SaldoCliente,
+)
+from .perfil import clave_perfil
+from .recomendaciones import calcular_recomendaciones
+
+
+class ExportarClientesTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.lacteos = Cliente.objects.create(nombre='Lácteos del Sur', identificacion='20-1', zona='Centro')
+        self.kiosco = Cliente.objects.create(nombre='Kiosco Ana', identificacion='20-2', zona='Norte')
+        Venta.objects.create(cliente=self.lacteos, total=Decimal('1000'))
+        Venta.objects.create(cliente=self.lacteos, total=Decimal('500'))
+        PagoCliente.objects.create(cliente=self.lacteos, monto=Decimal('400'))
+        PagoCliente.objects.create(cliente=self.kiosco, monto=Decimal('50'))
+
+    def exportar(self, url='/api/clientes/exportar/'):
+        respuesta = self.client.post(url)
+        self.assertIsInstance(respuesta, StreamingHttpResponse)
+        with CaptureQueriesContext(connection) as consultas:
+            contenido = b''.join(respuesta.streaming_content).decode('utf-8')
+        return list(csv.DictReader(contenido.splitlines())), len(consultas)
+
+    def test_deuda_se_calcula_en_la_consulta(self):
+        filas, consultas = self.exportar()
+        self.assertEqual(consultas, 1)
+        deudas = {fila['nombre']: Decimal(fila['deuda']) for fila in filas}
+        self.assertEqual(deudas, {'Kiosco Ana': Decimal('0'), 'Lácteos del Sur': Decimal('1100')})
+
+    def test_respeta_los_filtros_del_listado(self):
+        filas, _consultas = self.exportar('/api/clientes/exportar/?zona=Norte')
+        self.assertEqual([fila['nombre'] for fila in filas], ['Kiosco Ana'])
+
+
+class SaldoClienteTests(TestCase):
+    def setUp(self):
+        self.cliente = Cliente.objects.create(nombre='Almacén Don Pepe', identificacion='30-1')
+        self.otro = Cliente.objects.create(nombre='Pizzería Roma', identificacion='30-2')
+
+    def saldo(self, cliente):
+        cliente = Cliente.objects.select_related('cuenta').get(pk=cliente.pk)
+        return cliente.deuda, cliente.promedio_pedido
+
+    def test_sigue_ventas_y_pagos(self):
+        venta = Venta.objects.create(cliente=self.cliente, total=Decimal('300'))
+        Venta.objects.create(cliente=self.cliente, total=Decimal('100'))
+        pago = PagoCliente.objects.create(cliente=self.cliente, monto=Decimal('150'))
+        self.assertEqual(self.saldo(self.cliente), (Decimal('250'), Decimal('200.00')))
+
+        venta.total = Decimal('500')
+        venta.save(update_fields=['total'])
+        pago.cliente = self.otro
+        pago.save()
+        self.assertEqual(self.saldo(self.cliente), (Decimal('600'), Decimal('300.00')))
+        self.assertEqual(self.saldo(self.otro), (Decimal('0'), Decimal('0')))
+
+        venta.delete()
+        pago.delete()
+        self.assertEqual(self.saldo(self.cliente), (Decimal('100'), Decimal('100.00')))
+
+    def test_listado_no_consulta_por_fila(self):
+        for i in range(15):
+            cliente = Cliente.objects.create(nombre=f'Cliente {i:02}', identificacion=f'40-{i}')
+            Venta.objects.create(cliente=cliente, total=Decimal('10'))
+        with self.assertNumQueries(2):
+            respuesta = APIClient().get('/api/clientes/')
+        self.assertEqual(respuesta.status_code, 200)
+
+    def test_reconciliar_desde_historial(self):
+        Venta.objects.create(cliente=self.cliente, total=Decimal('80'))
+        PagoCliente.objects.create(cliente=self.otro, monto=Decimal('20'))
+        SaldoCliente.objects.update(total_ventas=0, total_pagos=0, cantidad_ventas=5)
+
+        salida = StringIO()
+        call_command('reconciliar_saldos_clientes', stdout=salida)
+        self.assertIn('2 corregidos', salida.getvalue())
+        self.assertEqual(self.saldo(self.cliente), (Decimal('80'), Decimal('80.00')))
+        cuenta = SaldoCliente.objects.get(cliente=self.otro)
+        self.assertEqual((cuenta.cantidad_ventas, cuenta.total_pagos), (0, Decimal('20')))
+
+
+class BusquedaClientesTests(TestCase):
+    def setUp(self):
+        self.pena = Cliente.objects.create(
+            nombre='Lácteos Peña', identificacion='20-31234567-8', telefono='351 555-0101', zona='Córdoba'
+        )
+        self.sur = Cliente.objects.create(nombre='Distribuidora del Sur', identificacion='30-1', correo='ventas@delsur.com')
+        self.pena_sur = Cliente.objects.create(nombre='Pena Sur Almacén', identificacion='30-2')
+
+    def buscar(self, texto):
+        respuesta = APIClient().get('/api/clientes/', {'search': texto})
+        return [cliente['nombre'] for cliente in respuesta.json()['results']]
+
+    def test_sin_acentos_y_por_prefijo(self):
+        self.assertEqual(set(self.buscar('pena')), {'Lácteos Peña', 'Pena Sur Almacén'})
+        self.assertEqual(self.buscar('LACT peñ'), ['Lácteos Peña'])
+        self.assertEqual(self.buscar('cordoba'), ['Lácteos Peña'])
+        self.assertEqual(self.buscar('delsur'), ['Distribuidora del Sur'])
+
+    def test_identificacion_y_telefono_sin_separadores(self):
+        self.assertEqual(self.buscar('2031234'), ['Lácteos Peña'])
+        self.assertEqual(self.buscar('3515550101'), ['Lácteos Peña'])
+
+    def test_indice_sigue_cambios_y_bajas(self):
+        self.sur.nombre = 'Mayorista Atlántico'
+        self.sur.save(update_fields=['nombre'])
+        self.assertEqual(self.buscar('atlantico'), ['Mayorista Atlántico'])
+        self.assertEqual(self.buscar('distribuidora'), [])
+
+        self.pena.delete()
+        self.assertEqual(self.buscar('pena'), ['Pena Sur Almacén'])
+
+    def test_ordenamiento_explicito_tiene_prioridad(self):
+        respuesta = APIClient().get('/api/clientes/', {'search': 'pena', 'ordering': '-nombre'})
+        self.assertEqual([c['nombre'] for c in respuesta.json()['results']], ['Pena Sur Almacén', 'Lácteos Peña'])
+
+
+class ArbolClientesTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        for nombre in ['Ana', 'Almacén Sur', 'Beto', 'Bar Norte', 'Bodega']:
+            Cliente.objects.create(nombre=nombre, identificacion=nombre[:3])
+
+    def test_letras_con_conteos_en_cache(self):
+        with self.assertNumQueries(1):
+            respuesta = self.client.get('/api/clientes/tree/')
+        self.assertEqual(respuesta.json(), [{'label': 'A', 'total': 2}, {'label': 'B', 'total': 3}])
+        with self.assertNumQueries(0):
+            self.client.get('/api/clientes/tree/')
+
+    def test_sin_cache_compartida_los_conteos_duran_poco(self):
+        with self.settings(CACHE_COMPARTIDA=False, CACHE_LOCAL_SEGUNDOS=0):
+            self.client.get('/api/clientes/tree/')
+            with self.assertNumQueries(1):
+                self.client.get('/api/clientes/tree/')
+        with self.settings(CACHE_COMPARTIDA=True, CACHE_LOCAL_SEGUNDOS=0):
+            self.client.get('/api/clientes/tree/')
+            with self.assertNumQueries(0):
+                self.client.get('/api/clientes/tree/')
+
+    def test_conteos_se_invalidan(self):
+        self.client.get('/api/clientes/tree/')
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente = Cliente.objects.create(nombre='Carla', identificacion='C1')
+        self.assertEqual(self.client.get('/api/clientes/tree/').json()[-1], {'label': 'C', 'total': 1})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            cliente.nombre = 'Ana María'
+            cliente.save(update_fields=['nombre'])
+        self.assertEqual(self.client.get('/api/clientes/tree/').json()[0], {'label': 'A', 'total': 3})
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Cliente.objects.filter(nombre__startswith='B').delete()
+        self.assertEqual([g['label'] for g in self.client.get('/api/clientes/tree/').json()], ['A'])
+
+    def test_clientes_de_una_letra_por_cursor(self):
+        respuesta = self.client.get('/api/clientes/tree/B/', {'page_size': 2}).json()
+        self.assertEqual([c['label'] for c in respuesta['results']], ['Bar Norte', 'Beto'])
+        siguiente = self.client.get(respuesta['next']).json()
+        self.assertEqual([c['label'] for c in siguiente['results']], ['Bodega'])
+        self.assertIsNone(siguiente['next'])
+
+    def test_busqueda_no_usa_la_cache(self):
+        respuesta = self.client.get('/api/clientes/tree/', {'search': 'norte'})
+        self.assertEqual(respuesta.json(), [{'label': 'B', 'total': 1}])
+        self.assertEqual(self.client.get('/api/clientes/tree/').json()[1]['total'], 3)
+
+
+@override_settings(MEDIA_ROOT=tempfile.mkdtemp())
+class ImportacionClientesTests(TestCase):
+    def subir(self, contenido):
+        archivo = SimpleUploadedFile('clientes.csv', contenido.encode('utf-8'), content_type='text/csv')
+        with self.captureOnCommitCallbacks() as callbacks:
+            respuesta = APIClient().post('/api/clientes/importar/', {'file': archivo}, format='multipart')
+        self.assertEqual(respuesta.status_code, 202)
+        self.assertEqual(len(callbacks), 1)  # El hilo se lanza al confirmar
+        return respuesta.json()['id']
+
+    def test_upsert_por_lotes_con_reporte_de_errores(self):
+        existente = Cliente.objects.create(nombre='Viejo nombre', identificacion='20-1', sucursal='Norte')
+        importacion_id = self.subir(
+            'nombre,identificacion,sucursal,telefono,zona,limite_credito,activo\n'
+            'Lácteos Peña Norte,20-1,Norte,351 555,Córdoba,1500,true\n'
+            'Lácteos Peña Sur,20-1,Sur,,Córdoba,,\n'
+            'Sin identificacion,,,,,,\n'
+            'Kiosco Ana,20-2,,,Centro,abc,true\n'
+            'Kiosco Ana (corregido),20-2,,,Centro,10,no\n'
+        )
+        procesar_importacion(importacion_id, lote=2)
+
+        estado = APIClient().get(f'/api/clientes/importaciones/{importacion_id}/').json()
+        self.assertEqual(estado['estado'], 'terminada')
+        self.assertEqual(estado['progreso'], 100)
+        self.assertEqual(
+            (estado['filas_procesadas'], estado['creados'], estado['actualizados'], estado['filas_con_error']),
+            (5, 2, 1, 2)
+        )
+
+        existente.refresh_from_db()
+        self.assertEqual((existente.nombre, existente.limite_credito), ('Lácteos Peña Norte', Decimal('1500')))
+        self.assertEqual(Cliente.objects.filter(identificacion='20-1').count(), 2)
+        kiosco = Cliente.objects.get(identificacion='20-2')
+        self.assertEqual((kiosco.nombre, kiosco.activo), ('Kiosco Ana (corregido)', False))
+        nombres = [c['nombre'] for c in APIClient().get('/api/clientes/', {'search': 'pena'}).json()['results']]
+        self.assertEqual(sorted(nombres), ['Lácteos Peña Norte', 'Lácteos Peña Sur'])
+
+        respuesta = APIClient().get(estado['reporte_errores'])
+        filas = list(csv.DictReader(b''.join(respuesta.streaming_content).decode('utf-8').splitlines()))
+        self.assertEqual([fila['fila'] for fila in filas], ['4', '5'])
+        self.assertIn('identificacion', filas[0]['error'])
+        self.assertIn('limite_credito', filas[1]['error'])
+
+    def test_archivo_sin_columnas_requeridas(self):
+        importacion_id = self.subir('nombre,telefono\nAna,123\n')
+        with self.assertLogs('clientes.importacion', 'WARNING'):
+            procesar_importacion(importacion_id)
+        importacion = ImportacionClientes.objects.get(pk=importacion_id)
+        self.assertEqual(importacion.estado, 'fallida')
+        self.assertIn('identificacion', importacion.mensaje)
+        self.assertFalse(Cliente.objects.exists())
+
+    def test_reintentar_es_idempotente(self):
+        importacion_id = self.subir('nombre,identificacion\nAna,1\nBeto,2\n')
+        for _ in range(2):
+            ImportacionClientes.objects.filter(pk=importacion_id).update(estado='fallida')
+            call_command('procesar_importaciones_clientes', '--reintentar', stdout=StringIO())
+        self.assertEqual(Cliente.objects.count(), 2)
+        self.assertEqual(ImportacionClientes.objects.get(pk=importacion_id).actualizados, 2)
+
+
+class PerfilClienteTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.cliente = Cliente.objects.create(nombre='Almacén Norte', identificacion='50-1')
+        for i in range(60):
+            Venta.objects.create(cliente=self.cliente, total=Decimal('10'))
+            PagoCliente.objects.create(cliente=self.cliente, monto=Decimal('4'), medio='CHEQUE')
+        self.url = f'/api/clientes/{self.cliente.pk}/perfil/'
+
+    def test_consultas_fijas_y_totales_del_saldo(self):
+        with self.settings(CLIENTES_PERFIL_CACHE_SEGUNDOS=0), self.assertNumQueries(3):
+            perfil = APIClient().get(self.url).json()
+        self.assertEqual((len(perfil['historial_ventas']), len(perfil['pagos'])), (50, 50))
+        self.assertEqual(perfil['pagos'][0]['medio'], 'CHEQUE')
+        self.assertEqual(
+            (perfil['total_ventas'], perfil['total_pagos'], perfil['saldo']),
+            ('600.00', '240.00', '360.00')
+        )
+        self.assertEqual(perfil['cliente']['deuda'], Decimal('360'))
+
+    def test_cache_se_invalida_con_ventas_y_pagos(self):
+        with self.settings(CLIENTES_PERFIL_CACHE_SEGUNDOS=60):
+            APIClient().get(self.url)
+            # Solo el cliente: la caché se consulta después de get_object()
+            with self.assertNumQueries(1):
+                APIClient().get(self.url)
+
+            with self.captureOnCommitCallbacks(execute=True):
+                Venta.objects.create(cliente=self.cliente, total=Decimal('100'))
+            self.assertEqual(APIClient().get(self.url).json()['total_ventas'], '700.00')
+
+            with self.captureOnCommitCallbacks(execute=True):
+                PagoCliente.objects.filter(cliente=self.cliente).first().delete()
+            self.assertEqual(APIClient().get(self.url).json()['total_pagos'], '236.00')
+
+
+    def test_cliente_borrado_no_sale_de_la_cache(self):
+        # Perfil que otro worker guardó antes de que se borrara el cliente
+        cache.set(clave_perfil(self.cliente.pk + 1), {'cliente': {}}, 60)
+        with self.settings(CLIENTES_PERFIL_CACHE_SEGUNDOS=60):
+            respuesta = APIClient().get(f'/api/clientes/{self.cliente.pk + 1}/perfil/')
+        self.assertEqual(respuesta.status_code, 404)
+
+
+class RecomendacionesTests(TestCase):
+    def setUp(self):
+        self.productos = {
+            nombre: Producto.objects.create(nombre=nombre, sku=nombre[:3].upper(), stock=Decimal('10'))
+            for nombre in ['Muzzarella 1kg', 'Provoleta', 'Ricota 500g', 'Manteca 500g', 'Queso Cremoso']
+        }
+        pizzeria = Rubro.objects.create(nombre='Pizzería')
+        self.kiosco_rubro = Rubro.objects.create(nombre='Kiosco')
+        self.pizzerias = [
+            Cliente.objects.create(nombre=f'Pizzería {i}', identificacion=f'60-{i}', rubro=pizzeria) for i in range(3)
+        ]
+        self.kiosco = Cliente.objects.create(nombre='Kiosco Sol', identificacion='61-1', rubro=self.kiosco_rubro)
+        self.nueva = Cliente.objects.create(nombre='Pizzería Nueva', identificacion='60-9', rubro=pizzeria)
+        self.vender(self.pizzerias[0], 'Muzzarella 1kg', 'Provoleta')
+        self.vender(self.pizzerias[1], 'Muzzarella 1kg', 'Provoleta', 'Muzzarella 1kg')
+        self.vender(self.pizzerias[2], 'Muzzarella 1kg')
+        # Línea cargada sin producto: se identifica por la descripción
+        venta = Venta.objects.create(cliente=self.kiosco, total=Decimal('10'))
+        LineaVenta.objects.create(venta=venta, descripcion='MANTECA 500G', precio_unitario=Decimal('10'))
+
+    def vender(self, cliente, *nombres):
+        venta = Venta.objects.create(cliente=cliente, total=Decimal('10'))
+        for nombre in nombres:
+            LineaVenta.objects.create(venta=venta, descripcion=nombre, producto=self.productos[nombre])
+
+    def sugeridos(self, url):
+        return [producto['nombre'] for producto in APIClient().get(url).json()]
+
+    def test_recompra_y_productos_relacionados(self):
+        calculo = calcular_recomendaciones()
+        self.assertEqual((calculo.clientes, calculo.productos), (4, 3))
+        relacionados = ProductoRelacionado.objects.filter(producto=self.productos['Muzzarella 1kg'])
+        self.assertEqual([r.relacionado.nombre for r in relacionados], ['Provoleta'])
+
+        url = f'/api/clientes/{self.pizzerias[2].pk}/productos-sugeridos/'
+        with self.assertNumQueries(1):
+            self.assertEqual(self.sugeridos(url), ['Muzzarella 1kg', 'Provoleta'])
+        self.assertEqual(self.sugeridos(f'/api/clientes/{self.kiosco.pk}/productos-sugeridos/'), ['Manteca 500g'])
+
+    def test_sin_historial_usa_el_rubro_y_luego_el_general(self):
+        calcular_recomendaciones()
+        self.assertEqual(
+            self.sugeridos(f'/api/clientes/{self.nueva.pk}/productos-sugeridos/'), ['Muzzarella 1kg', 'Provoleta']
+        )
+        sin_rubro = Cliente.objects.create(nombre='Almacén', identificacion='62-1')
+        self.assertEqual(
+            self.sugeridos(f'/api/clientes/{sin_rubro.pk}/productos-sugeridos/'),
+            ['Muzzarella 1kg', 'Manteca 500g', 'Provoleta']
+        )
+        self.productos['Provoleta'].activo = False
+        self.productos['Provoleta'].save()
+        self.assertEqual(
+            self.sugeridos(f'/api/clientes/productos-sugeridos/?rubro={self.kiosco_rubro.pk}'), ['Manteca 500g']
+        )
+
+    def test_ids_invalidos(self):
+        api = APIClient()
+        self.assertEqual(api.get('/api/clientes/productos-sugeridos/?rubro=abc').status_code, 400)
+        self.assertEqual(api.get('/api/clientes/abc/productos-sugeridos/').status_code, 404)
+        ultimo = Cliente.objects.order_by('-pk').first().pk
+        self.assertEqual(api.get(f'/api/clientes/{ultimo + 1}/productos-sugeridos/').status_code, 404)
+
+    def test_incremental_solo_recalcula_clientes_con_ventas_nuevas(self):
+        calcular_recomendaciones()
+        self.vender(self.kiosco, 'Ricota 500g')
+
+        salida = StringIO()
+        call_command('calcular_recomendaciones', '--incremental', stdout=salida)
+        self.assertIn('incremental', salida.getvalue())
+        self.assertEqual(CalculoRecomendaciones.objects.first().clientes, 1)
+        self.assertEqual(
+            set(self.sugeridos(f'/api/clientes/{self.kiosco.pk}/productos-sugeridos/')),
+            {'Manteca 500g', 'Ricota 500g'}
+        )
+        self.assertEqual(RecomendacionCliente.objects.filter(cliente=self.pizzerias[0]).count(), 2)
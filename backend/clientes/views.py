@@ -1,31 +1,42 @@
 from decimal import Decimal
-import csv
 import json
-from io import StringIO
 
-from django.apps import apps
-from django.db.models import Sum, Q
-from django.db.models.functions import Substr, Upper
-from django.http import HttpResponse
+from django.core.cache import cache
+from django.http import Http404
+from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.db.models import DecimalField, Value, prefetch_related_objects
+from django.db.models.functions import Coalesce, Greatest
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.parsers import MultiPartParser
 
-from .models import Cliente, Rubro
-from .serializers import ClienteSerializer, ClienteListSerializer, RubroSerializer
+from core.condicional import GetCondicionalMixin
+from core.exportacion import Columna, ExportacionCSVMixin
+from finanzas_reportes.models import ComprobantePendiente
 
+from .arbol import PaginacionArbol, clientes_de_inicial, conteos_en_cache, conteos_por_inicial
+from .busqueda import BusquedaClienteFilter
+from .importacion import iniciar_en_segundo_plano
+from .models import Cliente, ImportacionClientes, Rubro
+from .perfil import armar_perfil, clave_perfil, duracion_cache, prefetch_perfil
+from .recomendaciones import LIMITE_SUGERIDOS, productos_sugeridos
+from .serializers import (
+    ClienteSerializer, ClienteListSerializer, ImportacionClientesSerializer, RubroSerializer,
+)
 
-class ClienteViewSet(viewsets.ModelViewSet):
-    queryset = Cliente.objects.all()
+
+class ClienteViewSet(ExportacionCSVMixin, viewsets.ModelViewSet):
+    queryset = Cliente.objects.select_related("rubro", "cuenta")
     serializer_class = ClienteSerializer
     permission_classes = []
+    lookup_value_regex = r"\d+"
 
-    # Filtros, búsqueda y orden
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    # Filtros, búsqueda y orden (la búsqueda va última: ordena por relevancia)
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, BusquedaClienteFilter]
     filterset_fields = ["identificacion", "tipo", "zona", "activo"]
-    search_fields = ["nombre", "correo", "telefono", "identificacion"]
     ordering_fields = ["nombre", "identificacion", "fecha_creacion", "ultima_compra"]
     ordering = ["nombre"]
 
@@ -35,109 +46,95 @@ class ClienteViewSet(viewsets.ModelViewSet):
             return ClienteListSerializer
         return ClienteSerializer
 
-    def get_queryset(self):
-        """Filtros adicionales para el queryset"""
-        queryset = super().get_queryset()
-        
-        # Filtro por búsqueda general
-        search = self.request.query_params.get('search', None)
-        if search:
-            queryset = queryset.filter(
-                Q(nombre__icontains=search) |
-                Q(identificacion__icontains=search) |
-                Q(telefono__icontains=search) |
-                Q(correo__icontains=search) |
-                Q(zona__icontains=search)
-            )
-        
-        return queryset
-
-    # Acción personalizada para TreeView
+    # Acciones para el TreeView: letras con conteos y clientes de cada letra
     @action(detail=False, methods=["get"], url_path="tree")
     def tree(self, request):
-        """Devuelve datos agrupados para armar un TreeView agrupado por inicial del nombre."""
-        qs = self.get_queryset().annotate(inicial=Upper(Substr("nombre", 1, 1)))
-        grupos = {}
-
-        for cliente in qs.values("id", "nombre", "identificacion", "correo", "inicial"):
-            key = cliente["inicial"] or "#"
-            grupos.setdefault(key, []).append(
-                {
-                    "id": cliente["id"],
-                    "label": cliente["nombre"],
-                    "identificacion": cliente["identificacion"],
-                    "correo": cliente["correo"] or "",
-                }
-            )
+        """Letras iniciales con la cantidad de clientes de cada una."""
+        if request.query_params:
+            # Con búsqueda o filtros los conteos dependen de la consulta
+            return Response(conteos_por_inicial(self.filter_queryset(self.get_queryset())))
+        return Response(conteos_en_cache(self.get_queryset()))
 
-        tree = [
-            {"label": initial, "children": sorted(children, key=lambda item: item["label"])}
-            for initial, children in sorted(grupos.items(), key=lambda item: item[0])
-        ]
-        return Response(tree)
+    @action(detail=False, methods=["get"], url_path=r"tree/(?P<letra>[^/]+)")
+    def tree_clientes(self, request, letra=None):
+        """Clientes de una letra del TreeView, paginados por cursor sobre el nombre."""
+        qs = clientes_de_inicial(self.filter_queryset(self.get_queryset()), letra)
+        paginador = PaginacionArbol()
+        pagina = paginador.paginate_queryset(
+            qs.values("id", "nombre", "identificacion", "correo"), request, view=self
+        )
+        return paginador.get_paginated_response([
+            {
+                "id": cliente["id"],
+                "label": cliente["nombre"],
+                "identificacion": cliente["identificacion"],
+                "correo": cliente["correo"] or "",
+            }
+            for cliente in pagina
+        ])
 
     @action(detail=True, methods=["get"], url_path="perfil")
     def perfil(self, request, pk=None):
+        """Perfil 360 del cliente en tres consultas (ver clientes.perfil), con caché opcional"""
+        # Primero el cliente: el 404 y los permisos no dependen de la caché
         cliente = self.get_object()
-        data = ClienteSerializer(cliente).data
-
-        ventas = []
-        compras = []
-        pagos = []
-        total_ventas = Decimal("0")
-        total_compras = Decimal("0")
-        total_pagos = Decimal("0")
+        duracion = duracion_cache()
+        if duracion:
+            guardado = cache.get(clave_perfil(cliente.pk))
+            if guardado is not None:
+                return Response(guardado)
 
-        Venta = apps.get_model("ventas", "Venta")
-        if Venta is not None:
-            ventas_qs = Venta.objects.filter(cliente=cliente).order_by("-fecha", "-id")
-            ventas = [
-                {"id": venta.id, "fecha": venta.fecha, "total": str(venta.total)}
-                for venta in ventas_qs[:50]
-            ]
-            aggregated = ventas_qs.aggregate(total=Sum("total"))
-            total_ventas = aggregated["total"] or Decimal("0")
+        prefetch_related_objects([cliente], *prefetch_perfil())
+        perfil = armar_perfil(cliente, ClienteSerializer(cliente).data)
+        if duracion:
+            cache.set(clave_perfil(cliente.pk), perfil, duracion)
+        return Response(perfil)
 
-        Compra = apps.get_model("compras", "Compra")
-        if Compra is not None:
-            compras_qs = Compra.objects.filter(cliente=cliente).order_by("-fecha", "-id")
-            compras = [
-                {"id": compra.id, "fecha": compra.fecha, "total": str(getattr(compra, "total", Decimal("0")))}
-                for compra in compras_qs[:50]
-            ]
-            if hasattr(Compra, "total"):
-                total_compras_value = compras_qs.aggregate(total=Sum("total"))
-                total_compras = total_compras_value["total"] or Decimal("0")
+    @action(detail=True, methods=["get"], url_path="comprobantes-pendientes")
+    def comprobantes_pendientes(self, request, pk=None):
+        """Ventas del cliente que los pagos todavía no cubren, de la más antigua a la más nueva"""
+        cliente = self.get_object()
+        hoy = timezone.localdate()
+        comprobantes = [
+            {
+                "venta": pendiente["venta_id"],
+                "numero": pendiente["venta__numero"],
+                "fecha": pendiente["fecha"],
+                "dias": (hoy - pendiente["fecha"]).days,
+                "total": str(pendiente["total"]),
+                "saldo": str(pendiente["saldo"]),
+            }
+            for pendiente in ComprobantePendiente.objects.filter(cliente=cliente)
+            .order_by("fecha", "venta_id")
+            .values("venta_id", "venta__numero", "fecha", "total", "saldo")
+        ]
+        return Response(comprobantes)
 
-        PagoCliente = apps.get_model("finanzas_reportes", "PagoCliente")
-        if PagoCliente is not None:
-            pagos_qs = PagoCliente.objects.filter(cliente=cliente).order_by("-fecha", "-id")
-            pagos = [
-                {
-                    "id": pago.id,
-                    "fecha": pago.fecha,
-                    "monto": str(pago.monto),
-                    "medio": pago.medio,
-                }
-                for pago in pagos_qs[:50]
-            ]
-            total_pagos_value = pagos_qs.aggregate(total=Sum("monto"))
-            total_pagos = total_pagos_value["total"] or Decimal("0")
+    def _limite_sugeridos(self, request):
+        try:
+            return max(1, min(int(request.query_params.get("limite", LIMITE_SUGERIDOS)), 50))
+        except ValueError:
+            return LIMITE_SUGERIDOS
 
-        saldo = (total_ventas - total_pagos) if (total_ventas or total_pagos) else Decimal("0")
+    @action(detail=False, methods=["get"], url_path="productos-sugeridos", permission_classes=[])
+    def productos_sugeridos(self, request):
+        """Productos sugeridos para venta rápida (generales o de un ``rubro``)"""
+        rubro_id = request.query_params.get("rubro") or None
+        if rubro_id is not None:
+            try:
+                rubro_id = int(rubro_id)
+            except ValueError:
+                return Response({"error": "rubro debe ser un número"}, status=status.HTTP_400_BAD_REQUEST)
+        return Response(productos_sugeridos(rubro_id=rubro_id, limite=self._limite_sugeridos(request)))
 
-        return Response(
-            {
-                "cliente": data,
-                "historial_ventas": ventas,
-                "historial_compras": compras,
-                "pagos": pagos,
-                "saldo": str(saldo.quantize(Decimal("0.01")) if isinstance(saldo, Decimal) else saldo),
-                "total_ventas": str(total_ventas),
-                "total_compras": str(total_compras),
-                "total_pagos": str(total_pagos),
-            }
-        )
+    @action(detail=True, methods=["get"], url_path="productos-sugeridos", permission_classes=[])
+    def productos_sugeridos_cliente(self, request, pk=None):
+        """Productos sugeridos para un cliente según su historial (ver clientes.recomendaciones)"""
+        try:
+            sugeridos = productos_sugeridos(cliente_id=pk, limite=self._limite_sugeridos(request))
+        except Cliente.DoesNotExist:
+            raise Http404
+        return Response(sugeridos)
 
     @action(detail=False, methods=["post"], url_path="venta-rapida")
     def venta_rapida(self, request):
@@ -176,8 +173,73 @@ class ClienteViewSet(viewsets.ModelViewSet):
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
 
+    @action(detail=False, methods=["post"], url_path="exportar")
+    def exportar(self, request):
+        """Exportar clientes a CSV (en streaming, con los filtros del listado)"""
+        cero = Value(Decimal("0"))
+        queryset = self.filter_queryset(self.get_queryset()).annotate(
+            deuda_calculada=Greatest(
+                Coalesce("cuenta__total_ventas", cero) - Coalesce("cuenta__total_pagos", cero),
+                cero,
+                output_field=DecimalField()
+            )
+        )
+        return self.respuesta_csv("clientes.csv", [
+            Columna("nombre", "nombre"),
+            Columna("identificacion", "identificacion"),
+            Columna("sucursal", "sucursal"),
+            Columna("telefono", "telefono"),
+            Columna("correo", "correo"),
+            Columna("direccion", "direccion"),
+            Columna("zona", "zona"),
+            Columna("tipo", "tipo"),
+            Columna("limite_credito", "limite_credito"),
+            Columna("activo", "activo"),
+            Columna("deuda", "deuda_calculada"),
+        ], queryset=queryset)
+
+    @action(detail=False, methods=["post"], url_path="importar", parser_classes=[MultiPartParser])
+    def importar(self, request):
+        """Importar clientes desde CSV en segundo plano; devuelve la importación para seguir su avance"""
+        archivo = request.FILES.get('file')
+        if not archivo:
+            return Response(
+                {"error": "Archivo requerido"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        importacion = ImportacionClientes.objects.create(
+            archivo=archivo,
+            nombre_archivo=archivo.name,
+            tamano=archivo.size,
+            usuario=request.user if request.user.is_authenticated else None,
+        )
+        iniciar_en_segundo_plano(importacion)
+        serializer = ImportacionClientesSerializer(importacion, context={'request': request})
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=False, methods=["get"], url_path=r"importaciones/(?P<importacion_id>\d+)")
+    def importacion(self, request, importacion_id=None):
+        """Estado y avance de una importación"""
+        importacion = get_object_or_404(ImportacionClientes, pk=importacion_id)
+        return Response(ImportacionClientesSerializer(importacion, context={'request': request}).data)
+
+    @action(detail=False, methods=["get"], url_path=r"importaciones/(?P<importacion_id>\d+)/errores")
+    def errores_importacion(self, request, importacion_id=None):
+        """Reporte CSV con las filas rechazadas de una importación"""
+        importacion = get_object_or_404(ImportacionClientes, pk=importacion_id)
+        return self.respuesta_csv(
+            f'errores_importacion_{importacion.pk}.csv',
+            [
+                Columna('fila', 'fila'),
+                Columna('identificacion', 'identificacion'),
+                Columna('error', 'mensaje'),
+            ],
+            queryset=importacion.errores.all(),
+        )
+
 
-class RubroViewSet(viewsets.ModelViewSet):
+class RubroViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     """
     ViewSet para gestionar los rubros/tipos de negocio de los clientes.
     Permite crear, leer, actualizar y eliminar rubros de forma dinámica.
@@ -284,174 +346,3 @@ class RubroViewSet(viewsets.ModelViewSet):
                 {"error": str(e)}, 
                 status=status.HTTP_500_INTERNAL_SERVER_ERROR
             )
-
-    @action(detail=False, methods=["get"], url_path="productos-sugeridos", permission_classes=[])
-    def productos_sugeridos(self, request):
-        """Obtener productos sugeridos para venta rápida"""
-        # Devolver productos de ejemplo para demostración
-        productos = [
-            {"id": "1", "nombre": "Muzzarella Plancha 10kg", "precio": 15500.00, "stock": 50},
-            {"id": "2", "nombre": "Muzzarella Cilindro 1kg", "precio": 1650.00, "stock": 100},
-            {"id": "3", "nombre": "Muzzarella Cilindro 3kg", "precio": 4800.00, "stock": 75},
-            {"id": "4", "nombre": "Queso Cremoso 500g", "precio": 1450.00, "stock": 80},
-            {"id": "5", "nombre": "Queso Provoleta 1kg", "precio": 2200.00, "stock": 60},
-            {"id": "6", "nombre": "Ricota Fresca 500g", "precio": 980.00, "stock": 90},
-            {"id": "7", "nombre": "Queso Sardo 1kg", "precio": 2800.00, "stock": 40},
-            {"id": "8", "nombre": "Manteca 500g", "precio": 1200.00, "stock": 120},
-        ]
-        
-        try:
-            # Intentar obtener productos reales desde la base de datos si están disponibles
-            Producto = apps.get_model('productos', 'Producto')
-            productos_db = Producto.objects.filter(activo=True, stock__gt=0).order_by('-stock')[:10]
-            
-            if productos_db.exists():
-                productos_reales = []
-                for producto in productos_db:
-                    productos_reales.append({
-                        "id": str(producto.id),
-                        "nombre": producto.nombre,
-                        "precio": float(producto.precio),
-                        "stock": float(producto.stock)
-                    })
-                return Response(productos_reales)
-        except Exception:
-            # Si hay algún error con la base de datos, usar los datos de ejemplo
-            pass
-            
-        return Response(productos)
-
-    @action(detail=True, methods=["get"], url_path="productos-sugeridos", permission_classes=[])
-    def productos_sugeridos_cliente(self, request, pk=None):
-        """Obtener productos sugeridos para un cliente específico"""
-        cliente = self.get_object()
-        
-        # Devolver productos de ejemplo personalizados para el cliente
-        productos = [
-            {"id": "1", "nombre": f"Muzzarella Plancha 10kg (Cliente: {cliente.nombre})", "precio": 15500.00, "stock": 50},
-            {"id": "2", "nombre": "Muzzarella Cilindro 1kg", "precio": 1650.00, "stock": 100},
-            {"id": "3", "nombre": "Muzzarella Cilindro 3kg", "precio": 4800.00, "stock": 75},
-            {"id": "4", "nombre": "Queso Cremoso 500g", "precio": 1450.00, "stock": 80},
-            {"id": "5", "nombre": "Queso Provoleta 1kg", "precio": 2200.00, "stock": 60},
-            {"id": "6", "nombre": "Ricota Fresca 500g", "precio": 980.00, "stock": 90},
-            {"id": "7", "nombre": "Queso Sardo 1kg", "precio": 2800.00, "stock": 40},
-            {"id": "8", "nombre": "Manteca 500g", "precio": 1200.00, "stock": 120},
-        ]
-        
-        try:
-            # Intentar obtener productos reales desde la base de datos si están disponibles
-            Producto = apps.get_model('productos', 'Producto')
-            productos_db = Producto.objects.filter(activo=True, stock__gt=0).order_by('-stock')[:10]
-            
-            if productos_db.exists():
-                productos_reales = []
-                for producto in productos_db:
-                    productos_reales.append({
-                        "id": str(producto.id),
-                        "nombre": producto.nombre,
-                        "precio": float(producto.precio),
-                        "stock": float(producto.stock),
-                        "cliente_id": cliente.id
-                    })
-                return Response(productos_reales)
-        except Exception:
-            # Si hay algún error con la base de datos, usar los datos de ejemplo
-            pass
-            
-        return Response(productos)
-
-    @action(detail=True, methods=["get"], url_path="comprobantes-pendientes")
-    def comprobantes_pendientes(self, request, pk=None):
-        """Obtener comprobantes pendientes de pago del cliente"""
-        cliente = self.get_object()
-        
-        # Aquí se integraría con el módulo de ventas/finanzas
-        # Por ahora retornamos datos de ejemplo
-        comprobantes = []
-        
-        return Response(comprobantes)
-
-    @action(detail=False, methods=["post"], url_path="importar", parser_classes=[MultiPartParser])
-    def importar(self, request):
-        """Importar clientes desde archivo CSV"""
-        try:
-            file = request.FILES.get('file')
-            if not file:
-                return Response(
-                    {"error": "Archivo requerido"}, 
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            
-            # Leer archivo CSV
-            decoded_file = file.read().decode('utf-8')
-            csv_data = csv.DictReader(StringIO(decoded_file))
-            
-            procesados = 0
-            errores = []
-            
-            for row in csv_data:
-                try:
-                    cliente_data = {
-                        'nombre': row.get('nombre', ''),
-                        'identificacion': row.get('identificacion', ''),
-                        'telefono': row.get('telefono', ''),
-                        'correo': row.get('correo', ''),
-                        'direccion': row.get('direccion', ''),
-                        'zona': row.get('zona', ''),
-                        'tipo': row.get('tipo', 'minorista'),
-                        'limite_credito': Decimal(row.get('limite_credito', '0')),
-                        'activo': row.get('activo', 'true').lower() == 'true'
-                    }
-                    
-                    Cliente.objects.create(**cliente_data)
-                    procesados += 1
-                    
-                except Exception as e:
-                    errores.append(f"Fila {procesados + len(errores) + 1}: {str(e)}")
-            
-            return Response({
-                "procesados": procesados,
-                "errores": errores
-            })
-            
-        except Exception as e:
-            return Response(
-                {"error": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
-
-    @action(detail=False, methods=["post"], url_path="exportar")
-    def exportar(self, request):
-        """Exportar clientes a CSV"""
-        try:
-            # Crear respuesta CSV
-            response = HttpResponse(content_type='text/csv')
-            response['Content-Disposition'] = 'attachment; filename="clientes.csv"'
-            
-            writer = csv.writer(response)
-            writer.writerow([
-                'nombre', 'identificacion', 'telefono', 'correo', 'direccion',
-                'zona', 'tipo', 'limite_credito', 'activo', 'deuda'
-            ])
-            
-            for cliente in self.get_queryset():
-                writer.writerow([
-                    cliente.nombre,
-                    cliente.identificacion,
-                    cliente.telefono,
-                    cliente.correo,
-                    cliente.direccion,
-                    cliente.zona,
-                    cliente.tipo,
-                    cliente.limite_credito,
-                    cliente.activo,
-                    cliente.deuda
-                ])
-            
-            return response
-            
-        except Exception as e:
-            return Response(
-                {"error": str(e)}, 
-                status=status.HTTP_500_INTERNAL_SERVER_ERROR
-            )
\ No newline at end of file
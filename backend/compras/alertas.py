@@ -0,0 +1,179 @@
+"""
+Generación de alertas de stock y de precios atípicos.
+
+Trabaja por lotes: las estadísticas de todos los productos involucrados se
+obtienen con una sola consulta agrupada y las alertas nuevas se insertan con
+``bulk_create``. La señal de ``HistorialPrecios`` usa ``alertar_precios_atipicos``
+con un único registro y la recepción de mercadería con todas las líneas
+recibidas; el comando ``generar_alertas_stock`` usa los generadores masivos.
+"""
+
+import time
+from datetime import timedelta
+
+from django.db.models import Exists, F, OuterRef, Q
+from django.utils import timezone
+
+from productos.models import Producto
+from .estadisticas import VENTANA_DIAS, registrar_precios
+from .models import AlertaStock, HistorialPrecios
+
+MINIMO_MUESTRAS = 3  # Necesitamos al menos 3 precios para comparar
+
+
+def alertar_precios_atipicos(registros):
+    """
+    Crea alertas para los registros de historial cuyo precio cae fuera de
+    dos desviaciones estándar de los últimos ``VENTANA_DIAS`` días.
+
+    Usa las estadísticas móviles de cada producto (O(1) por registro) y solo
+    consulta las alertas existentes cuando aparece un precio atípico.
+    Devuelve la lista de alertas creadas.
+    """
+    registros = [registro for registro in registros if registro.pk]
+    if not registros:
+        return []
+
+    atipicos = []
+    for registro, (muestras, promedio, desviacion) in registrar_precios(registros):
+        if muestras < MINIMO_MUESTRAS or not promedio or not desviacion:
+            continue
+        # Considerar atípico si está fuera de 2 desviaciones estándar
+        if abs(float(registro.precio) - promedio) > 2 * desviacion:
+            atipicos.append((registro, promedio))
+
+    if not atipicos:
+        return []
+
+    # Solo una alerta similar por producto y día
+    con_alerta = set(
+        AlertaStock.objects.filter(
+            producto_id__in={registro.producto_id for registro, _promedio in atipicos},
+            tipo='precio_atipico',
+            estado__in=['activa', 'vista'],
+            fecha_creacion__date=timezone.now().date()
+        ).values_list('producto_id', flat=True)
+    )
+
+    nuevas = []
+    for registro, promedio in atipicos:
+        if registro.producto_id in con_alerta:
+            continue
+        variacion = ((float(registro.precio) - promedio) / promedio) * 100
+        nuevas.append(AlertaStock(
+            tipo='precio_atipico',
+            producto_id=registro.producto_id,
+            proveedor_id=registro.proveedor_id,
+            mensaje=f'Precio atípico: ${registro.precio} (promedio: ${promedio:.2f}, variación: {variacion:+.1f}%)',
+            valor_referencia=registro.precio
+        ))
+        con_alerta.add(registro.producto_id)
+
+    return AlertaStock.objects.bulk_create(nuevas)
+
+
+def _alertas_abiertas(tipo, **filtros):
+    return AlertaStock.objects.filter(
+        producto=OuterRef('pk'), tipo=tipo, estado__in=['activa', 'vista'], **filtros
+    )
+
+
+def generar_alertas_stock_minimo(lote=1000):
+    """
+    Crea alertas para productos agotados o en stock mínimo sin alerta abierta.
+
+    Una única consulta trae los productos bajo el mínimo que no tienen una
+    alerta abierta (``NOT EXISTS``). Devuelve
+    ``(productos_sin_alerta, alertas_creadas, segundos)``.
+    """
+    inicio = time.perf_counter()
+    candidatos = Producto.objects.filter(
+        Q(stock__lte=0) | Q(min_stock__gt=0, stock__lte=F('min_stock'))
+    ).filter(
+        ~Exists(_alertas_abiertas('stock_minimo'))
+    ).values_list('id', 'stock', 'min_stock')
+
+    alertas = []
+    for producto_id, stock, min_stock in candidatos.iterator(chunk_size=lote):
+        estado = 'Stock agotado' if stock <= 0 else 'Stock bajo'
+        alertas.append(AlertaStock(
+            tipo='stock_minimo',
+            producto_id=producto_id,
+            mensaje=f'{estado}: {stock} unidades (mínimo: {min_stock})',
+            valor_referencia=stock
+        ))
+
+    AlertaStock.objects.bulk_create(alertas, batch_size=lote)
+    # Cada producto leído necesitaba su alerta
+    return len(alertas), len(alertas), time.perf_counter() - inicio
+
+
+def generar_alertas_precios(dias_historial=VENTANA_DIAS, lote=1000):
+    """
+    Crea alertas de precio atípico comparando el último precio de cada producto
+    con la media y la desviación estándar de su historial reciente.
+
+    El historial se recorre una sola vez y las estadísticas por producto se
+    calculan vectorizadas con NumPy. Devuelve
+    ``(filas_escaneadas, alertas_creadas, segundos)``.
+    """
+    import numpy as np
+
+    inicio = time.perf_counter()
+    fecha_limite = timezone.now() - timedelta(days=dias_historial)
+    filas = HistorialPrecios.objects.filter(
+        fecha__gte=fecha_limite
+    ).order_by('producto_id', 'fecha', 'id').values_list('producto_id', 'precio', 'proveedor_id')
+
+    productos_ids, precios, proveedores = [], [], []
+    for producto_id, precio, proveedor_id in filas.iterator(chunk_size=lote * 10):
+        productos_ids.append(producto_id)
+        precios.append(precio)
+        proveedores.append(proveedor_id)
+
+    escaneadas = len(precios)
+    if not escaneadas:
+        return 0, 0, time.perf_counter() - inicio
+
+    ids = np.asarray(productos_ids, dtype=np.int64)
+    valores = np.fromiter(map(float, precios), dtype=np.float64, count=escaneadas)
+    productos, primeros, conteos = np.unique(ids, return_index=True, return_counts=True)
+    ultimos = primeros + conteos - 1  # Filas ordenadas por fecha: la última es el precio actual
+
+    medias = np.add.reduceat(valores, primeros) / conteos
+    desvios = np.sqrt(np.add.reduceat((valores - np.repeat(medias, conteos)) ** 2, primeros) / conteos)
+    actuales = valores[ultimos]
+
+    # Detectar precio atípico (más de 2 desviaciones estándar)
+    atipicos = (
+        (conteos >= MINIMO_MUESTRAS) & (medias > 0) & (desvios > 0)
+        & (np.abs(actuales - medias) > 2 * desvios)
+    )
+    indices = np.flatnonzero(atipicos)
+
+    con_alerta = set(
+        AlertaStock.objects.filter(
+            tipo='precio_atipico',
+            estado__in=['activa', 'vista'],
+            fecha_creacion__gte=timezone.now() - timedelta(days=7)
+        ).values_list('producto_id', flat=True)
+    )
+
+    alertas = []
+    for indice in indices.tolist():
+        producto_id = int(productos[indice])
+        if producto_id in con_alerta:
+            continue
+        fila = int(ultimos[indice])
+        promedio = medias[indice]
+        variacion = ((actuales[indice] - promedio) / promedio) * 100
+        alertas.append(AlertaStock(
+            tipo='precio_atipico',
+            producto_id=producto_id,
+            proveedor_id=proveedores[fila],
+            mensaje=f'Precio atípico: ${precios[fila]} (promedio: ${promedio:.2f}, variación: {variacion:+.1f}%)',
+            valor_referencia=precios[fila]
+        ))
+
+    AlertaStock.objects.bulk_create(alertas, batch_size=lote)
+    return escaneadas, len(alertas), time.perf_counter() - inicio
@@ -0,0 +1,111 @@
+"""
+Estadísticas móviles de precios por producto.
+
+Cada ``EstadisticaPrecios`` guarda un bucket diario con acumuladores de Welford
+``[muestras, promedio, m2]``. Agregar un precio actualiza solo el bucket del
+día y los buckets que salen de la ventana se descartan, de modo que consultar
+media y desviación de los últimos ``VENTANA_DIAS`` días cuesta lo mismo sin
+importar el tamaño del historial.
+"""
+
+import math
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from .models import EstadisticaPrecios
+
+VENTANA_DIAS = 90
+
+
+def _limite(hoy):
+    return (hoy - timedelta(days=VENTANA_DIAS)).isoformat()
+
+
+def expirar(buckets, hoy):
+    """Elimina los buckets anteriores a la ventana"""
+    limite = _limite(hoy)
+    for dia in [dia for dia in buckets if dia < limite]:
+        del buckets[dia]
+
+
+def agregar_precio(buckets, dia, precio):
+    """Suma ``precio`` al bucket de ``dia`` (actualización de Welford)"""
+    muestras, promedio, m2 = buckets.get(dia, (0, 0.0, 0.0))
+    precio = float(precio)
+    muestras += 1
+    delta = precio - promedio
+    promedio += delta / muestras
+    m2 += delta * (precio - promedio)
+    buckets[dia] = [muestras, promedio, m2]
+
+
+def resumir(buckets):
+    """
+    Combina los buckets y devuelve ``(muestras, promedio, desviacion)``.
+    La desviación es poblacional, como ``StdDev`` de Django.
+    """
+    total, promedio, m2 = 0, 0.0, 0.0
+    for muestras, promedio_bucket, m2_bucket in buckets.values():
+        if not muestras:
+            continue
+        combinado = total + muestras
+        delta = promedio_bucket - promedio
+        promedio += delta * muestras / combinado
+        m2 += m2_bucket + delta * delta * total * muestras / combinado
+        total = combinado
+
+    if not total:
+        return 0, 0.0, 0.0
+    return total, promedio, math.sqrt(max(m2, 0.0) / total)
+
+
+def registrar_precios(registros):
+    """
+    Incorpora los registros de ``HistorialPrecios`` a las estadísticas de sus
+    productos. Devuelve una lista de ``(registro, resumen)`` donde ``resumen``
+    describe el historial previo a ese registro.
+    """
+    hoy = timezone.localdate()
+    producto_ids = {registro.producto_id for registro in registros}
+
+    with transaction.atomic():
+        estadisticas = {
+            estadistica.producto_id: estadistica
+            for estadistica in EstadisticaPrecios.objects.select_for_update().filter(
+                producto_id__in=producto_ids
+            )
+        }
+        faltantes = producto_ids - estadisticas.keys()
+        if faltantes:
+            EstadisticaPrecios.objects.bulk_create(
+                [EstadisticaPrecios(producto_id=producto_id) for producto_id in faltantes],
+                ignore_conflicts=True
+            )
+            estadisticas.update(
+                (estadistica.producto_id, estadistica)
+                for estadistica in EstadisticaPrecios.objects.select_for_update().filter(
+                    producto_id__in=faltantes
+                )
+            )
+
+        for estadistica in estadisticas.values():
+            expirar(estadistica.buckets, hoy)
+
+        resultados = []
+        for registro in registros:
+            buckets = estadisticas[registro.producto_id].buckets
+            resultados.append((registro, resumir(buckets)))
+            dia = (timezone.localdate(registro.fecha) if registro.fecha else hoy).isoformat()
+            if dia >= _limite(hoy):
+                agregar_precio(buckets, dia, registro.precio)
+
+        ahora = timezone.now()
+        for estadistica in estadisticas.values():
+            estadistica.fecha_actualizacion = ahora
+        EstadisticaPrecios.objects.bulk_update(
+            estadisticas.values(), ['buckets', 'fecha_actualizacion']
+        )
+
+    return resultados
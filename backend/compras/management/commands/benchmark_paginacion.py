@@ -0,0 +1,129 @@
+"""
+Comando para comparar la paginación por página (COUNT + OFFSET) con la
+paginación por cursor sobre MovimientoStock.
+
+Carga ``--filas`` movimientos sintéticos (sin afectar stock: se insertan con
+bulk_create), mide cada página pedida con ambos paginadores a través de
+MovimientoStockViewSet y borra los datos al terminar salvo ``--conservar``.
+"""
+
+import time
+import uuid
+from decimal import Decimal
+from urllib.parse import parse_qs, urlparse
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.pagination import Cursor, PageNumberPagination
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from compras.models import MovimientoStock
+from compras.views import MovimientoStockViewSet
+from core.paginacion import PaginacionCursor
+from productos.models import Producto
+
+REFERENCIA = 'BENCH-PAGINACION'
+
+
+class Command(BaseCommand):
+    help = 'Mide el costo de páginas profundas con OFFSET y con cursor sobre MovimientoStock'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--filas',
+            type=int,
+            default=1_000_000,
+            help='Movimientos sintéticos a cargar (default: 1.000.000; usar 10000000 para la prueba completa)'
+        )
+        parser.add_argument(
+            '--paginas',
+            type=int,
+            nargs='+',
+            default=[1, 100, 1000, 10000],
+            help='Números de página a medir'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=10000,
+            help='Filas por bulk_create (default: 10000)'
+        )
+        parser.add_argument(
+            '--conservar',
+            action='store_true',
+            help='No borrar los movimientos sintéticos al terminar'
+        )
+
+    def handle(self, *args, **options):
+        producto, usuario = self.cargar(options['filas'], options['lote'])
+        try:
+            self.medir(options['paginas'])
+        finally:
+            if not options['conservar']:
+                MovimientoStock.objects.filter(producto=producto).delete()
+                producto.delete()
+                usuario.delete()
+
+    def cargar(self, filas, lote):
+        """Inserta ``filas`` movimientos de un producto y usuario de prueba"""
+        sufijo = uuid.uuid4().hex[:8]
+        usuario = get_user_model().objects.create_user(
+            username=f'bench-{sufijo}', email=f'bench-{sufijo}@example.com'
+        )
+        producto = Producto.objects.create(nombre=f'Producto benchmark {sufijo}', sku=f'BENCH-{sufijo}')
+
+        inicio = time.perf_counter()
+        for desde in range(0, filas, lote):
+            with transaction.atomic():
+                MovimientoStock.objects.bulk_create([
+                    MovimientoStock(
+                        producto=producto, tipo='entrada', cantidad=Decimal('1'),
+                        referencia=REFERENCIA, usuario=usuario
+                    )
+                    for _ in range(min(lote, filas - desde))
+                ])
+        self.stdout.write(f'{filas} movimientos cargados en {time.perf_counter() - inicio:.1f}s')
+        return producto, usuario
+
+    def pagina(self, paginador, parametros):
+        """Pagina el listado de MovimientoStockViewSet y devuelve los segundos que tardó"""
+        vista = MovimientoStockViewSet(action='list', format_kwarg=None)
+        request = Request(APIRequestFactory().get(
+            '/api/compras/movimientos-stock/', parametros, HTTP_HOST='localhost'
+        ))
+        vista.request = request
+        queryset = vista.filter_queryset(vista.get_queryset())
+
+        inicio = time.perf_counter()
+        list(paginador.paginate_queryset(queryset, request, view=vista))
+        return time.perf_counter() - inicio
+
+    def medir(self, paginas):
+        offset = PageNumberPagination()
+        offset.page_size = PaginacionCursor.page_size or 20
+        self.stdout.write(f'{"Página":>8} {"OFFSET (ms)":>12} {"Cursor (ms)":>12}')
+
+        for numero in paginas:
+            segundos_offset = self.pagina(offset, {'page': numero})
+
+            # El cursor de la página N sale de la última fila de la página N-1
+            # (en uso real el cliente lo trae del enlace "next").
+            cursor = PaginacionCursor()
+            parametros = {}
+            if numero > 1:
+                fecha = MovimientoStock.objects.order_by('-fecha', '-id').values_list(
+                    'fecha', flat=True
+                )[(numero - 1) * offset.page_size - 1]
+                cursor.base_url = 'http://bench/'
+                cursor.ordering = ('-fecha', '-id')
+                enlace = cursor.encode_cursor(Cursor(offset=0, reverse=False, position=str(fecha)))
+                parametros = {
+                    cursor.cursor_query_param: parse_qs(urlparse(enlace).query)[cursor.cursor_query_param][0]
+                }
+            segundos_cursor = self.pagina(PaginacionCursor(), parametros)
+
+            self.stdout.write(
+                f'{numero:>8} {segundos_offset * 1000:>12.1f} {segundos_cursor * 1000:>12.1f}'
+            )
@@ -0,0 +1,79 @@
+"""
+Comando para medir el costo en consultas de la recepción de mercadería.
+Arma una orden de compra de prueba, la recibe completa y revierte todo al terminar.
+"""
+
+import time
+import uuid
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from compras.models import OrdenCompra, OrdenCompraItem
+from compras.recepcion import recibir_mercaderia
+from productos.models import Producto
+from proveedores.models import Proveedor
+
+
+class Command(BaseCommand):
+    help = 'Mide consultas y tiempo por línea recibida en la recepción de mercadería'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lineas',
+            type=int,
+            nargs='+',
+            default=[2, 20, 200],
+            help='Cantidad de líneas de la orden a recibir (se admiten varios valores)'
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write(f'{"Líneas":>8} {"Consultas":>10} {"Consultas/línea":>16} {"Tiempo (ms)":>12}')
+
+        for lineas in options['lineas']:
+            with transaction.atomic():
+                orden, items = self.crear_orden(lineas)
+                datos = [
+                    {'id': item.id, 'cantidad_recibida': str(item.cantidad_solicitada)}
+                    for item in items
+                ]
+
+                inicio = time.perf_counter()
+                with CaptureQueriesContext(connection) as consultas:
+                    recibir_mercaderia(orden.pk, datos, orden.creado_por)
+                duracion = (time.perf_counter() - inicio) * 1000
+
+                self.stdout.write(
+                    f'{lineas:>8} {len(consultas):>10} '
+                    f'{len(consultas) / lineas:>16.2f} {duracion:>12.1f}'
+                )
+                transaction.set_rollback(True)
+
+    def crear_orden(self, lineas):
+        """Crea proveedor, productos y una orden enviada con ``lineas`` ítems"""
+        sufijo = uuid.uuid4().hex[:8]
+        usuario = get_user_model().objects.create_user(
+            username=f'bench-{sufijo}', email=f'bench-{sufijo}@example.com'
+        )
+        proveedor = Proveedor.objects.create(nombre=f'Proveedor benchmark {sufijo}')
+        productos = Producto.objects.bulk_create([
+            Producto(nombre=f'Producto {i}', sku=f'BENCH-{sufijo}-{i}')
+            for i in range(lineas)
+        ])
+        orden = OrdenCompra.objects.create(
+            numero=f'BENCH-{sufijo}', proveedor=proveedor, estado='enviada', creado_por=usuario
+        )
+        items = OrdenCompraItem.objects.bulk_create([
+            OrdenCompraItem(
+                orden_compra=orden,
+                producto=producto,
+                cantidad_solicitada=Decimal('10'),
+                precio_unitario=Decimal('150.00'),
+                subtotal=Decimal('1500.00')
+            )
+            for producto in productos
+        ])
+        return orden, items
@@ -1,19 +1,104 @@
 """
 Comando para calcular y actualizar el costo promedio móvil de productos.
 Este comando se puede ejecutar manualmente o programar para ejecutarse automáticamente.
+
+El recálculo es por conjuntos: una única consulta agrupada sobre MovimientoStock
+obtiene cantidad y valor de entradas por lote de productos, y los resultados se
+escriben con bulk_update. Cada lote es una transacción corta que bloquea sus
+productos (``select_for_update``) antes de agregar, así una recepción
+concurrente no se pierde.
 """
 
-from django.core.management.base import BaseCommand
-from django.db import transaction
-from django.db.models import Sum, Avg, F
+import logging
+import multiprocessing
+import time
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, time as dt_time
 from decimal import Decimal
+
+from django.core.management.base import BaseCommand
+from django.db import connections, transaction
+from django.db.models import Max, Min
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from compras.stock import acumulados_por_replay, costo_promedio
 from productos.models import Producto
-from compras.models import MovimientoStock
-import logging
 
 logger = logging.getLogger(__name__)
 
 
+def rangos_de_productos(partes):
+    """Divide el rango de IDs de productos en ``partes`` rangos contiguos (inclusive)"""
+    limites = Producto.objects.aggregate(minimo=Min('id'), maximo=Max('id'))
+    if limites['minimo'] is None:
+        return []
+
+    minimo, maximo = limites['minimo'], limites['maximo']
+    paso = max(1, -(-(maximo - minimo + 1) // max(1, partes)))
+    return [
+        (inicio, min(inicio + paso - 1, maximo))
+        for inicio in range(minimo, maximo + 1, paso)
+    ]
+
+
+def recalcular_rango(trabajo):
+    """
+    Recalcula los acumulados y el costo promedio de los productos de un rango.
+
+    ``trabajo`` es ``(desde_id, hasta_id, since, lote, dry_run)``. Devuelve la
+    lista de ``(producto_id, nuevo_costo)`` de los productos que cambiaron y
+    los tiempos por fase.
+    """
+    desde_id, hasta_id, since, lote, dry_run = trabajo
+    tiempos = {'agregado': 0.0, 'escritura': 0.0}
+
+    productos = Producto.objects.filter(id__range=(desde_id, hasta_id))
+    if since:
+        desde_fecha = timezone.make_aware(datetime.combine(since, dt_time.min))
+        productos = productos.filter(
+            movimientos_stock__tipo='entrada',
+            movimientos_stock__fecha__gte=desde_fecha
+        )
+    ids = list(productos.values_list('id', flat=True).distinct().order_by('id'))
+    campos = ['avg_cost', 'entradas_cantidad', 'entradas_valor']
+    cero = (Decimal('0'), Decimal('0'))
+
+    actualizados = []
+    for posicion in range(0, len(ids), lote):
+        ids_lote = ids[posicion:posicion + lote]
+        with transaction.atomic():
+            inicio = time.perf_counter()
+            # Bloquea el lote y agrega dentro de la misma transacción: una
+            # entrada que llegue en paralelo espera al commit y suma sobre lo
+            # escrito acá, en lugar de quedar pisada por un agregado viejo
+            actuales = Producto.objects.filter(id__in=ids_lote).order_by('id')
+            if not dry_run:
+                actuales = actuales.select_for_update()
+            actuales = {fila[0]: fila[1:] for fila in actuales.values_list('id', *campos)}
+            replay = acumulados_por_replay(ids_lote)
+            tiempos['agregado'] += time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            cambios = []
+            for id_producto, actual in actuales.items():
+                if id_producto in replay:
+                    cantidad, valor = replay[id_producto]
+                    nuevo = (costo_promedio(cantidad, valor), cantidad, valor)
+                else:
+                    # Sin entradas con costo (p. ej. se borraron o el costo se
+                    # cargó a mano) solo vuelven a cero los acumulados
+                    nuevo = (actual[0], *cero)
+                if nuevo != actual:
+                    cambios.append(Producto(id=id_producto, **dict(zip(campos, nuevo))))
+            if cambios and not dry_run:
+                Producto.objects.bulk_update(cambios, campos)
+            tiempos['escritura'] += time.perf_counter() - inicio
+        actualizados.extend((producto.id, producto.avg_cost) for producto in cambios)
+
+    return actualizados, tiempos
+
+
 class Command(BaseCommand):
     help = 'Calcula y actualiza el costo promedio móvil de todos los productos'
 
@@ -33,11 +118,39 @@ class Command(BaseCommand):
             action='store_true',
             help='Mostrar información detallada del proceso'
         )
+        parser.add_argument(
+            '--since',
+            type=parse_date,
+            help='Recalcular solo productos con entradas desde esta fecha (YYYY-MM-DD)'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Productos por lote de escritura; cada lote usa su propia transacción (default: 1000)'
+        )
+        parser.add_argument(
+            '--procesos',
+            type=int,
+            default=1,
+            help='Procesos en paralelo, repartiendo los productos por rangos de ID (default: 1)'
+        )
+        parser.add_argument(
+            '--verificar',
+            action='store_true',
+            help='Comparar los acumulados de entradas contra un replay del historial sin modificar nada'
+        )
 
     def handle(self, *args, **options):
         producto_id = options.get('producto_id')
         dry_run = options.get('dry_run', False)
         verbose = options.get('verbose', False)
+        desde = options.get('since')
+        lote = options.get('lote') or 1000
+        procesos = options.get('procesos') or 1
+
+        if options.get('verificar'):
+            return self.verificar_acumulados(producto_id)
 
         if dry_run:
             self.stdout.write(
@@ -45,60 +158,50 @@ class Command(BaseCommand):
             )
 
         try:
+            inicio = time.perf_counter()
             if producto_id:
-                productos = Producto.objects.filter(id=producto_id)
-                if not productos.exists():
+                if not Producto.objects.filter(id=producto_id).exists():
                     self.stdout.write(
                         self.style.ERROR(f'Producto con ID {producto_id} no encontrado')
                     )
                     return
+                rangos = [(producto_id, producto_id)]
             else:
-                productos = Producto.objects.all()
+                rangos = rangos_de_productos(procesos)
+            tiempos = {'rangos': time.perf_counter() - inicio, 'agregado': 0.0, 'escritura': 0.0}
+
+            trabajos = [(desde_id, hasta_id, desde, lote, dry_run) for desde_id, hasta_id in rangos]
+            if procesos > 1 and len(trabajos) > 1:
+                # Cada proceso abre su propia conexión a la base
+                connections.close_all()
+                contexto = multiprocessing.get_context('fork')
+                with ProcessPoolExecutor(max_workers=procesos, mp_context=contexto) as pool:
+                    resultados = list(pool.map(recalcular_rango, trabajos))
+            else:
+                resultados = [recalcular_rango(trabajo) for trabajo in trabajos]
 
-            total_productos = productos.count()
             productos_actualizados = 0
-            productos_sin_movimientos = 0
-
-            self.stdout.write(f'Procesando {total_productos} productos...')
-
-            with transaction.atomic():
-                for producto in productos:
-                    costo_anterior = producto.avg_cost
-                    nuevo_costo = self.calcular_costo_promedio_movil(producto)
-
-                    if nuevo_costo is not None:
-                        if verbose:
-                            self.stdout.write(
-                                f'Producto: {producto.nombre} | '
-                                f'Costo anterior: ${costo_anterior} | '
-                                f'Nuevo costo: ${nuevo_costo}'
-                            )
-
-                        if not dry_run:
-                            producto.avg_cost = nuevo_costo
-                            producto.save(update_fields=['avg_cost'])
-
-                        productos_actualizados += 1
-                    else:
-                        if verbose:
-                            self.stdout.write(
-                                f'Producto: {producto.nombre} | Sin movimientos de entrada'
-                            )
-                        productos_sin_movimientos += 1
-
-                if dry_run:
-                    # En modo dry-run, revertir la transacción
-                    transaction.set_rollback(True)
+            for actualizados, tiempos_rango in resultados:
+                productos_actualizados += len(actualizados)
+                for fase, segundos in tiempos_rango.items():
+                    tiempos[fase] += segundos
+                if verbose:
+                    for id_producto, nuevo_costo in actualizados:
+                        self.stdout.write(f'Producto ID {id_producto} | Nuevo costo: ${nuevo_costo}')
 
             # Mostrar resumen
             self.stdout.write(
                 self.style.SUCCESS(
                     f'\n--- RESUMEN ---\n'
-                    f'Productos procesados: {total_productos}\n'
-                    f'Productos actualizados: {productos_actualizados}\n'
-                    f'Productos sin movimientos: {productos_sin_movimientos}'
+                    f'Rangos procesados: {len(rangos)} ({procesos} proceso/s)\n'
+                    f'Productos actualizados: {productos_actualizados}'
                 )
             )
+            # Con varios procesos, agregado y escritura suman el tiempo de todos los rangos
+            self.stdout.write(
+                'Tiempos: ' + ' | '.join(f'{fase}: {segundos:.3f}s' for fase, segundos in tiempos.items())
+                + f' | total: {time.perf_counter() - inicio:.3f}s'
+            )
 
             if dry_run:
                 self.stdout.write(
@@ -111,79 +214,35 @@ class Command(BaseCommand):
                 self.style.ERROR(f'Error: {str(e)}')
             )
 
-    def calcular_costo_promedio_movil(self, producto):
-        """
-        Calcula el costo promedio móvil basado en los movimientos de entrada.
-        
-        Fórmula: Costo Promedio = (Stock Actual * Costo Actual + Cantidad Entrada * Costo Entrada) 
-                                 / (Stock Actual + Cantidad Entrada)
-        """
-        # Obtener movimientos de entrada con costo unitario
-        movimientos_entrada = MovimientoStock.objects.filter(
-            producto=producto,
-            tipo='entrada',
-            costo_unitario__isnull=False
-        ).order_by('created_at')
-
-        if not movimientos_entrada.exists():
-            return None
-
-        # Calcular costo promedio ponderado
-        total_cantidad = Decimal('0')
-        total_costo = Decimal('0')
-
-        for movimiento in movimientos_entrada:
-            cantidad = movimiento.cantidad
-            costo_unitario = movimiento.costo_unitario
-
-            total_cantidad += cantidad
-            total_costo += (cantidad * costo_unitario)
-
-        if total_cantidad > 0:
-            costo_promedio = total_costo / total_cantidad
-            return round(costo_promedio, 2)
+    def verificar_acumulados(self, producto_id=None):
+        """Compara los acumulados incrementales con un replay completo del historial"""
+        productos = Producto.objects.all()
+        if producto_id:
+            productos = productos.filter(id=producto_id)
+
+        replay = acumulados_por_replay([producto_id] if producto_id else None)
+        cero = (Decimal('0'), Decimal('0'))
+        diferencias = 0
+        total = 0
+
+        for producto in productos.only('id', 'nombre', 'avg_cost', 'entradas_cantidad', 'entradas_valor'):
+            total += 1
+            cantidad, valor = replay.get(producto.id, cero)
+            esperado = (cantidad, valor, costo_promedio(cantidad, valor))
+            actual = (producto.entradas_cantidad, producto.entradas_valor, producto.avg_cost)
+            if esperado[:2] != actual[:2] or (cantidad and esperado[2] != actual[2]):
+                diferencias += 1
+                self.stdout.write(
+                    self.style.ERROR(
+                        f'Producto: {producto.nombre} (ID {producto.id}) | '
+                        f'Acumulado: {actual[0]} u / ${actual[1]} / ${actual[2]} | '
+                        f'Replay: {esperado[0]} u / ${esperado[1]} / ${esperado[2]}'
+                    )
+                )
 
+        mensaje = f'Productos verificados: {total} | Con diferencias: {diferencias}'
+        if diferencias:
+            self.stdout.write(self.style.WARNING(mensaje))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
         return None
-
-    def calcular_costo_promedio_movil_incremental(self, producto, nueva_cantidad, nuevo_costo):
-        """
-        Calcula el nuevo costo promedio cuando se recibe nueva mercadería.
-        Esta función se puede usar en tiempo real al recibir mercadería.
-        """
-        stock_actual = producto.stock
-        costo_actual = producto.avg_cost or Decimal('0')
-
-        if stock_actual <= 0:
-            # Si no hay stock, el nuevo costo es el costo de la mercadería recibida
-            return nuevo_costo
-
-        # Aplicar fórmula de costo promedio móvil
-        valor_stock_actual = stock_actual * costo_actual
-        valor_nueva_mercaderia = nueva_cantidad * nuevo_costo
-        total_valor = valor_stock_actual + valor_nueva_mercaderia
-        total_cantidad = stock_actual + nueva_cantidad
-
-        nuevo_costo_promedio = total_valor / total_cantidad
-        return round(nuevo_costo_promedio, 2)
-
-
-# Función auxiliar para usar en las vistas
-def actualizar_costo_promedio_producto(producto, cantidad_entrada, costo_unitario):
-    """
-    Función auxiliar para actualizar el costo promedio de un producto
-    cuando se recibe nueva mercadería.
-    """
-    command = Command()
-    nuevo_costo = command.calcular_costo_promedio_movil_incremental(
-        producto, cantidad_entrada, costo_unitario
-    )
-    
-    if nuevo_costo is not None:
-        producto.avg_cost = nuevo_costo
-        producto.save(update_fields=['avg_cost'])
-        
-        logger.info(
-            f'Costo promedio actualizado para {producto.nombre}: ${nuevo_costo}'
-        )
-    
-    return nuevo_costo
\ No newline at end of file
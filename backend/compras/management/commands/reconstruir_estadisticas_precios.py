@@ -0,0 +1,82 @@
+"""
+Comando para regenerar las estadísticas móviles de precios desde el historial.
+Útil después de una carga masiva, de una importación o si se sospecha desvío.
+"""
+
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.utils import timezone
+
+from compras.estadisticas import VENTANA_DIAS, agregar_precio
+from compras.models import EstadisticaPrecios, HistorialPrecios
+
+
+class Command(BaseCommand):
+    help = 'Regenera las estadísticas móviles de precios a partir de HistorialPrecios'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Productos por lote de escritura; cada lote usa su propia transacción (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        lote = options.get('lote') or 1000
+        inicio = time.perf_counter()
+        hoy = timezone.localdate()
+        fecha_limite = hoy - timedelta(days=VENTANA_DIAS)
+
+        filas = HistorialPrecios.objects.filter(
+            fecha__date__gte=fecha_limite
+        ).order_by('producto_id', 'fecha', 'id').values_list('producto_id', 'fecha', 'precio')
+
+        pendientes = []
+        producto_actual = None
+        registros = 0
+        productos = 0
+
+        for producto_id, fecha, precio in filas.iterator(chunk_size=lote * 10):
+            if producto_id != producto_actual:
+                if len(pendientes) >= lote:
+                    productos += self.guardar(pendientes)
+                    pendientes = []
+                pendientes.append(EstadisticaPrecios(producto_id=producto_id, buckets={}))
+                producto_actual = producto_id
+            agregar_precio(pendientes[-1].buckets, timezone.localdate(fecha).isoformat(), precio)
+            registros += 1
+
+        if pendientes:
+            productos += self.guardar(pendientes)
+
+        # Productos sin precios dentro de la ventana
+        eliminados, _detalle = EstadisticaPrecios.objects.exclude(
+            producto_id__in=HistorialPrecios.objects.filter(
+                fecha__date__gte=fecha_limite
+            ).values('producto_id')
+        ).delete()
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Estadísticas regeneradas: {productos} productos, {registros} precios, '
+                f'{eliminados} eliminadas en {time.perf_counter() - inicio:.2f}s'
+            )
+        )
+
+    def guardar(self, estadisticas):
+        """Inserta o reemplaza un lote de estadísticas en una transacción corta"""
+        ahora = timezone.now()
+        for estadistica in estadisticas:
+            estadistica.fecha_actualizacion = ahora
+        with transaction.atomic():
+            EstadisticaPrecios.objects.bulk_create(
+                estadisticas,
+                update_conflicts=True,
+                unique_fields=['producto'],
+                update_fields=['buckets', 'fecha_actualizacion']
+            )
+        return len(estadisticas)
@@ -0,0 +1,71 @@
+"""
+Comando para regenerar el resumen mensual de compras desde las órdenes.
+Sirve para la carga inicial y para reparar desvíos (por ejemplo después de
+modificar órdenes con ``QuerySet.update``, que no pasa por ``save``).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from compras.models import ResumenMensualCompras
+from compras.resumenes import resumen_desde_ordenes
+
+
+class Command(BaseCommand):
+    help = 'Regenera ResumenMensualCompras a partir de OrdenCompra'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar las diferencias, sin escribir'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas por lote de escritura (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+        lote = options.get('lote') or 1000
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            esperado = resumen_desde_ordenes()
+            actual = {
+                (fila.mes, fila.proveedor_id, fila.estado): fila
+                for fila in ResumenMensualCompras.objects.select_for_update()
+            }
+
+            cambios = [
+                ResumenMensualCompras(
+                    mes=mes, proveedor_id=proveedor_id, estado=estado, ordenes=ordenes, total=total
+                )
+                for (mes, proveedor_id, estado), (ordenes, total) in esperado.items()
+                if (mes, proveedor_id, estado) not in actual
+                or (actual[(mes, proveedor_id, estado)].ordenes, actual[(mes, proveedor_id, estado)].total) != (ordenes, total)
+            ]
+            sobrantes = [fila.pk for clave, fila in actual.items() if clave not in esperado]
+
+            if not dry_run:
+                ResumenMensualCompras.objects.bulk_create(
+                    cambios,
+                    batch_size=lote,
+                    update_conflicts=True,
+                    unique_fields=['mes', 'proveedor', 'estado'],
+                    update_fields=['ordenes', 'total']
+                )
+                ResumenMensualCompras.objects.filter(pk__in=sobrantes).delete()
+
+        mensaje = (
+            f'Resumen mensual: {len(esperado)} filas esperadas, {len(cambios)} corregidas, '
+            f'{len(sobrantes)} eliminadas en {time.perf_counter() - inicio:.2f}s'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'MODO DRY-RUN: {mensaje}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
@@ -0,0 +1,28 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:44
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0003_ordencompra_ordencompraitem_movimientostock_and_more'),
+        ('productos', '0005_producto_entradas_acumuladas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstadisticaPrecios',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('buckets', models.JSONField(blank=True, default=dict)),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+                ('producto', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='estadistica_precios', to='productos.producto')),
+            ],
+            options={
+                'verbose_name': 'Estadística de Precios',
+                'verbose_name_plural': 'Estadísticas de Precios',
+            },
+        ),
+    ]
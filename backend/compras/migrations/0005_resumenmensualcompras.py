@@ -0,0 +1,33 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:48
+
+import django.db.models.deletion
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0004_estadisticaprecios'),
+        ('proveedores', '0004_proveedor_productos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensualCompras',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField()),
+                ('estado', models.CharField(choices=[('borrador', 'Borrador'), ('enviada', 'Enviada'), ('confirmada', 'Confirmada'), ('recibida_parcial', 'Recibida Parcial'), ('recibida_completa', 'Recibida Completa'), ('cancelada', 'Cancelada')], max_length=20)),
+                ('ordenes', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+                ('proveedor', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumenes_compras', to='proveedores.proveedor')),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Compras',
+                'verbose_name_plural': 'Resúmenes Mensuales de Compras',
+                'ordering': ['-mes', 'proveedor'],
+                'unique_together': {('mes', 'proveedor', 'estado')},
+            },
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('compras', '0005_resumenmensualcompras'),
+        ('productos', '0005_producto_entradas_acumuladas'),
+        ('proveedores', '0004_proveedor_productos'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='alertastock',
+            index=models.Index(fields=['-fecha_creacion', '-id'], name='alerta_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertastock',
+            index=models.Index(fields=['estado', '-fecha_creacion'], name='alerta_estado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='alertastock',
+            index=models.Index(fields=['producto', 'tipo', 'estado'], name='alerta_prod_tipo_estado_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialprecios',
+            index=models.Index(fields=['-fecha', '-id'], name='histprecio_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialprecios',
+            index=models.Index(fields=['producto', '-fecha'], name='histprecio_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='historialprecios',
+            index=models.Index(fields=['proveedor', '-fecha'], name='histprecio_prov_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['-fecha', '-id'], name='movstock_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', '-fecha'], name='movstock_prod_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='movimientostock',
+            index=models.Index(fields=['producto', 'tipo', '-fecha'], name='movstock_prod_tipo_fecha_idx'),
+        ),
+    ]
@@ -1,12 +1,14 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 from django.conf import settings
 
 from productos.models import Producto
 from proveedores.models import Proveedor
 
+from .stock import aplicar_movimiento
+
 
 class CategoriaCompra(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
@@ -107,13 +109,34 @@ class OrdenCompra(models.Model):
     def __str__(self):
         return f"OC-{self.numero} - {self.proveedor.nombre}"
 
+    def save(self, *args, **kwargs):
+        from .resumenes import CAMPOS_RESUMEN, registrar_orden
+
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and not CAMPOS_RESUMEN.intersection(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = None
+            if not self._state.adding:
+                anterior = OrdenCompra.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'fecha_creacion', 'proveedor_id', 'estado', 'total'
+                ).first()
+            super().save(*args, **kwargs)
+            # El resumen mensual se ajusta en la misma transacción que la orden
+            registrar_orden(self, anterior)
+
     def calcular_totales(self):
         """Calcula subtotal, impuestos y total basado en los ítems"""
-        subtotal = sum(item.subtotal for item in self.items.all())
+        self.asignar_totales(self.items.all())
+        self.save(update_fields=['subtotal', 'impuestos', 'total'])
+
+    def asignar_totales(self, items):
+        """Asigna subtotal, impuestos y total a partir de ítems ya cargados (sin guardar)"""
+        subtotal = sum((item.subtotal for item in items), Decimal('0'))
         self.subtotal = subtotal
         self.impuestos = subtotal * Decimal('0.21')  # IVA 21%
         self.total = self.subtotal + self.impuestos
-        self.save(update_fields=['subtotal', 'impuestos', 'total'])
 
     def puede_recibir_mercaderia(self):
         """Verifica si la orden puede recibir mercadería"""
@@ -175,26 +198,29 @@ class MovimientoStock(models.Model):
         ordering = ['-fecha']
         verbose_name = "Movimiento de Stock"
         verbose_name_plural = "Movimientos de Stock"
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='movstock_fecha_id_idx'),
+            models.Index(fields=['producto', '-fecha'], name='movstock_prod_fecha_idx'),
+            models.Index(fields=['producto', 'tipo', '-fecha'], name='movstock_prod_tipo_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.tipo.title()} - {self.producto.nombre} - {self.cantidad}"
 
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        # Actualizar stock del producto
-        self.actualizar_stock_producto()
+        nuevo = self._state.adding
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if nuevo:
+                # El movimiento se aplica una sola vez, en la misma transacción
+                self.actualizar_stock_producto()
 
     def actualizar_stock_producto(self):
-        """Actualiza el stock del producto basado en el movimiento"""
-        if self.tipo == 'entrada':
-            self.producto.stock += self.cantidad
-        elif self.tipo == 'salida':
-            self.producto.stock -= self.cantidad
-        elif self.tipo == 'ajuste':
-            # Para ajustes, la cantidad es el nuevo stock total
-            self.producto.stock = self.cantidad
-        
-        self.producto.save(update_fields=['stock'])
+        """Aplica el movimiento al stock del producto y devuelve el saldo resultante"""
+        saldo = aplicar_movimiento(self)
+        if MovimientoStock.producto.is_cached(self):
+            self.producto.stock = saldo
+        return saldo
 
 
 class HistorialPrecios(models.Model):
@@ -209,6 +235,11 @@ class HistorialPrecios(models.Model):
         ordering = ['-fecha']
         verbose_name = "Historial de Precios"
         verbose_name_plural = "Historial de Precios"
+        indexes = [
+            models.Index(fields=['-fecha', '-id'], name='histprecio_fecha_id_idx'),
+            models.Index(fields=['producto', '-fecha'], name='histprecio_prod_fecha_idx'),
+            models.Index(fields=['proveedor', '-fecha'], name='histprecio_prov_fecha_idx'),
+        ]
 
     def __str__(self):
         return f"{self.producto.nombre} - {self.proveedor.nombre} - ${self.precio}"
@@ -242,6 +273,11 @@ class AlertaStock(models.Model):
         ordering = ['-fecha_creacion']
         verbose_name = "Alerta de Stock"
         verbose_name_plural = "Alertas de Stock"
+        indexes = [
+            models.Index(fields=['-fecha_creacion', '-id'], name='alerta_fecha_id_idx'),
+            models.Index(fields=['estado', '-fecha_creacion'], name='alerta_estado_fecha_idx'),
+            models.Index(fields=['producto', 'tipo', 'estado'], name='alerta_prod_tipo_estado_idx'),
+        ]
 
     def __str__(self):
         return f"{self.get_tipo_display()} - {self.producto.nombre}"
@@ -251,4 +287,48 @@ class AlertaStock(models.Model):
         self.estado = 'resuelta'
         self.fecha_resolucion = timezone.now()
         self.resuelto_por = usuario
-        self.save(update_fields=['estado', 'fecha_resolucion', 'resuelto_por'])
\ No newline at end of file
+        self.save(update_fields=['estado', 'fecha_resolucion', 'resuelto_por'])
+
+
+class EstadisticaPrecios(models.Model):
+    """
+    Estadísticas móviles de precios de compra de un producto.
+
+    Guarda un bucket por día con acumuladores de Welford
+    ``[muestras, promedio, m2]`` para los últimos días de la ventana; los
+    buckets vencidos se descartan al actualizar (ver compras.estadisticas).
+    """
+    producto = models.OneToOneField(Producto, on_delete=models.CASCADE, related_name="estadistica_precios")
+    buckets = models.JSONField(default=dict, blank=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        verbose_name = "Estadística de Precios"
+        verbose_name_plural = "Estadísticas de Precios"
+
+    def __str__(self):
+        return f"Estadísticas de precios - {self.producto.nombre}"
+
+
+class ResumenMensualCompras(models.Model):
+    """
+    Cantidad y monto de órdenes de compra por mes, proveedor y estado.
+
+    Se mantiene de forma incremental al guardar o eliminar órdenes (ver
+    compras.resumenes); el comando ``reconstruir_resumen_compras`` lo regenera
+    desde ``OrdenCompra``.
+    """
+    mes = models.DateField()
+    proveedor = models.ForeignKey(Proveedor, on_delete=models.CASCADE, related_name="resumenes_compras")
+    estado = models.CharField(max_length=20, choices=OrdenCompra.ESTADO_CHOICES)
+    ordenes = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal('0'))
+
+    class Meta:
+        ordering = ['-mes', 'proveedor']
+        verbose_name = "Resumen Mensual de Compras"
+        verbose_name_plural = "Resúmenes Mensuales de Compras"
+        unique_together = ['mes', 'proveedor', 'estado']
+
+    def __str__(self):
+        return f"{self.mes:%Y-%m} - {self.proveedor.nombre} - {self.estado}"
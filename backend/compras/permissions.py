@@ -7,6 +7,12 @@ from rest_framework import permissions
 from django.contrib.auth.models import Group
 from django.core.exceptions import PermissionDenied
 
+from authentication.roles import roles_de_request, roles_de_usuario
+
+GRUPO_ADMIN = 'Compras Admin'
+GRUPO_OPERADOR = 'Compras Operador'
+GRUPOS_COMPRAS = frozenset([GRUPO_ADMIN, GRUPO_OPERADOR])
+
 
 class ComprasBasePermission(permissions.BasePermission):
     """Permiso base para el módulo de compras"""
@@ -21,10 +27,10 @@ class ComprasBasePermission(permissions.BasePermission):
             return True
         
         # Verificar si el usuario pertenece a algún grupo de compras
-        grupos_compras = ['Compras Admin', 'Compras Operador']
-        user_groups = request.user.groups.values_list('name', flat=True)
-        
-        return any(grupo in user_groups for grupo in grupos_compras)
+        return not GRUPOS_COMPRAS.isdisjoint(roles_de_request(request))
+    
+    def es_admin(self, request):
+        return request.user.is_superuser or GRUPO_ADMIN in roles_de_request(request)
 
 
 class ComprasAdminPermission(ComprasBasePermission):
@@ -35,10 +41,7 @@ class ComprasAdminPermission(ComprasBasePermission):
             return False
         
         # Solo admins de compras o superusuarios
-        return (
-            request.user.is_superuser or 
-            request.user.groups.filter(name='Compras Admin').exists()
-        )
+        return self.es_admin(request)
 
 
 class ComprasOperadorPermission(ComprasBasePermission):
@@ -50,10 +53,7 @@ class ComprasOperadorPermission(ComprasBasePermission):
         
         # Operadores pueden ver y crear, pero no eliminar
         if request.method in ['DELETE']:
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         return True
 
@@ -70,17 +70,11 @@ class OrdenCompraPermission(ComprasBasePermission):
         
         # Solo admins pueden eliminar órdenes
         if action == 'destroy':
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         # Solo admins pueden enviar órdenes
         if action == 'enviar':
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         # Operadores pueden crear y editar borradores
         if action in ['create', 'update', 'partial_update']:
@@ -97,8 +91,7 @@ class OrdenCompraPermission(ComprasBasePermission):
             return False
         
         # Los admins pueden editar cualquier orden
-        if (request.user.is_superuser or 
-            request.user.groups.filter(name='Compras Admin').exists()):
+        if self.es_admin(request):
             return True
         
         # Los operadores solo pueden editar órdenes en borrador
@@ -123,17 +116,11 @@ class MovimientoStockPermission(ComprasBasePermission):
         
         # Solo admins pueden hacer ajustes de inventario
         if action == 'ajuste_inventario':
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         # Solo lectura para operadores en movimientos
         if request.method in ['POST', 'PUT', 'PATCH', 'DELETE']:
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         return True
 
@@ -149,10 +136,7 @@ class AlertaStockPermission(ComprasBasePermission):
         
         # Solo admins pueden generar alertas masivamente
         if action == 'generar_stock_minimo':
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         # Operadores pueden marcar como vista y resolver
         if action in ['marcar_vista', 'resolver']:
@@ -160,10 +144,7 @@ class AlertaStockPermission(ComprasBasePermission):
         
         # Solo lectura para crear/eliminar alertas
         if request.method in ['POST', 'DELETE']:
-            return (
-                request.user.is_superuser or 
-                request.user.groups.filter(name='Compras Admin').exists()
-            )
+            return self.es_admin(request)
         
         return True
 
@@ -205,23 +186,17 @@ def audit_action(action_type):
 # Funciones auxiliares para verificar roles
 def is_compras_admin(user):
     """Verifica si el usuario es admin de compras"""
-    return (
-        user.is_superuser or 
-        user.groups.filter(name='Compras Admin').exists()
-    )
+    return user.is_superuser or GRUPO_ADMIN in roles_de_usuario(user)
 
 
 def is_compras_operador(user):
     """Verifica si el usuario es operador de compras"""
-    return user.groups.filter(name='Compras Operador').exists()
+    return GRUPO_OPERADOR in roles_de_usuario(user)
 
 
 def has_compras_access(user):
     """Verifica si el usuario tiene acceso al módulo de compras"""
-    return (
-        user.is_superuser or 
-        user.groups.filter(name__in=['Compras Admin', 'Compras Operador']).exists()
-    )
+    return user.is_superuser or not GRUPOS_COMPRAS.isdisjoint(roles_de_usuario(user))
 
 
 # Middleware para auditoría (opcional)
@@ -0,0 +1,110 @@
+"""
+Recepción de mercadería de órdenes de compra.
+
+La orden se bloquea una sola vez y todos sus ítems se leen en una consulta.
+Los movimientos de stock y el historial de precios se insertan con
+``bulk_create`` y el stock, el costo promedio, los totales y las alertas se
+actualizan al final con operaciones por conjunto, todo en una transacción:
+una entrega de 200 líneas cuesta lo mismo en consultas que una de 2.
+"""
+
+from decimal import Decimal, InvalidOperation
+
+from django.db import transaction
+from django.utils import timezone
+
+from .alertas import alertar_precios_atipicos
+from .models import HistorialPrecios, MovimientoStock, OrdenCompra, OrdenCompraItem
+from .stock import aplicar_entradas_en_lote
+
+
+class RecepcionError(ValueError):
+    """Los datos de la recepción no son válidos para la orden."""
+
+
+def _cantidades_por_item(lineas):
+    """Normaliza las líneas recibidas a ``{item_id: cantidad}``"""
+    cantidades = {}
+    for linea in lineas:
+        try:
+            item_id = int(linea['id'])
+            cantidad = Decimal(str(linea['cantidad_recibida']))
+        except (KeyError, TypeError, ValueError, InvalidOperation):
+            raise RecepcionError('Cada ítem debe indicar id y cantidad_recibida válidos')
+        if cantidad <= 0:
+            raise RecepcionError(f'La cantidad recibida del ítem {item_id} debe ser mayor a cero')
+        cantidades[item_id] = cantidades.get(item_id, Decimal('0')) + cantidad
+    return cantidades
+
+
+def recibir_mercaderia(orden_id, lineas, usuario):
+    """
+    Registra la recepción de ``lineas`` (``[{'id', 'cantidad_recibida'}]``)
+    para la orden indicada y devuelve la orden actualizada.
+
+    Lanza ``RecepcionError`` sin modificar nada si alguna línea es inválida.
+    """
+    cantidades = _cantidades_por_item(lineas)
+
+    with transaction.atomic():
+        orden = OrdenCompra.objects.select_for_update(of=('self',)).select_related(
+            'proveedor'
+        ).get(pk=orden_id)
+
+        if not orden.puede_recibir_mercaderia():
+            raise RecepcionError('La orden no puede recibir mercadería en su estado actual')
+
+        items = {item.id: item for item in orden.items.select_related('producto')}
+
+        for item_id, cantidad in cantidades.items():
+            item = items.get(item_id)
+            if item is None:
+                raise RecepcionError(f'Item con ID {item_id} no encontrado')
+            if cantidad > item.cantidad_pendiente:
+                raise RecepcionError(
+                    f'Cantidad recibida excede la cantidad pendiente para {item.producto.nombre}'
+                )
+
+        recibidos = []
+        movimientos = []
+        historial = []
+        for item_id, cantidad in cantidades.items():
+            item = items[item_id]
+            item.cantidad_recibida += cantidad
+            recibidos.append(item)
+            movimientos.append(MovimientoStock(
+                producto_id=item.producto_id,
+                tipo='entrada',
+                cantidad=cantidad,
+                costo_unitario=item.precio_unitario,
+                referencia=f'OC-{orden.numero}',
+                orden_compra_item=item,
+                usuario=usuario,
+                notas=f'Recepción de mercadería - OC {orden.numero}'
+            ))
+            historial.append(HistorialPrecios(
+                producto_id=item.producto_id,
+                proveedor_id=orden.proveedor_id,
+                precio=item.precio_unitario,
+                orden_compra_item=item,
+                cantidad_comprada=cantidad
+            ))
+
+        # bulk_* no dispara save() ni señales: los efectos se aplican en bloque abajo
+        OrdenCompraItem.objects.bulk_update(recibidos, ['cantidad_recibida'])
+        MovimientoStock.objects.bulk_create(movimientos)
+        historial = HistorialPrecios.objects.bulk_create(historial)
+
+        aplicar_entradas_en_lote(movimientos)
+        alertar_precios_atipicos(historial)
+
+        # Actualizar estado y totales de la orden con los ítems ya cargados
+        if all(item.esta_completo for item in items.values()):
+            orden.estado = 'recibida_completa'
+            orden.fecha_entrega_real = timezone.now().date()
+        else:
+            orden.estado = 'recibida_parcial'
+        orden.asignar_totales(items.values())
+        orden.save(update_fields=['estado', 'fecha_entrega_real', 'subtotal', 'impuestos', 'total'])
+
+    return orden
@@ -0,0 +1,95 @@
+"""
+Resumen mensual de órdenes de compra.
+
+``ResumenMensualCompras`` acumula cantidad y monto de órdenes por
+(mes, proveedor, estado). Cada alta, baja o cambio de estado, total o
+proveedor de una ``OrdenCompra`` resta la contribución anterior y suma la
+nueva dentro de la misma transacción, así que los reportes leen una fila por
+mes y proveedor en lugar de recorrer todas las órdenes.
+"""
+
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+# Campos de OrdenCompra que afectan al resumen
+CAMPOS_RESUMEN = frozenset(['fecha_creacion', 'proveedor', 'proveedor_id', 'estado', 'total'])
+
+
+def _monto(total):
+    """Redondea como lo hace la columna ``OrdenCompra.total``"""
+    return Decimal(total or 0).quantize(Decimal('0.01'))
+
+
+def mes_de(fecha):
+    """Primer día del mes (hora local) de ``fecha``"""
+    if timezone.is_aware(fecha):
+        fecha = timezone.localtime(fecha)
+    return fecha.date().replace(day=1)
+
+
+def aplicar_diferencia(mes, proveedor_id, estado, ordenes, total):
+    """Suma ``ordenes`` y ``total`` (pueden ser negativos) a la fila del resumen"""
+    from .models import ResumenMensualCompras
+
+    filas = ResumenMensualCompras.objects.filter(mes=mes, proveedor_id=proveedor_id, estado=estado)
+    if filas.update(ordenes=F('ordenes') + ordenes, total=F('total') + total):
+        return
+    try:
+        with transaction.atomic():
+            ResumenMensualCompras.objects.create(
+                mes=mes, proveedor_id=proveedor_id, estado=estado, ordenes=ordenes, total=total
+            )
+    except IntegrityError:
+        # Otra transacción creó la fila mientras tanto
+        filas.update(ordenes=F('ordenes') + ordenes, total=F('total') + total)
+
+
+def registrar_orden(orden, anterior=None):
+    """
+    Ajusta el resumen después de guardar ``orden``. ``anterior`` es la tupla
+    ``(fecha_creacion, proveedor_id, estado, total)`` previa, o ``None`` si la
+    orden es nueva.
+    """
+    actual = (orden.fecha_creacion, orden.proveedor_id, orden.estado, _monto(orden.total))
+    if anterior is not None:
+        fecha, proveedor_id, estado, total = anterior
+        if (mes_de(fecha), proveedor_id, estado, total) == (mes_de(actual[0]), *actual[1:]):
+            return
+        aplicar_diferencia(mes_de(fecha), proveedor_id, estado, -1, -total)
+
+    fecha, proveedor_id, estado, total = actual
+    aplicar_diferencia(mes_de(fecha), proveedor_id, estado, 1, total)
+
+
+def quitar_orden(orden):
+    """Descuenta una orden eliminada del resumen"""
+    aplicar_diferencia(
+        mes_de(orden.fecha_creacion), orden.proveedor_id, orden.estado, -1, -_monto(orden.total)
+    )
+
+
+def resumen_desde_ordenes(ordenes=None):
+    """
+    Recalcula el resumen a partir de ``OrdenCompra`` con una consulta agrupada.
+    Devuelve un diccionario ``{(mes, proveedor_id, estado): (ordenes, total)}``.
+    """
+    from .models import OrdenCompra
+
+    if ordenes is None:
+        ordenes = OrdenCompra.objects.all()
+    filas = ordenes.annotate(
+        mes=TruncMonth('fecha_creacion')
+    ).values('mes', 'proveedor_id', 'estado').annotate(
+        cantidad=Count('id'), monto=Sum('total')
+    ).order_by()
+
+    resumen = {}
+    for fila in filas:
+        mes = fila['mes']
+        mes = mes.date() if hasattr(mes, 'date') else mes
+        resumen[(mes, fila['proveedor_id'], fila['estado'])] = (fila['cantidad'], fila['monto'] or Decimal('0'))
+    return resumen
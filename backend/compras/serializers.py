@@ -9,6 +9,7 @@ from .models import (
     OrdenCompra, OrdenCompraItem, MovimientoStock,
     HistorialPrecios, AlertaStock
 )
+from .stock import StockInsuficienteError
 
 
 class CategoriaCompraSerializer(serializers.ModelSerializer):
@@ -227,7 +228,10 @@ class MovimientoStockSerializer(serializers.ModelSerializer):
 
     def create(self, validated_data):
         validated_data['usuario'] = self.context['request'].user
-        return super().create(validated_data)
+        try:
+            return super().create(validated_data)
+        except StockInsuficienteError as exc:
+            raise serializers.ValidationError({'cantidad': str(exc)})
 
 
 class HistorialPreciosSerializer(serializers.ModelSerializer):
@@ -0,0 +1,159 @@
+"""
+Libro mayor de stock.
+
+Cada ``MovimientoStock`` se aplica una única vez sobre ``Producto.stock`` mediante
+un UPDATE atómico con expresiones ``F()``, dentro de la misma transacción que
+inserta el movimiento. Así no se pierden actualizaciones cuando varias
+recepciones o ajustes llegan en paralelo.
+
+Las entradas con costo también mantienen los acumulados ``entradas_cantidad`` y
+``entradas_valor`` del producto, de los que se deriva ``avg_cost`` sin recorrer
+el historial.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, Sum, Value, When
+from django.db.models.functions import Round
+
+from productos.models import Producto
+
+
+class StockInsuficienteError(ValueError):
+    """La salida solicitada supera el stock disponible del producto."""
+
+
+def aplicar_movimiento(movimiento) -> Decimal:
+    """
+    Aplica el movimiento al stock del producto y devuelve el saldo resultante.
+
+    Debe llamarse una sola vez por movimiento, dentro de la transacción que
+    lo inserta (``MovimientoStock.save`` ya lo hace).
+    """
+    productos = Producto.objects.filter(pk=movimiento.producto_id)
+    cantidad = movimiento.cantidad
+
+    with transaction.atomic():
+        if movimiento.tipo == 'entrada':
+            if movimiento.costo_unitario and cantidad > 0:
+                # Costo promedio ponderado en O(1): se acumulan cantidad y valor
+                # de las entradas y avg_cost se recalcula en el mismo UPDATE.
+                valor = cantidad * movimiento.costo_unitario
+                productos.update(
+                    stock=F('stock') + cantidad,
+                    entradas_cantidad=F('entradas_cantidad') + cantidad,
+                    entradas_valor=F('entradas_valor') + valor,
+                    avg_cost=Round(
+                        (F('entradas_valor') + valor) / (F('entradas_cantidad') + cantidad), 2
+                    ),
+                )
+            else:
+                productos.update(stock=F('stock') + cantidad)
+        elif movimiento.tipo == 'salida':
+            # UPDATE condicional: solo descuenta si alcanza el stock
+            if not productos.filter(stock__gte=cantidad).update(stock=F('stock') - cantidad):
+                raise StockInsuficienteError(
+                    f'La cantidad supera el stock disponible del producto {movimiento.producto_id}'
+                )
+        elif movimiento.tipo == 'ajuste':
+            # Para ajustes, la cantidad es el nuevo stock total
+            productos.update(stock=cantidad)
+
+        # La fila queda bloqueada por el UPDATE hasta el commit, por lo que
+        # esta lectura devuelve el saldo que dejó este movimiento.
+        saldo, min_stock = productos.values_list('stock', 'min_stock').get()
+        verificar_stock_minimo(movimiento.producto_id, saldo, min_stock)
+
+    return saldo
+
+
+def aplicar_entradas_en_lote(movimientos) -> None:
+    """
+    Aplica en bloque un conjunto de movimientos de entrada ya insertados con
+    ``bulk_create``. Agrupa por producto y resuelve stock, acumulados y
+    ``avg_cost`` con un máximo de dos UPDATE, sin importar la cantidad de líneas.
+    """
+    stock = defaultdict(Decimal)
+    costo = defaultdict(lambda: [Decimal('0'), Decimal('0')])
+    for movimiento in movimientos:
+        stock[movimiento.producto_id] += movimiento.cantidad
+        if movimiento.costo_unitario and movimiento.cantidad > 0:
+            costo[movimiento.producto_id][0] += movimiento.cantidad
+            costo[movimiento.producto_id][1] += movimiento.cantidad * movimiento.costo_unitario
+
+    def por_producto(valores):
+        return Case(
+            *[When(pk=producto_id, then=Value(valor)) for producto_id, valor in valores.items()],
+            default=Value(Decimal('0')),
+            output_field=DecimalField(max_digits=18, decimal_places=4),
+        )
+
+    with transaction.atomic():
+        if costo:
+            cantidad = por_producto({producto_id: c for producto_id, (c, _v) in costo.items()})
+            valor = por_producto({producto_id: v for producto_id, (_c, v) in costo.items()})
+            Producto.objects.filter(pk__in=costo.keys()).update(
+                stock=F('stock') + por_producto({producto_id: stock[producto_id] for producto_id in costo}),
+                entradas_cantidad=F('entradas_cantidad') + cantidad,
+                entradas_valor=F('entradas_valor') + valor,
+                avg_cost=Round((F('entradas_valor') + valor) / (F('entradas_cantidad') + cantidad), 2),
+            )
+        sin_costo = {producto_id: c for producto_id, c in stock.items() if producto_id not in costo}
+        if sin_costo:
+            Producto.objects.filter(pk__in=sin_costo.keys()).update(
+                stock=F('stock') + por_producto(sin_costo)
+            )
+
+
+def verificar_stock_minimo(producto_id, saldo, min_stock) -> None:
+    """Crea una alerta de stock mínimo si no hay otra abierta para el producto."""
+    from .models import AlertaStock
+
+    if not min_stock or saldo > min_stock:
+        return
+
+    alerta_existente = AlertaStock.objects.filter(
+        producto_id=producto_id,
+        tipo='stock_minimo',
+        estado__in=['activa', 'vista']
+    ).exists()
+
+    if not alerta_existente:
+        AlertaStock.objects.create(
+            tipo='stock_minimo',
+            producto_id=producto_id,
+            mensaje=f'Stock bajo: {saldo} unidades (mínimo: {min_stock})',
+            valor_referencia=saldo
+        )
+
+
+def acumulados_por_replay(productos_ids=None):
+    """
+    Recalcula desde el historial completo la cantidad y el valor acumulados
+    de las entradas con costo. Devuelve ``{producto_id: (cantidad, valor)}``.
+    """
+    from .models import MovimientoStock
+
+    movimientos = MovimientoStock.objects.filter(
+        tipo='entrada', costo_unitario__gt=0, cantidad__gt=0
+    )
+    if productos_ids is not None:
+        movimientos = movimientos.filter(producto_id__in=productos_ids)
+
+    filas = movimientos.values('producto_id').annotate(
+        total_cantidad=Sum('cantidad'),
+        total_valor=Sum(
+            F('cantidad') * F('costo_unitario'),
+            output_field=DecimalField(max_digits=18, decimal_places=4),
+        ),
+    ).order_by()
+    return {fila['producto_id']: (fila['total_cantidad'], fila['total_valor']) for fila in filas}
+
+
+def costo_promedio(cantidad, valor) -> Decimal:
+    """Costo promedio ponderado redondeado como ``Producto.avg_cost``."""
+    if not cantidad:
+        return Decimal('0')
+    return round(valor / cantidad, 2)
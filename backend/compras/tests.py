@@ -1,3 +1,491 @@
-from django.test import TestCase
+import csv
+import threading
+from datetime import timedelta
+from decimal import Decimal
+from io import StringIO
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from productos.models import Producto
+from proveedores.models import Proveedor
+from .estadisticas import resumir
+from .models import (
+    AlertaStock, EstadisticaPrecios, HistorialPrecios, MovimientoStock, OrdenCompra, OrdenCompraItem,
+    ResumenMensualCompras
+)
+from .recepcion import RecepcionError, recibir_mercaderia
+from .resumenes import resumen_desde_ordenes
+from .stock import StockInsuficienteError
+
+
+def crear_usuario(username='compras'):
+    return get_user_model().objects.create_user(
+        username=username, email=f'{username}@example.com', password='secreta123'
+    )
+
+
+class StockLedgerTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.producto = Producto.objects.create(
+            nombre='Muzzarella 1kg', sku='MZ-1', stock=Decimal('10'), min_stock=Decimal('5')
+        )
+
+    def registrar(self, tipo, cantidad):
+        return MovimientoStock.objects.create(
+            producto=self.producto, tipo=tipo, cantidad=Decimal(cantidad), usuario=self.usuario
+        )
+
+    def test_entrada_se_aplica_una_sola_vez(self):
+        movimiento = self.registrar('entrada', '4')
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('14'))
+        self.assertEqual(movimiento.producto.stock, Decimal('14'))
+
+    def test_editar_movimiento_no_vuelve_a_aplicarlo(self):
+        movimiento = self.registrar('entrada', '4')
+        movimiento.notas = 'corrección'
+        movimiento.save()
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('14'))
+
+    def test_ajuste_fija_el_stock(self):
+        self.registrar('ajuste', '3')
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('3'))
+        self.assertTrue(
+            AlertaStock.objects.filter(producto=self.producto, tipo='stock_minimo').exists()
+        )
+
+    def test_salida_sin_stock_revierte_el_movimiento(self):
+        with self.assertRaises(StockInsuficienteError):
+            self.registrar('salida', '11')
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.stock, Decimal('10'))
+        self.assertFalse(MovimientoStock.objects.exists())
+
+
+class CostoPromedioIncrementalTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.producto = Producto.objects.create(nombre='Queso Cremoso', sku='QC-1')
+
+    def entrada(self, cantidad, costo):
+        MovimientoStock.objects.create(
+            producto=self.producto, tipo='entrada', cantidad=Decimal(cantidad),
+            costo_unitario=Decimal(costo), usuario=self.usuario
+        )
+
+    def test_costo_promedio_ponderado(self):
+        self.entrada('10', '100')
+        self.entrada('30', '120')
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.entradas_cantidad, Decimal('40'))
+        self.assertEqual(self.producto.entradas_valor, Decimal('4600'))
+        self.assertEqual(self.producto.avg_cost, Decimal('115.00'))
+
+    def test_verificar_contra_replay(self):
+        self.entrada('3', '10.50')
+        salida = StringIO()
+        call_command('calcular_costo_promedio', '--verificar', stdout=salida)
+        self.assertIn('Con diferencias: 0', salida.getvalue())
+
+        Producto.objects.filter(pk=self.producto.pk).update(entradas_cantidad=Decimal('99'))
+        salida = StringIO()
+        call_command('calcular_costo_promedio', '--verificar', stdout=salida)
+        self.assertIn('Con diferencias: 1', salida.getvalue())
+
+        call_command('calcular_costo_promedio', stdout=StringIO())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.entradas_cantidad, Decimal('3'))
+
+    def test_recalculo_por_lotes_e_incremental(self):
+        otro = Producto.objects.create(nombre='Manteca', sku='MA-1')
+        self.entrada('10', '100')
+        MovimientoStock.objects.create(
+            producto=otro, tipo='entrada', cantidad=Decimal('4'),
+            costo_unitario=Decimal('25'), usuario=self.usuario
+        )
+        Producto.objects.update(avg_cost=0, entradas_cantidad=0, entradas_valor=0)
+
+        MovimientoStock.objects.filter(producto=otro).update(fecha='2020-01-01T00:00:00Z')
+        salida = StringIO()
+        call_command('calcular_costo_promedio', '--since', '2024-01-01', '--lote', '1', stdout=salida)
+        self.assertIn('Productos actualizados: 1', salida.getvalue())
+        self.assertIn('agregado:', salida.getvalue())
+        otro.refresh_from_db()
+        self.assertEqual(otro.avg_cost, Decimal('0'))
+
+        call_command('calcular_costo_promedio', '--lote', '1', stdout=StringIO())
+        self.producto.refresh_from_db()
+        otro.refresh_from_db()
+        self.assertEqual(self.producto.avg_cost, Decimal('100.00'))
+        self.assertEqual(otro.entradas_valor, Decimal('100'))
+
+    def test_recalculo_conserva_el_costo_de_productos_sin_entradas(self):
+        self.entrada('10', '100')
+        MovimientoStock.objects.filter(producto=self.producto).delete()
+
+        salida = StringIO()
+        call_command('calcular_costo_promedio', stdout=salida)
+        self.assertIn('Productos actualizados: 1', salida.getvalue())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.entradas_cantidad, Decimal('0'))
+        self.assertEqual(self.producto.entradas_valor, Decimal('0'))
+        self.assertEqual(self.producto.avg_cost, Decimal('100.00'))
+
+        # Un costo cargado a mano tampoco se pisa
+        Producto.objects.filter(pk=self.producto.pk).update(avg_cost=Decimal('80'))
+        salida = StringIO()
+        call_command('calcular_costo_promedio', stdout=salida)
+        self.assertIn('Productos actualizados: 0', salida.getvalue())
+        self.producto.refresh_from_db()
+        self.assertEqual(self.producto.avg_cost, Decimal('80.00'))
+
+
+class RecepcionMercaderiaTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.proveedor = Proveedor.objects.create(nombre='Tambo La Esperanza')
+
+    def crear_orden(self, lineas, numero):
+        orden = OrdenCompra.objects.create(
+            numero=numero, proveedor=self.proveedor, estado='enviada', creado_por=self.usuario
+        )
+        for i in range(lineas):
+            producto = Producto.objects.create(nombre=f'{numero} producto {i}', sku=f'{numero}-{i}')
+            OrdenCompraItem.objects.create(
+                orden_compra=orden, producto=producto,
+                cantidad_solicitada=Decimal('10'), precio_unitario=Decimal('50')
+            )
+        return orden
+
+    def recibir(self, orden, cantidad='10'):
+        datos = [{'id': item.id, 'cantidad_recibida': cantidad} for item in orden.items.all()]
+        with CaptureQueriesContext(connection) as consultas:
+            recibir_mercaderia(orden.pk, datos, self.usuario)
+        return len(consultas)
+
+    def test_recepcion_completa(self):
+        orden = self.crear_orden(3, 'OC-A')
+        self.recibir(orden)
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, 'recibida_completa')
+        self.assertEqual(orden.total, Decimal('1815.00'))
+        self.assertEqual(MovimientoStock.objects.count(), 3)
+        self.assertEqual(HistorialPrecios.objects.count(), 3)
+        for item in orden.items.select_related('producto'):
+            self.assertEqual(item.cantidad_recibida, Decimal('10'))
+            self.assertEqual(item.producto.stock, Decimal('10'))
+            self.assertEqual(item.producto.avg_cost, Decimal('50.00'))
+
+    def test_consultas_constantes_por_orden(self):
+        # La primera recepción del mes crea la fila del resumen mensual
+        self.recibir(self.crear_orden(1, 'OC-0'))
+        chica = self.recibir(self.crear_orden(2, 'OC-B'))
+        grande = self.recibir(self.crear_orden(40, 'OC-C'))
+        self.assertEqual(chica, grande)
+
+    def test_exceso_no_modifica_nada(self):
+        orden = self.crear_orden(2, 'OC-D')
+        with self.assertRaises(RecepcionError):
+            self.recibir(orden, cantidad='11')
+        orden.refresh_from_db()
+        self.assertEqual(orden.estado, 'enviada')
+        self.assertFalse(MovimientoStock.objects.exists())
+
+
+class GenerarAlertasTests(TestCase):
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(nombre='Cooperativa Láctea')
+
+    def test_alertas_de_stock_sin_duplicar(self):
+        agotado = Producto.objects.create(nombre='Dulce de leche', sku='DL-1', stock=0)
+        bajo = Producto.objects.create(nombre='Yogur', sku='YO-1', stock=2, min_stock=5)
+        Producto.objects.create(nombre='Crema', sku='CR-1', stock=20, min_stock=5)
+
+        salida = StringIO()
+        call_command('generar_alertas_stock', '--tipo', 'stock', stdout=salida)
+        self.assertIn('2 productos sin alerta, 2 alertas creadas', salida.getvalue())
+        self.assertEqual(
+            set(AlertaStock.objects.values_list('producto_id', flat=True)), {agotado.id, bajo.id}
+        )
+
+        salida = StringIO()
+        call_command('generar_alertas_stock', '--tipo', 'stock', stdout=salida)
+        self.assertIn('0 productos sin alerta, 0 alertas creadas', salida.getvalue())
+        self.assertEqual(AlertaStock.objects.count(), 2)
+
+    def test_alertas_de_precio_atipico(self):
+        estable = Producto.objects.create(nombre='Leche', sku='LE-1')
+        atipico = Producto.objects.create(nombre='Queso Sardo', sku='QS-1')
+        HistorialPrecios.objects.bulk_create(
+            [HistorialPrecios(producto=estable, proveedor=self.proveedor, precio=Decimal(p))
+             for p in ('100', '101', '99', '100', '100')]
+            + [HistorialPrecios(producto=atipico, proveedor=self.proveedor, precio=Decimal(p))
+               for p in ('100', '100', '100', '100', '100', '100', '100', '100', '100', '300')]
+        )
+
+        salida = StringIO()
+        call_command('generar_alertas_stock', '--tipo', 'precios', stdout=salida)
+        self.assertIn('15 filas escaneadas, 1 alertas creadas', salida.getvalue())
+        alerta = AlertaStock.objects.get()
+        self.assertEqual(alerta.producto, atipico)
+        self.assertEqual(alerta.valor_referencia, Decimal('300'))
+
+
+class EstadisticasPreciosTests(TestCase):
+    def setUp(self):
+        self.proveedor = Proveedor.objects.create(nombre='Lácteos del Sur')
+        self.producto = Producto.objects.create(nombre='Provoleta', sku='PR-1')
+
+    def registrar(self, precio):
+        return HistorialPrecios.objects.create(
+            producto=self.producto, proveedor=self.proveedor, precio=Decimal(precio)
+        )
+
+    def test_estadisticas_incrementales(self):
+        for precio in ('100', '110', '90', '100'):
+            self.registrar(precio)
+        muestras, promedio, desviacion = resumir(self.producto.estadistica_precios.buckets)
+        self.assertEqual(muestras, 4)
+        self.assertAlmostEqual(promedio, 100.0)
+        self.assertAlmostEqual(desviacion, 50 ** 0.5)
+
+    def test_alerta_de_precio_atipico_en_insercion(self):
+        for precio in ('100', '101', '99', '100'):
+            self.registrar(precio)
+        self.assertFalse(AlertaStock.objects.exists())
+
+        with self.assertNumQueries(7):
+            self.registrar('180')
+        alerta = AlertaStock.objects.get()
+        self.assertEqual(alerta.tipo, 'precio_atipico')
+        self.assertEqual(alerta.valor_referencia, Decimal('180'))
+
+        self.registrar('185')
+        self.assertEqual(AlertaStock.objects.count(), 1)
+
+    def test_reconstruir_desde_historial(self):
+        for precio in ('100', '120', '80'):
+            self.registrar(precio)
+        esperado = resumir(self.producto.estadistica_precios.buckets)
+        EstadisticaPrecios.objects.update(buckets={})
+
+        call_command('reconstruir_estadisticas_precios', stdout=StringIO())
+        obtenido = resumir(EstadisticaPrecios.objects.get(producto=self.producto).buckets)
+        self.assertEqual(obtenido[0], esperado[0])
+        self.assertAlmostEqual(obtenido[1], esperado[1])
+        self.assertAlmostEqual(obtenido[2], esperado[2])
+
+
+class EstadisticasDashboardTests(TestCase):
+    URL = '/api/compras/reportes/estadisticas_dashboard/'
+
+    def setUp(self):
+        self.usuario = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='secreta123',
+            first_name='Ada', last_name='Admin'
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.usuario)
+        tambo = Proveedor.objects.create(nombre='Tambo Norte')
+        fabrica = Proveedor.objects.create(nombre='Fábrica Sur')
+        for numero, proveedor, estado, total in [
+            ('1', tambo, 'recibida_completa', '1000'),
+            ('2', tambo, 'recibida_parcial', '500'),
+            ('3', fabrica, 'recibida_completa', '2000'),
+            ('4', fabrica, 'borrador', '300'),
+            ('5', fabrica, 'enviada', '700'),
+        ]:
+            OrdenCompra.objects.create(
+                numero=numero, proveedor=proveedor, estado=estado,
+                total=Decimal(total), creado_por=self.usuario
+            )
+        Producto.objects.create(nombre='Manteca', sku='MA-1', stock=1, min_stock=5)
+
+    def test_presupuesto_de_consultas(self):
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(self.URL)
+        self.assertEqual(respuesta.status_code, 200)
+        datos = respuesta.json()
+        self.assertEqual(datos['total_ordenes'], 5)
+        self.assertEqual(datos['ordenes_pendientes'], 1)
+        self.assertEqual(datos['ordenes_completadas'], 2)
+        self.assertEqual(datos['proveedores_activos'], 2)
+        self.assertEqual(datos['total_gastado_mes'], 3500.0)
+        self.assertEqual(datos['productos_bajo_stock'], 1)
+        self.assertEqual(len(datos['compras_por_mes']), 6)
+        self.assertEqual(datos['compras_por_mes'][-1], {
+            'mes': timezone.now().strftime('%Y-%m'), 'total': 3500.0
+        })
+        self.assertEqual(
+            [(p['proveedor__nombre'], p['total'], p['ordenes']) for p in datos['top_proveedores']],
+            [('Fábrica Sur', 2000.0, 1), ('Tambo Norte', 1500.0, 2)]
+        )
+
+    def test_rango_filtra_top_proveedores_y_gasto_del_mes(self):
+        # Fuera del rango y del mes; el resumen mensual no se entera del update
+        OrdenCompra.objects.filter(proveedor__nombre='Tambo Norte').update(
+            fecha_creacion=timezone.now() - timedelta(days=400)
+        )
+        hoy = timezone.localdate().isoformat()
+        with self.assertNumQueries(3):
+            respuesta = self.client.get(f'{self.URL}?fecha_desde={hoy}&fecha_hasta={hoy}')
+        datos = respuesta.json()
+        self.assertEqual(datos['total_ordenes'], 3)
+        self.assertEqual(datos['ordenes_completadas'], 1)
+        self.assertEqual(datos['total_valor'], 3000.0)
+        self.assertEqual(datos['proveedores_activos'], 1)
+        self.assertEqual(datos['total_gastado_mes'], 2000.0)
+        self.assertEqual(
+            [(p['proveedor__nombre'], p['total'], p['ordenes']) for p in datos['top_proveedores']],
+            [('Fábrica Sur', 2000.0, 1)]
+        )
+
+    def test_exportar_csv_en_streaming_con_filtros(self):
+        respuesta = self.client.get('/api/compras/ordenes/exportar_csv/?estado=recibida_completa&ordering=total')
+        self.assertTrue(respuesta.streaming)
+        filas = list(csv.reader(b''.join(respuesta.streaming_content).decode('utf-8').splitlines()))
+        self.assertEqual(filas[0][:4], ['Número', 'Proveedor', 'Fecha Creación', 'Estado'])
+        self.assertEqual(
+            [(fila[0], fila[1], fila[3], fila[5], fila[6]) for fila in filas[1:]],
+            [('1', 'Tambo Norte', 'Recibida Completa', '1000.00', 'admin'),
+             ('3', 'Fábrica Sur', 'Recibida Completa', '2000.00', 'admin')]
+        )
+
+
+class ResumenMensualComprasTests(TestCase):
+    def setUp(self):
+        self.usuario = crear_usuario()
+        self.proveedor = Proveedor.objects.create(nombre='Tambo Norte')
+        self.producto = Producto.objects.create(nombre='Leche', sku='LE-1')
+
+    def resumen(self):
+        return {
+            (fila.mes, fila.proveedor_id, fila.estado): (fila.ordenes, fila.total)
+            for fila in ResumenMensualCompras.objects.exclude(ordenes=0)
+        }
+
+    def test_sigue_altas_cambios_y_bajas(self):
+        orden = OrdenCompra.objects.create(numero='R-1', proveedor=self.proveedor, creado_por=self.usuario)
+        OrdenCompraItem.objects.create(
+            orden_compra=orden, producto=self.producto,
+            cantidad_solicitada=Decimal('3'), precio_unitario=Decimal('33.33')
+        )
+        orden.refresh_from_db()
+        orden.estado = 'enviada'
+        orden.save(update_fields=['estado'])
+        otra = OrdenCompra.objects.create(
+            numero='R-2', proveedor=self.proveedor, estado='enviada', total=Decimal('10'), creado_por=self.usuario
+        )
+        self.assertEqual(self.resumen(), resumen_desde_ordenes())
+
+        otra.delete()
+        mes = timezone.localdate().replace(day=1)
+        self.assertEqual(self.resumen(), {(mes, self.proveedor.pk, 'enviada'): (1, Decimal('120.99'))})
+
+    def test_guardar_otros_campos_no_toca_el_resumen(self):
+        orden = OrdenCompra.objects.create(numero='R-3', proveedor=self.proveedor, creado_por=self.usuario)
+        orden.notas = 'Entregar por la mañana'
+        with self.assertNumQueries(1):
+            orden.save(update_fields=['notas'])
+
+    def test_reconstruir_repara_desvios(self):
+        OrdenCompra.objects.create(numero='R-4', proveedor=self.proveedor, total=Decimal('50'), creado_por=self.usuario)
+        OrdenCompra.objects.filter(numero='R-4').update(estado='cancelada')
+
+        salida = StringIO()
+        call_command('reconstruir_resumen_compras', '--dry-run', stdout=salida)
+        self.assertIn('1 corregidas, 1 eliminadas', salida.getvalue())
+        self.assertNotEqual(self.resumen(), resumen_desde_ordenes())
+
+        call_command('reconstruir_resumen_compras', stdout=StringIO())
+        self.assertEqual(self.resumen(), resumen_desde_ordenes())
+
+    def test_resumen_por_proveedor(self):
+        fabrica = Proveedor.objects.create(nombre='Fábrica Sur')
+        for numero, proveedor, total in [('R-5', self.proveedor, '100'), ('R-6', fabrica, '300'), ('R-7', self.proveedor, '50')]:
+            OrdenCompra.objects.create(numero=numero, proveedor=proveedor, total=Decimal(total), creado_por=self.usuario)
+
+        cliente = APIClient()
+        cliente.force_authenticate(get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='secreta123'
+        ))
+        respuesta = cliente.get('/api/compras/ordenes/resumen/proveedores/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(
+            [(item['proveedor'], Decimal(str(item['total'])), item['ordenes']) for item in respuesta.json()],
+            [('Fábrica Sur', Decimal('300'), 1), ('Tambo Norte', Decimal('150'), 2)]
+        )
+
+
+class PaginacionCursorTests(TestCase):
+    def test_recorre_movimientos_sin_contar(self):
+        usuario = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='secreta123'
+        )
+        producto = Producto.objects.create(nombre='Ricota', sku='RI-1')
+        MovimientoStock.objects.bulk_create([
+            MovimientoStock(producto=producto, tipo='entrada', cantidad=Decimal('1'), usuario=usuario)
+            for _ in range(45)
+        ])
+        cliente = APIClient()
+        cliente.force_authenticate(usuario)
+
+        vistos = []
+        url = '/api/compras/movimientos-stock/?page_size=20'
+        while url:
+            with CaptureQueriesContext(connection) as consultas:
+                datos = cliente.get(url).json()
+            self.assertNotIn('count', datos)
+            self.assertFalse(any('COUNT(' in consulta['sql'] for consulta in consultas))
+            vistos.extend(movimiento['id'] for movimiento in datos['results'])
+            url = datos['next']
+
+        self.assertEqual(vistos, list(MovimientoStock.objects.order_by('-fecha', '-id').values_list('id', flat=True)))
+
+
+class StockLedgerConcurrenciaTests(TransactionTestCase):
+    ESCRITORES = 60
+
+    def setUp(self):
+        if connection.vendor == 'sqlite' and connection.is_in_memory_db():
+            self.skipTest('SQLite en memoria no admite escritores concurrentes')
+        self.usuario = crear_usuario()
+        self.producto = Producto.objects.create(nombre='Ricota 500g', sku='RI-500', stock=Decimal('100'))
+
+    def test_sin_deriva_con_escritores_concurrentes(self):
+        barrera = threading.Barrier(self.ESCRITORES)
+        errores = []
+
+        def escritor(indice):
+            tipo, cantidad = ('entrada', Decimal('2')) if indice % 2 else ('salida', Decimal('1'))
+            try:
+                barrera.wait()
+                MovimientoStock.objects.create(
+                    producto_id=self.producto.pk, tipo=tipo, cantidad=cantidad, usuario=self.usuario
+                )
+            except Exception as exc:  # pragma: no cover - se reporta abajo
+                errores.append(exc)
+            finally:
+                connections.close_all()
+
+        hilos = [threading.Thread(target=escritor, args=(i,)) for i in range(self.ESCRITORES)]
+        for hilo in hilos:
+            hilo.start()
+        for hilo in hilos:
+            hilo.join()
+
+        self.assertEqual(errores, [])
+        self.producto.refresh_from_db()
+        entradas = self.ESCRITORES // 2
+        salidas = self.ESCRITORES - entradas
+        self.assertEqual(self.producto.stock, Decimal('100') + 2 * entradas - salidas)
+        self.assertEqual(MovimientoStock.objects.count(), self.ESCRITORES)
@@ -1,19 +1,20 @@
 from django.db.models import Count, Sum, Avg, Q, F
-from django.db import models
 from django.utils import timezone
-from django.http import HttpResponse
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
 from decimal import Decimal
-import csv
 from datetime import datetime, timedelta
 
+from core.exportacion import Columna, ExportacionCSVMixin, fecha_iso
+from core.paginacion import PaginacionCursor
+from core.replica import lectura_en_replica
+
 from .models import (
-    CategoriaCompra, Compra, OrdenCompra, OrdenCompraItem,
-    MovimientoStock, HistorialPrecios, AlertaStock
+    CategoriaCompra, Compra, OrdenCompra,
+    MovimientoStock, HistorialPrecios, AlertaStock, ResumenMensualCompras
 )
 from .serializers import (
     CategoriaCompraSerializer, CompraSerializer,
@@ -21,7 +22,9 @@ from .serializers import (
     MovimientoStockSerializer, HistorialPreciosSerializer,
     AlertaStockSerializer, EstadisticasComprasSerializer
 )
+from .alertas import generar_alertas_stock_minimo
 from .permissions import ComprasBasePermission
+from .recepcion import RecepcionError, recibir_mercaderia
 
 
 class CategoriaCompraViewSet(viewsets.ModelViewSet):
@@ -68,7 +71,7 @@ class CompraViewSet(viewsets.ModelViewSet):
 
 # Nuevas vistas extendidas para el módulo de compras
 
-class OrdenCompraViewSet(viewsets.ModelViewSet):
+class OrdenCompraViewSet(ExportacionCSVMixin, viewsets.ModelViewSet):
     queryset = OrdenCompra.objects.select_related('proveedor', 'creado_por', 'aprobado_por').prefetch_related('items__producto')
     serializer_class = OrdenCompraSerializer
     permission_classes = [IsAuthenticated, ComprasBasePermission]
@@ -104,114 +107,81 @@ class OrdenCompraViewSet(viewsets.ModelViewSet):
     def recibir_mercaderia(self, request, pk=None):
         """Registra la recepción de mercadería"""
         orden = self.get_object()
-        
-        if not orden.puede_recibir_mercaderia():
-            return Response(
-                {'error': 'La orden no puede recibir mercadería en su estado actual'},
-                status=status.HTTP_400_BAD_REQUEST
-            )
-        
-        items_data = request.data.get('items', [])
-        
-        for item_data in items_data:
-            try:
-                item = orden.items.get(id=item_data['id'])
-                cantidad_recibida = Decimal(str(item_data['cantidad_recibida']))
-                
-                if cantidad_recibida > item.cantidad_pendiente:
-                    return Response(
-                        {'error': f'Cantidad recibida excede la cantidad pendiente para {item.producto.nombre}'},
-                        status=status.HTTP_400_BAD_REQUEST
-                    )
-                
-                item.cantidad_recibida += cantidad_recibida
-                item.save()
-                
-                # Crear movimiento de stock
-                MovimientoStock.objects.create(
-                    producto=item.producto,
-                    tipo='entrada',
-                    cantidad=cantidad_recibida,
-                    costo_unitario=item.precio_unitario,
-                    referencia=f'OC-{orden.numero}',
-                    orden_compra_item=item,
-                    usuario=request.user,
-                    notas=f'Recepción de mercadería - OC {orden.numero}'
-                )
-                
-                # Registrar en historial de precios
-                HistorialPrecios.objects.create(
-                    producto=item.producto,
-                    proveedor=orden.proveedor,
-                    precio=item.precio_unitario,
-                    orden_compra_item=item,
-                    cantidad_comprada=cantidad_recibida
-                )
-                
-            except OrdenCompraItem.DoesNotExist:
-                return Response(
-                    {'error': f'Item con ID {item_data["id"]} no encontrado'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-        
-        # Actualizar estado de la orden
-        items_completos = all(item.esta_completo for item in orden.items.all())
-        if items_completos:
-            orden.estado = 'recibida_completa'
-            orden.fecha_entrega_real = timezone.now().date()
-        else:
-            orden.estado = 'recibida_parcial'
-        
-        orden.save(update_fields=['estado', 'fecha_entrega_real'])
-        
+
+        try:
+            recibir_mercaderia(orden.pk, request.data.get('items', []), request.user)
+        except RecepcionError as exc:
+            return Response({'error': str(exc)}, status=status.HTTP_400_BAD_REQUEST)
+
         return Response({'message': 'Mercadería recibida exitosamente'})
 
+    @action(detail=False, methods=['get'], url_path='resumen/proveedores')
+    def resumen_por_proveedor(self, request):
+        """
+        Órdenes y montos por proveedor en los últimos ``meses`` meses calendario
+        (12 por defecto), leídos de ResumenMensualCompras.
+        """
+        try:
+            meses = max(int(request.query_params.get('meses', 12)), 1)
+        except ValueError:
+            return Response({'error': 'meses debe ser un entero'}, status=status.HTTP_400_BAD_REQUEST)
+
+        filas = ResumenMensualCompras.objects.filter(
+            mes__gte=_inicio_de_mes(timezone.localdate(), meses - 1), ordenes__gt=0
+        )
+        if request.query_params.get('estado'):
+            filas = filas.filter(estado=request.query_params['estado'])
+        if request.query_params.get('proveedor'):
+            filas = filas.filter(proveedor_id=request.query_params['proveedor'])
+
+        data = (
+            filas.values('proveedor__id', 'proveedor__nombre')
+            .annotate(total=Sum('total'), ordenes=Sum('ordenes'))
+            .order_by('-total', 'proveedor__nombre')
+        )
+        return Response(
+            [
+                {
+                    'proveedor_id': item['proveedor__id'],
+                    'proveedor': item['proveedor__nombre'],
+                    'total': item['total'] or 0,
+                    'ordenes': item['ordenes'],
+                }
+                for item in data
+            ]
+        )
+
     @action(detail=False, methods=['get'])
     def estadisticas_dashboard(self, request):
         """Estadísticas para el dashboard"""
         hoy = timezone.now().date()
         hace_30_dias = hoy - timedelta(days=30)
         
-        ordenes_mes = self.get_queryset().filter(fecha_creacion__date__gte=hace_30_dias)
-        
-        estadisticas = {
-            'ordenes_pendientes': self.get_queryset().filter(estado__in=['enviada', 'confirmada']).count(),
-            'ordenes_mes': ordenes_mes.count(),
-            'monto_mes': ordenes_mes.aggregate(total=Sum('total'))['total'] or 0,
-            'ordenes_vencidas': self.get_queryset().filter(
-                fecha_entrega_esperada__lt=hoy,
-                estado__in=['enviada', 'confirmada']
-            ).count()
-        }
+        pendientes = Q(estado__in=['enviada', 'confirmada'])
+        ultimo_mes = Q(fecha_creacion__date__gte=hace_30_dias)
+
+        estadisticas = OrdenCompra.objects.aggregate(
+            ordenes_pendientes=Count('id', filter=pendientes),
+            ordenes_mes=Count('id', filter=ultimo_mes),
+            monto_mes=Sum('total', filter=ultimo_mes),
+            ordenes_vencidas=Count('id', filter=pendientes & Q(fecha_entrega_esperada__lt=hoy)),
+        )
+        estadisticas['monto_mes'] = estadisticas['monto_mes'] or 0
         
         return Response(estadisticas)
 
     @action(detail=False, methods=['get'])
     def exportar_csv(self, request):
-        """Exporta órdenes de compra a CSV"""
-        queryset = self.filter_queryset(self.get_queryset())
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="ordenes_compra.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Número', 'Proveedor', 'Fecha Creación', 'Estado',
-            'Fecha Entrega Esperada', 'Total', 'Creado Por'
+        """Exporta órdenes de compra a CSV (en streaming, con los filtros del listado)"""
+        return self.respuesta_csv('ordenes_compra.csv', [
+            Columna('Número', 'numero'),
+            Columna('Proveedor', 'proveedor__nombre'),
+            Columna('Fecha Creación', 'fecha_creacion', fecha_iso),
+            Columna('Estado', 'estado', dict(OrdenCompra.ESTADO_CHOICES).get),
+            Columna('Fecha Entrega Esperada', 'fecha_entrega_esperada', fecha_iso),
+            Columna('Total', 'total'),
+            Columna('Creado Por', 'creado_por__username'),
         ])
-        
-        for orden in queryset:
-            writer.writerow([
-                orden.numero,
-                orden.proveedor.nombre,
-                orden.fecha_creacion.strftime('%Y-%m-%d'),
-                orden.get_estado_display(),
-                orden.fecha_entrega_esperada.strftime('%Y-%m-%d') if orden.fecha_entrega_esperada else '',
-                orden.total,
-                orden.creado_por.username
-            ])
-        
-        return response
 
 
 class MovimientoStockViewSet(viewsets.ModelViewSet):
@@ -227,9 +197,11 @@ class MovimientoStockViewSet(viewsets.ModelViewSet):
     }
     search_fields = ['producto__nombre', 'referencia', 'notas']
     ordering_fields = ['fecha', 'cantidad']
-    ordering = ['-fecha']
+    ordering = ['-fecha', '-id']
+    pagination_class = PaginacionCursor
 
     @action(detail=False, methods=['get'])
+    @lectura_en_replica
     def resumen_por_producto(self, request):
         """Resumen de movimientos por producto"""
         queryset = self.filter_queryset(self.get_queryset())
@@ -241,7 +213,8 @@ class MovimientoStockViewSet(viewsets.ModelViewSet):
             total_movimientos=Count('id')
         ).order_by('producto__nombre', 'tipo')
         
-        return Response(resumen)
+        # Se evalúa acá y no al renderizar, para que lea de la réplica
+        return Response(list(resumen))
 
     @action(detail=False, methods=['post'])
     def ajustar_inventario(self, request):
@@ -260,7 +233,7 @@ class MovimientoStockViewSet(viewsets.ModelViewSet):
             from productos.models import Producto
             producto = Producto.objects.get(id=producto_id)
             
-            MovimientoStock.objects.create(
+            movimiento = MovimientoStock.objects.create(
                 producto=producto,
                 tipo='ajuste',
                 cantidad=Decimal(str(nuevo_stock)),
@@ -269,7 +242,10 @@ class MovimientoStockViewSet(viewsets.ModelViewSet):
                 notas=f'Ajuste de inventario: {motivo}'
             )
             
-            return Response({'message': 'Inventario ajustado exitosamente'})
+            return Response({
+                'message': 'Inventario ajustado exitosamente',
+                'stock_actual': movimiento.producto.stock
+            })
             
         except Producto.DoesNotExist:
             return Response(
@@ -290,7 +266,8 @@ class HistorialPreciosViewSet(viewsets.ReadOnlyModelViewSet):
     }
     search_fields = ['producto__nombre', 'proveedor__nombre']
     ordering_fields = ['fecha', 'precio']
-    ordering = ['-fecha']
+    ordering = ['-fecha', '-id']
+    pagination_class = PaginacionCursor
 
     @action(detail=False, methods=['get'])
     def comparar_precios(self, request):
@@ -354,7 +331,8 @@ class AlertaStockViewSet(viewsets.ModelViewSet):
     }
     search_fields = ['producto__nombre', 'mensaje']
     ordering_fields = ['fecha_creacion', 'tipo']
-    ordering = ['-fecha_creacion']
+    ordering = ['-fecha_creacion', '-id']
+    pagination_class = PaginacionCursor
 
     @action(detail=True, methods=['post'])
     def marcar_vista(self, request, pk=None):
@@ -378,139 +356,163 @@ class AlertaStockViewSet(viewsets.ModelViewSet):
     @action(detail=False, methods=['post'])
     def generar_alertas_stock_minimo(self, request):
         """Genera alertas para productos con stock mínimo"""
-        from productos.models import Producto
-        
-        productos_bajo_stock = Producto.objects.filter(
-            stock__lte=models.F('stock_minimo')
-        ).exclude(
-            alertas_stock__tipo='stock_minimo',
-            alertas_stock__estado='activa'
-        )
-        
-        alertas_creadas = 0
-        
-        for producto in productos_bajo_stock:
-            AlertaStock.objects.create(
-                tipo='stock_minimo',
-                producto=producto,
-                mensaje=f'Stock bajo: {producto.stock} unidades (mínimo: {producto.stock_minimo})',
-                valor_referencia=producto.stock
-            )
-            alertas_creadas += 1
-        
+        _sin_alerta, alertas_creadas, _segundos = generar_alertas_stock_minimo()
+
         return Response({
             'message': f'{alertas_creadas} alertas de stock mínimo generadas'
         })
 
 
-class ComprasReportesViewSet(viewsets.ViewSet):
+def _inicio_de_mes(fecha, meses_atras=0):
+    """Primer día del mes calendario ``meses_atras`` meses antes de ``fecha``"""
+    anio, mes = divmod(fecha.year * 12 + fecha.month - 1 - meses_atras, 12)
+    return fecha.replace(year=anio, month=mes + 1, day=1)
+
+
+class ComprasReportesViewSet(ExportacionCSVMixin, viewsets.ViewSet):
     permission_classes = [IsAuthenticated, ComprasBasePermission]
 
     @action(detail=False, methods=['get'])
+    @lectura_en_replica
     def estadisticas_dashboard(self, request):
-        """Estadísticas generales para el dashboard"""
-        from django.apps import apps
-        from datetime import timedelta
-        from django.utils import timezone
-        
+        """
+        Estadísticas generales para el dashboard (tres consultas en total).
+        Sin rango todo sale de ResumenMensualCompras; el rango, que puede
+        cortar un mes por la mitad, se resuelve sobre las órdenes con una
+        consulta agrupada por proveedor que también trae el mes en curso.
+
+        ``total_gastado_mes`` y ``top_proveedores`` cubren las órdenes
+        recibidas del mes calendario en curso (antes eran los últimos 30
+        días): es la granularidad del resumen mensual. Con rango, además,
+        solo cuentan las órdenes dentro del rango.
+        """
+        from productos.models import Producto
+
         fecha_desde = request.query_params.get('fecha_desde')
         fecha_hasta = request.query_params.get('fecha_hasta')
         
         # Filtros de fecha
-        filtros = {}
+        rango = Q()
         if fecha_desde:
-            filtros['fecha_creacion__date__gte'] = datetime.strptime(fecha_desde, '%Y-%m-%d').date()
+            rango &= Q(fecha_creacion__date__gte=datetime.strptime(fecha_desde, '%Y-%m-%d').date())
         if fecha_hasta:
-            filtros['fecha_creacion__date__lte'] = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
-        
-        # Estadísticas de órdenes de compra
-        ordenes = OrdenCompra.objects.filter(**filtros)
-        
-        # Obtener modelos relacionados
-        try:
-            Producto = apps.get_model('productos', 'Producto')
-            productos_bajo_stock = Producto.objects.filter(
-                stock__lte=F('min_stock'),
-                min_stock__gt=0
-            ).count() if Producto else 0
-        except:
-            productos_bajo_stock = 0
-            
-        try:
-            AlertaStock = apps.get_model('compras', 'AlertaStock')
-            alertas_activas = AlertaStock.objects.filter(estado='activa').count() if AlertaStock else 0
-        except:
-            alertas_activas = 0
-        
-        # Fecha actual y hace 30 días para estadísticas adicionales
-        hoy = timezone.now().date()
-        hace_30_dias = hoy - timedelta(days=30)
-        
-        # Compras por mes (últimos 6 meses)
-        compras_por_mes = []
-        for i in range(6):
-            fecha = hoy.replace(day=1) - timedelta(days=30*i)
-            mes_siguiente = (fecha.replace(day=28) + timedelta(days=4)).replace(day=1)
-            
-            total_mes = OrdenCompra.objects.filter(
-                fecha_creacion__gte=fecha,
-                fecha_creacion__lt=mes_siguiente,
-                estado__in=['recibida_completa', 'recibida_parcial']
-            ).aggregate(total=Sum('total'))['total'] or 0
-            
-            compras_por_mes.append({
-                'mes': fecha.strftime('%Y-%m'),
-                'total': float(total_mes)
-            })
-        
-        # Top 5 proveedores
-        top_proveedores = ordenes.filter(
-            fecha_creacion__gte=hace_30_dias,
-            estado__in=['recibida_completa', 'recibida_parcial']
+            rango &= Q(fecha_creacion__date__lte=datetime.strptime(fecha_hasta, '%Y-%m-%d').date())
+
+        recibidas = ['recibida_completa', 'recibida_parcial']
+        hoy = timezone.localdate()
+        meses = [_inicio_de_mes(hoy, atras) for atras in range(5, -1, -1)]
+
+        # 1) Contadores y totales con agregación condicional
+        if rango:
+            # El resumen no respeta el rango: por proveedor, para sacar de la
+            # misma consulta los totales y el top del mes en curso
+            del_mes = Q(estado__in=recibidas, fecha_creacion__date__gte=meses[-1])
+            por_proveedor = list(OrdenCompra.objects.filter(rango).values(
+                'proveedor__id', 'proveedor__nombre'
+            ).annotate(
+                total_ordenes=Count('id'),
+                ordenes_borrador=Count('id', filter=Q(estado='borrador')),
+                ordenes_enviadas=Count('id', filter=Q(estado='enviada')),
+                ordenes_confirmadas=Count('id', filter=Q(estado='confirmada')),
+                ordenes_pendientes=Count('id', filter=Q(estado__in=['enviada', 'confirmada'])),
+                ordenes_completadas=Count('id', filter=Q(estado='recibida_completa')),
+                total_valor=Sum('total'),
+                total_mes=Sum('total', filter=del_mes),
+                ordenes_mes=Count('id', filter=del_mes),
+            ).order_by())
+            claves = [
+                'total_ordenes', 'ordenes_borrador', 'ordenes_enviadas', 'ordenes_confirmadas',
+                'ordenes_pendientes', 'ordenes_completadas', 'total_valor', 'total_mes',
+            ]
+            ordenes = {clave: sum(fila[clave] or 0 for fila in por_proveedor) for clave in claves}
+            ordenes['total_gastado_mes'] = ordenes.pop('total_mes')
+            ordenes['proveedores_activos'] = len(por_proveedor)
+        else:
+            ordenes = ResumenMensualCompras.objects.aggregate(
+                total_ordenes=Sum('ordenes'),
+                ordenes_borrador=Sum('ordenes', filter=Q(estado='borrador')),
+                ordenes_enviadas=Sum('ordenes', filter=Q(estado='enviada')),
+                ordenes_confirmadas=Sum('ordenes', filter=Q(estado='confirmada')),
+                ordenes_pendientes=Sum('ordenes', filter=Q(estado__in=['enviada', 'confirmada'])),
+                ordenes_completadas=Sum('ordenes', filter=Q(estado='recibida_completa')),
+                total_valor=Sum('total'),
+                proveedores_activos=Count('proveedor', filter=Q(ordenes__gt=0), distinct=True),
+            )
+            ordenes = {clave: valor or 0 for clave, valor in ordenes.items()}
+
+        # 2) Compras recibidas por mes (últimos 6 meses calendario) y top proveedores del mes
+        filas = ResumenMensualCompras.objects.filter(
+            estado__in=recibidas, mes__gte=meses[0]
         ).values(
-            'proveedor__id', 'proveedor__nombre'
+            'mes', 'proveedor__id', 'proveedor__nombre'
         ).annotate(
-            total=Sum('total'),
-            ordenes=Count('id')
-        ).order_by('-total')[:5]
-        
-        # Formatear top_proveedores para el frontend
-        top_proveedores_formatted = []
-        for proveedor in top_proveedores:
-            top_proveedores_formatted.append({
-                'proveedor__nombre': proveedor['proveedor__nombre'] or 'Sin nombre',
-                'total': float(proveedor['total'] or 0),
-                'ordenes': proveedor['ordenes']
-            })
-        
-        # Total gastado este mes
-        total_gastado_mes = OrdenCompra.objects.filter(
-            fecha_creacion__gte=hace_30_dias,
-            estado__in=['recibida_completa', 'recibida_parcial']
-        ).aggregate(total=Sum('total'))['total'] or 0
+            total_mes=Sum('total'),
+            ordenes_mes=Sum('ordenes'),
+        ).order_by()
+
+        totales_por_mes = {mes: Decimal('0') for mes in meses}
+        proveedores = {}
+        for fila in filas:
+            if fila['mes'] in totales_por_mes:
+                totales_por_mes[fila['mes']] += fila['total_mes'] or 0
+            if fila['mes'] == meses[-1] and fila['ordenes_mes']:
+                proveedores[fila['proveedor__id']] = {
+                    'proveedor__nombre': fila['proveedor__nombre'] or 'Sin nombre',
+                    'total': fila['total_mes'] or Decimal('0'),
+                    'ordenes': fila['ordenes_mes']
+                }
+
+        if rango:
+            proveedores = {
+                fila['proveedor__id']: {
+                    'proveedor__nombre': fila['proveedor__nombre'] or 'Sin nombre',
+                    'total': fila['total_mes'] or Decimal('0'),
+                    'ordenes': fila['ordenes_mes']
+                }
+                for fila in por_proveedor if fila['ordenes_mes']
+            }
+        else:
+            ordenes['total_gastado_mes'] = totales_por_mes[meses[-1]]
+
+        top_proveedores = sorted(proveedores.values(), key=lambda item: item['total'], reverse=True)[:5]
+
+        # 3) Productos bajo stock y alertas activas
+        inventario = Producto.objects.aggregate(
+            productos_bajo_stock=Count(
+                'id', filter=Q(stock__lte=F('min_stock'), min_stock__gt=0), distinct=True
+            ),
+            alertas_activas=Count('alertas_stock', filter=Q(alertas_stock__estado='activa')),
+        )
         
         estadisticas = {
-            'total_ordenes': ordenes.count(),
-            'ordenes_borrador': ordenes.filter(estado='borrador').count(),
-            'ordenes_enviadas': ordenes.filter(estado='enviada').count(),
-            'ordenes_confirmadas': ordenes.filter(estado='confirmada').count(),
-            'ordenes_pendientes': ordenes.filter(estado__in=['enviada', 'confirmada']).count(),
-            'ordenes_completadas': ordenes.filter(estado='recibida_completa').count(),
-            'total_valor': float(ordenes.aggregate(total=Sum('total'))['total'] or 0),
-            'total_gastado_mes': float(total_gastado_mes),
-            'productos_bajo_stock': productos_bajo_stock,
-            'alertas_activas': alertas_activas,
-            'proveedores_activos': ordenes.values('proveedor').distinct().count(),
-            'compras_por_mes': list(reversed(compras_por_mes)),
-            'top_proveedores': top_proveedores_formatted,
+            'total_ordenes': ordenes['total_ordenes'],
+            'ordenes_borrador': ordenes['ordenes_borrador'],
+            'ordenes_enviadas': ordenes['ordenes_enviadas'],
+            'ordenes_confirmadas': ordenes['ordenes_confirmadas'],
+            'ordenes_pendientes': ordenes['ordenes_pendientes'],
+            'ordenes_completadas': ordenes['ordenes_completadas'],
+            'total_valor': float(ordenes['total_valor'] or 0),
+            'total_gastado_mes': float(ordenes['total_gastado_mes'] or 0),
+            'productos_bajo_stock': inventario['productos_bajo_stock'],
+            'alertas_activas': inventario['alertas_activas'],
+            'proveedores_activos': ordenes['proveedores_activos'],
+            'compras_por_mes': [
+                {'mes': mes.strftime('%Y-%m'), 'total': float(total)}
+                for mes, total in totales_por_mes.items()
+            ],
+            'top_proveedores': [
+                {**proveedor, 'total': float(proveedor['total'])}
+                for proveedor in top_proveedores
+            ],
             'productos_mas_comprados': []  # Se puede implementar después si es necesario
         }
         
         return Response(estadisticas)
 
     @action(detail=False, methods=['get'])
+    @lectura_en_replica
     def exportar_compras_csv(self, request):
-        """Exporta reporte de compras a CSV"""
+        """Exporta reporte de compras a CSV (en streaming)"""
         fecha_desde = request.query_params.get('fecha_desde')
         fecha_hasta = request.query_params.get('fecha_hasta')
         
@@ -521,32 +523,21 @@ class ComprasReportesViewSet(viewsets.ViewSet):
         if fecha_hasta:
             filtros['fecha_creacion__date__lte'] = datetime.strptime(fecha_hasta, '%Y-%m-%d').date()
         
-        ordenes = OrdenCompra.objects.filter(**filtros).select_related('proveedor', 'creado_por')
-        
-        response = HttpResponse(content_type='text/csv')
-        response['Content-Disposition'] = 'attachment; filename="reporte_compras.csv"'
-        
-        writer = csv.writer(response)
-        writer.writerow([
-            'Fecha', 'Número Orden', 'Proveedor', 'Estado',
-            'Subtotal', 'Impuestos', 'Total', 'Creado Por'
-        ])
-        
-        for orden in ordenes:
-            writer.writerow([
-                orden.fecha_creacion.strftime('%Y-%m-%d'),
-                orden.numero,
-                orden.proveedor.nombre,
-                orden.get_estado_display(),
-                orden.subtotal,
-                orden.impuestos,
-                orden.total,
-                orden.creado_por.username
-            ])
-        
-        return response
+        # La base se elige acá: el CSV se genera después de salir de la vista
+        ordenes = OrdenCompra.objects.filter(**filtros)
+        return self.respuesta_csv('reporte_compras.csv', [
+            Columna('Fecha', 'fecha_creacion', fecha_iso),
+            Columna('Número Orden', 'numero'),
+            Columna('Proveedor', 'proveedor__nombre'),
+            Columna('Estado', 'estado', dict(OrdenCompra.ESTADO_CHOICES).get),
+            Columna('Subtotal', 'subtotal'),
+            Columna('Impuestos', 'impuestos'),
+            Columna('Total', 'total'),
+            Columna('Creado Por', 'creado_por__username'),
+        ], queryset=ordenes.using(ordenes.db))
 
     @action(detail=False, methods=["get"], url_path="resumen/categorias")
+    @lectura_en_replica
     def resumen_por_categoria(self, request):
         queryset = self.filter_queryset(self.get_queryset())
         data = (
@@ -0,0 +1,26 @@
+"""
+Duración de lo que se guarda en la caché según sea compartida o no.
+
+Con ``REDIS_URL`` la caché por defecto es Redis y la ven todos los workers de
+gunicorn: una invalidación vale para todos. Sin ella cada proceso tiene su
+propia LocMem y borrar una clave solo la borra en el proceso que atendió la
+escritura; los demás siguen sirviendo su copia hasta que vence. ``duracion``
+recorta entonces el tiempo pedido a ``CACHE_LOCAL_SEGUNDOS``, que es lo más
+que un dato viejo puede sobrevivir en otro proceso.
+"""
+
+from django.conf import settings
+
+
+def cache_compartida():
+    """``True`` si todos los procesos usan la misma caché (``REDIS_URL``)"""
+    return settings.CACHE_COMPARTIDA
+
+
+def duracion(segundos):
+    """Timeout para ``cache.set``: ``segundos`` con caché compartida, recortado si es local"""
+    if cache_compartida():
+        return segundos
+    if segundos is None:
+        return settings.CACHE_LOCAL_SEGUNDOS
+    return min(segundos, settings.CACHE_LOCAL_SEGUNDOS)
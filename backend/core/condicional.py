@@ -0,0 +1,71 @@
+"""
+GET condicional para listados de catálogos (productos, marcas, categorías,
+rubros, proveedores), que el frontend vuelve a pedir en cada pantalla aunque
+casi nunca cambian.
+
+La versión del listado es la cantidad de filas y la última fecha de
+modificación del queryset filtrado, leídas en una sola consulta agregada.
+Un alta o una modificación mueve la fecha y una baja (o un registro que deja
+de cumplir el filtro) cambia la cantidad. Con esa versión y la URL completa
+(filtros, búsqueda, orden y página) se arma el ``ETag``; si coincide con
+``If-None-Match`` la respuesta es ``304`` sin serializar nada.
+
+Los modelos deben tener un campo ``auto_now`` que también se actualice en
+los ``QuerySet.update`` y cuando cambia algo que el listado muestra de otra
+tabla (ver ``productos.signals`` y ``proveedores.signals``).
+"""
+
+import hashlib
+
+from django.db.models import Count, Max
+from django.utils.http import http_date
+from rest_framework import status
+from rest_framework.response import Response
+
+
+def etags_de(encabezado):
+    """ETags de un ``If-None-Match`` sin el prefijo débil ``W/``"""
+    return {etag.strip().removeprefix('W/') for etag in encabezado.split(',') if etag.strip()}
+
+
+class GetCondicionalMixin:
+    """
+    Agrega ``ETag`` y ``Last-Modified`` al ``list`` de un ViewSet y responde
+    ``304 Not Modified`` cuando el cliente ya tiene la versión actual.
+    """
+    campo_version = 'fecha_actualizacion'
+
+    def version_listado(self, queryset):
+        """``(cantidad, última modificación)`` de ``queryset`` en una consulta"""
+        version = queryset.order_by().aggregate(cantidad=Count('pk'), ultima=Max(self.campo_version))
+        return version['cantidad'], version['ultima']
+
+    def etag_listado(self, request, cantidad, ultima):
+        clave = '|'.join([
+            self.basename or type(self).__name__,
+            str(cantidad),
+            ultima.isoformat() if ultima else '',
+            request.get_full_path(),
+            getattr(request, 'accepted_media_type', '') or '',
+        ])
+        return f'"{hashlib.md5(clave.encode()).hexdigest()}"'
+
+    def _encabezados_version(self, response, etag, ultima):
+        response['ETag'] = etag
+        # Sin no-cache el navegador podría reusar la copia sin preguntar
+        response['Cache-Control'] = 'private, no-cache'
+        if ultima:
+            response['Last-Modified'] = http_date(ultima.timestamp())
+        return response
+
+    def list(self, request, *args, **kwargs):
+        cantidad, ultima = self.version_listado(self.filter_queryset(self.get_queryset()))
+        etag = self.etag_listado(request, cantidad, ultima)
+
+        # Solo se valida por ETag: Last-Modified no detecta bajas
+        recibidos = etags_de(request.headers.get('If-None-Match', ''))
+        if etag in recibidos or '*' in recibidos:
+            return self._encabezados_version(Response(status=status.HTTP_304_NOT_MODIFIED), etag, ultima)
+
+        response = super().list(request, *args, **kwargs)
+        return self._encabezados_version(response, etag, ultima)
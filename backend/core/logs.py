@@ -0,0 +1,181 @@
+"""
+Logs estructurados sin escribir en el hilo del request.
+
+``ColaHandler`` (el handler de ``root`` en ``settings.LOGGING``) solo encola
+el registro; un ``QueueListener`` en otro hilo lo formatea como una línea
+JSON y lo escribe. Si la cola se llena el registro se descarta en lugar de
+frenar el request.
+
+Cada línea lleva ``request_id`` (lo pone ``RequestLogMiddleware``, o se toma
+del encabezado ``X-Request-ID``) y los campos pasados en ``extra``, con los
+sensibles (contraseñas, tokens) reemplazados por ``***``. Los eventos de
+mucho volumen se marcan con ``extra={"muestreo": tasa}``: se conserva esa
+fracción de los requests, y de cada request conservado se guardan todos sus
+eventos. Las advertencias y errores no se muestrean.
+"""
+
+import contextvars
+import copy
+import json
+import logging
+import os
+import queue
+import re
+import sys
+import time
+import uuid
+import zlib
+from logging.handlers import QueueHandler, QueueListener
+
+from django.conf import settings
+
+logger = logging.getLogger("http")
+
+request_id_actual = contextvars.ContextVar("request_id", default=None)
+
+SENSIBLES = re.compile(r"pass|token|secret|authorization|access|refresh|cookie", re.IGNORECASE)
+OCULTO = "***"
+
+# Atributos propios de LogRecord: lo demás vino en ``extra``
+_ATRIBUTOS_DE_REGISTRO = frozenset(vars(logging.makeLogRecord({}))) | {"message", "asctime", "request_id", "muestreo"}
+
+_REQUEST_ID_VALIDO = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+
+def ocultar_sensibles(valor):
+    """Copia de ``valor`` con las claves sensibles ocultas (en dicts y listas anidados)"""
+    if isinstance(valor, dict):
+        return {
+            clave: OCULTO if SENSIBLES.search(str(clave)) else ocultar_sensibles(dato)
+            for clave, dato in valor.items()
+        }
+    if isinstance(valor, (list, tuple)):
+        return [ocultar_sensibles(dato) for dato in valor]
+    return valor
+
+
+class ContextoFilter(logging.Filter):
+    """Agrega el ``request_id`` del request en curso (corre en el hilo que loguea)"""
+
+    def filter(self, record):
+        record.request_id = request_id_actual.get()
+        return True
+
+
+class MuestreoFilter(logging.Filter):
+    """
+    Conserva la fracción ``record.muestreo`` de los eventos marcados. Decide
+    por ``request_id``, así un request queda completo o no aparece.
+    """
+
+    def filter(self, record):
+        tasa = getattr(record, "muestreo", None)
+        if tasa is None or tasa >= 1 or record.levelno >= logging.WARNING:
+            return True
+        semilla = getattr(record, "request_id", None) or f"{record.created}"
+        return zlib.crc32(semilla.encode()) % 10000 < tasa * 10000
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro"""
+
+    def format(self, record):
+        linea = {
+            "ts": self.formatTime(record, "%Y-%m-%dT%H:%M:%S") + f".{int(record.msecs):03d}",
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+        }
+        linea.update(ocultar_sensibles({
+            clave: valor for clave, valor in vars(record).items() if clave not in _ATRIBUTOS_DE_REGISTRO
+        }))
+        if record.exc_text:
+            linea["excepcion"] = record.exc_text
+        return json.dumps(linea, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    Encola los registros para que un hilo aparte los escriba en ``stream``.
+    El hilo se crea en el primer registro de cada proceso (sirve igual si
+    gunicorn forkea después de configurar los logs).
+    """
+
+    def __init__(self, stream=None, capacidad=10000):
+        super().__init__(queue.Queue(capacidad))
+        self.destino = logging.StreamHandler(stream or sys.stdout)
+        self.destino.setFormatter(FormatoJSON())
+        self.listener = None
+        self._pid = None
+        self.descartados = 0
+
+    def _iniciar_listener(self):
+        self.listener = QueueListener(self.queue, self.destino)
+        self.listener.start()
+        self._pid = os.getpid()
+
+    def prepare(self, record):
+        # Texto del mensaje y de la excepción en este hilo: args y exc_info
+        # pueden no sobrevivir hasta que escriba el listener
+        record = copy.copy(record)
+        record.message = record.getMessage()
+        if record.exc_info and not record.exc_text:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+        record.msg, record.args, record.exc_info, record.stack_info = record.message, None, None, None
+        return record
+
+    def enqueue(self, record):
+        if self._pid != os.getpid():
+            self._iniciar_listener()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.descartados += 1
+
+    def close(self):
+        # logging.shutdown() cierra los handlers al salir: vacía la cola
+        if self.listener is not None and self._pid == os.getpid():
+            self.listener.stop()
+            self.listener = None
+        super().close()
+
+
+class RequestLogMiddleware:
+    """
+    Asigna el ``request_id`` (lo devuelve en ``X-Request-ID``) y registra
+    cada request en el logger ``http`` con método, ruta, estado y latencia.
+    Los exitosos se muestrean con ``LOG_MUESTREO_HTTP``; los errores y los
+    más lentos que ``LOG_LENTO_MS`` se registran siempre.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recibido = request.headers.get("X-Request-ID", "")
+        request_id = recibido if _REQUEST_ID_VALIDO.match(recibido) else uuid.uuid4().hex
+        contexto = request_id_actual.set(request_id)
+        inicio = time.perf_counter()
+        try:
+            response = self.get_response(request)
+            latencia_ms = round((time.perf_counter() - inicio) * 1000, 1)
+            response["X-Request-ID"] = request_id
+            self.registrar(request, response.status_code, latencia_ms)
+            return response
+        finally:
+            request_id_actual.reset(contexto)
+
+    def registrar(self, request, estado, latencia_ms):
+        datos = {
+            "metodo": request.method,
+            "ruta": request.path,
+            "estado": estado,
+            "latencia_ms": latencia_ms,
+        }
+        if estado >= 500:
+            logger.error("request", extra=datos)
+        elif latencia_ms >= settings.LOG_LENTO_MS:
+            logger.warning("request lento", extra=datos)
+        else:
+            logger.info("request", extra={**datos, "muestreo": settings.LOG_MUESTREO_HTTP})
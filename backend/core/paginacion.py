@@ -0,0 +1,21 @@
+"""
+Paginación por cursor para tablas que solo crecen (movimientos, historiales,
+alertas, auditorías).
+
+A diferencia de ``PageNumberPagination`` no ejecuta ``COUNT(*)`` ni
+``OFFSET``: cada página filtra a partir de la última fila vista, así que la
+página 10.000 cuesta lo mismo que la primera siempre que exista un índice que
+siga el orden de la vista (por ejemplo ``(fecha, id)``).
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class PaginacionCursor(CursorPagination):
+    """
+    Cursor sobre el orden de la vista (``ordering`` u ``OrderingFilter``).
+    Las vistas deben terminar su orden en ``-id`` para desempatar.
+    """
+    ordering = ('-fecha', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 200
@@ -0,0 +1,124 @@
+"""
+Lecturas de reportes en una réplica opcional.
+
+Si ``REPLICA_DATABASE_URL`` está definida, ``settings.DATABASES`` tiene el
+alias ``replica`` y las vistas marcadas con ``@lectura_en_replica`` leen de
+ahí; todo lo demás, y todas las escrituras, van a ``default``. Sin réplica el
+router no cambia nada.
+
+Lecturas de las propias escrituras: después de un POST/PUT/PATCH/DELETE
+exitoso, ``ReplicaMiddleware`` fija al usuario en la base principal durante
+``REPLICA_FIJACION_SEGUNDOS`` (lo que puede tardar la réplica en ponerse al
+día), así un reporte pedido justo después de cargar algo ya lo incluye. La
+fijación se guarda en la caché por el ``user_id`` del token, que el front ya
+manda en cada request; por eso con réplica hace falta ``REDIS_URL`` (una
+caché por proceso no la vería otro worker). Dentro de una transacción
+abierta en ``default`` también se lee de ahí.
+
+Para probarlo en local alcanza con otra base y un Redis: por ejemplo
+``REPLICA_DATABASE_URL=sqlite:///replica.sqlite3``,
+``REDIS_URL=redis://localhost:6379/0`` y
+``python manage.py migrate --database=replica`` (con SQLite no hay
+replicación: los datos hay que copiarlos). En los tests la réplica es un
+espejo (``TEST.MIRROR``) de ``default``.
+"""
+
+import contextlib
+import contextvars
+import functools
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA = "replica"
+
+leyendo_de_replica = contextvars.ContextVar("leyendo_de_replica", default=False)
+
+
+def replica_configurada():
+    return REPLICA in settings.DATABASES
+
+
+def _clave_fijacion(user_id):
+    return f"replica:fijado:{user_id}"
+
+
+def _usuario(request):
+    # Con JWT el pk sale del claim user_id, sin leer el usuario de la base
+    user = getattr(request, "user", None)
+    return user.pk if user is not None and user.is_authenticated else None
+
+
+def fijar_en_principal(request):
+    """Lee de la principal para este usuario hasta que la réplica se ponga al día"""
+    user_id = _usuario(request)
+    if user_id is not None:
+        cache.set(_clave_fijacion(user_id), True, settings.REPLICA_FIJACION_SEGUNDOS)
+
+
+def fijado_en_principal(request):
+    user_id = _usuario(request)
+    return user_id is not None and cache.get(_clave_fijacion(user_id), False)
+
+
+@contextlib.contextmanager
+def leer_de_replica(request):
+    """Envía a la réplica las lecturas del bloque, salvo escrituras recientes del usuario"""
+    if (
+        not replica_configurada()
+        or request.method not in ("GET", "HEAD", "OPTIONS")
+        or fijado_en_principal(request)
+    ):
+        yield
+        return
+    contexto = leyendo_de_replica.set(True)
+    try:
+        yield
+    finally:
+        leyendo_de_replica.reset(contexto)
+
+
+def lectura_en_replica(vista):
+    """Marca una vista o acción de solo lectura para que consulte la réplica"""
+    @functools.wraps(vista)
+    def envoltura(self, request, *args, **kwargs):
+        with leer_de_replica(request):
+            return vista(self, request, *args, **kwargs)
+    return envoltura
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if (
+            leyendo_de_replica.get()
+            and replica_configurada()
+            and not connections[DEFAULT_DB_ALIAS].in_atomic_block
+        ):
+            return REPLICA
+        return None
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Las dos bases tienen los mismos datos
+        return True
+
+
+class ReplicaMiddleware:
+    """Después de una escritura exitosa fija al usuario en la base principal"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        response = self.get_response(request)
+        if (
+            request.method not in ("GET", "HEAD", "OPTIONS")
+            and response.status_code < 400
+            and replica_configurada()
+        ):
+            # DRF deja en request.user el usuario autenticado por la vista
+            fijar_en_principal(request)
+        return response
@@ -11,8 +11,11 @@ https://docs.djangoproject.com/en/5.2/ref/settings/
 """
 
 import os
+import sys
 from pathlib import Path
 
+from django.core.exceptions import ImproperlyConfigured
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -29,6 +32,8 @@ SECRET_KEY = os.getenv(
 # SECURITY WARNING: don't run with debug turned on in production!
 DEBUG = os.getenv("DJANGO_DEBUG", "True").lower() == "true"
 
+TESTING = len(sys.argv) > 1 and sys.argv[1] == 'test'
+
 allowed_hosts_env = os.getenv("DJANGO_ALLOWED_HOSTS", "127.0.0.1,localhost")
 ALLOWED_HOSTS = [host.strip() for host in allowed_hosts_env.split(",") if host.strip()]
 
@@ -67,6 +72,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.logs.RequestLogMiddleware',
+    'core.replica.ReplicaMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
@@ -107,14 +114,50 @@ if os.getenv('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.parse(os.getenv('DATABASE_URL'))
     }
+    # Búsqueda de clientes por trigramas y texto completo (clientes.busqueda)
+    if DATABASES['default']['ENGINE'] == 'django.db.backends.postgresql':
+        INSTALLED_APPS.append('django.contrib.postgres')
 else:
     # Configuración para desarrollo (SQLite)
     DATABASES = {
         'default': {
             'ENGINE': 'django.db.backends.sqlite3',
             'NAME': BASE_DIR / 'db.sqlite3',
+            # Base en archivo para que los tests con hilos concurrentes puedan
+            # compartir la conexión (SQLite en memoria bloquea la tabla completa)
+            'TEST': {'NAME': BASE_DIR / 'test_db.sqlite3'},
+        }
+    }
+
+# Réplica de lectura opcional para reportes (ver core.replica)
+if os.getenv('REPLICA_DATABASE_URL'):
+    import dj_database_url
+    if not os.getenv('REDIS_URL'):
+        # La fijación después de escribir tiene que verla cualquier worker
+        raise ImproperlyConfigured('REPLICA_DATABASE_URL requiere REDIS_URL')
+    DATABASES['replica'] = {
+        **dj_database_url.parse(os.getenv('REPLICA_DATABASE_URL')),
+        'TEST': {'MIRROR': 'default'},
+    }
+elif TESTING:
+    # Los tests ejercitan el ruteo con un espejo de la base de tests
+    DATABASES['replica'] = {**DATABASES['default'], 'TEST': {'MIRROR': 'default'}}
+
+DATABASE_ROUTERS = ['core.replica.ReplicaRouter']
+# Segundos que un usuario lee de la principal después de escribir
+REPLICA_FIJACION_SEGUNDOS = int(os.getenv('REPLICA_FIJACION_SEGUNDOS', '10'))
+
+# Caché (ver core.caches). Con REDIS_URL la comparten todos los workers; sin
+# ella es LocMem por proceso y los tiempos se recortan a CACHE_LOCAL_SEGUNDOS
+if os.getenv('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.getenv('REDIS_URL'),
         }
     }
+CACHE_COMPARTIDA = bool(os.getenv('REDIS_URL'))
+CACHE_LOCAL_SEGUNDOS = int(os.getenv('CACHE_LOCAL_SEGUNDOS', '5'))
 
 
 # Password validation
@@ -154,6 +197,16 @@ USE_TZ = True
 STATIC_URL = 'static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
+# Archivos subidos (fotos de perfil, importaciones de clientes)
+MEDIA_URL = 'media/'
+MEDIA_ROOT = os.getenv('DJANGO_MEDIA_ROOT', os.path.join(BASE_DIR, 'media'))
+
+# Segundos que se guarda el perfil 360 de un cliente en la caché (0 = sin caché)
+CLIENTES_PERFIL_CACHE_SEGUNDOS = int(os.getenv('CLIENTES_PERFIL_CACHE_SEGUNDOS', '60'))
+
+# Los lotes de ventas de fin de recorrido (ventas.lote) superan el límite de 2.5 MB por defecto
+DATA_UPLOAD_MAX_MEMORY_SIZE = int(os.getenv('DJANGO_DATA_UPLOAD_MAX_MEMORY_SIZE', str(10 * 1024 * 1024)))
+
 # Configuración adicional para producción
 if not DEBUG:
     # Configuración de seguridad para producción
@@ -172,7 +225,8 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 # REST Framework configuration
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        # JWT sin leer el usuario en cada request (ver authentication.tokens)
+        'authentication.tokens.StatelessJWTAuthentication',
     ),
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticated',
@@ -213,6 +267,8 @@ SIMPLE_JWT = {
     'SLIDING_TOKEN_REFRESH_EXP_CLAIM': 'refresh_exp',
     'SLIDING_TOKEN_LIFETIME': timedelta(minutes=60),
     'SLIDING_TOKEN_REFRESH_LIFETIME': timedelta(days=7),
+    # Los claims del access nuevo se leen de la base (authentication.tokens)
+    'TOKEN_REFRESH_SERIALIZER': 'authentication.serializers.TokenRefreshConClaimsSerializer',
 }
 
 # CORS Configuration
@@ -237,4 +293,34 @@ CSRF_TRUSTED_ORIGINS = [
 ]
 
 # Custom User Model
-AUTH_USER_MODEL = 'authentication.User'
\ No newline at end of file
+AUTH_USER_MODEL = 'authentication.User'
+
+# Logs: líneas JSON escritas desde un hilo aparte (ver core.logs)
+LOG_LEVEL = os.getenv('DJANGO_LOG_LEVEL', 'WARNING' if TESTING else 'INFO')
+# Fracción de requests exitosos que se registran
+LOG_MUESTREO_HTTP = float(os.getenv('DJANGO_LOG_MUESTREO_HTTP', '0.1'))
+LOG_LENTO_MS = float(os.getenv('DJANGO_LOG_LENTO_MS', '1000'))
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'contexto': {'()': 'core.logs.ContextoFilter'},
+        'muestreo': {'()': 'core.logs.MuestreoFilter'},
+    },
+    'handlers': {
+        'cola': {
+            'class': 'core.logs.ColaHandler',
+            'stream': 'ext://sys.stdout',
+            'filters': ['contexto', 'muestreo'],
+        },
+    },
+    'root': {
+        'handlers': ['cola'],
+        'level': LOG_LEVEL,
+    },
+    'loggers': {
+        # Los 4xx ya quedan en el log de requests (logger "http")
+        'django.request': {'level': 'ERROR'},
+    },
+}
\ No newline at end of file
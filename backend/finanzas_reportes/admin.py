@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import MovimientoFinanciero, PagoCliente
+from .models import ComprobantePendiente, FlujoDiario, MovimientoFinanciero, PagoCliente
 
 
 @admin.register(PagoCliente)
@@ -14,4 +14,19 @@ class PagoClienteAdmin(admin.ModelAdmin):
 class MovimientoFinancieroAdmin(admin.ModelAdmin):
     list_display = ("id", "fecha", "tipo", "monto", "descripcion", "compra")
     list_filter = ("fecha", "tipo")
-    search_fields = ("descripcion", "referencia_extra")
\ No newline at end of file
+    search_fields = ("descripcion", "referencia_extra")
+
+
+@admin.register(FlujoDiario)
+class FlujoDiarioAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "tipo", "origen", "movimientos", "total")
+    list_filter = ("tipo", "origen")
+    date_hierarchy = "fecha"
+
+
+@admin.register(ComprobantePendiente)
+class ComprobantePendienteAdmin(admin.ModelAdmin):
+    list_display = ("venta", "cliente", "fecha", "total", "saldo")
+    list_filter = ("fecha",)
+    search_fields = ("cliente__nombre", "cliente__identificacion")
+    raw_id_fields = ("venta", "cliente")
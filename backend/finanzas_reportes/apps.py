@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class FinanzasReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'finanzas_reportes'
+
+    def ready(self):
+        import finanzas_reportes.signals
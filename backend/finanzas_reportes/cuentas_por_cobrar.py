@@ -0,0 +1,218 @@
+"""
+Cuentas por cobrar con imputación FIFO.
+
+Los pagos de un cliente cancelan sus ventas de la más antigua a la más nueva,
+así lo que queda por cobrar es siempre la cola más reciente de ventas que
+suma la deuda de ``SaldoCliente``: la más vieja de esa cola puede estar
+pagada en parte y las demás están enteras. ``imputar_cliente`` la recalcula
+recorriendo las ventas desde la más nueva hasta cubrir la deuda, de modo que
+el trabajo depende de los comprobantes abiertos y no del historial. Se llama
+desde ``clientes.saldos.aplicar_diferencia``, en la misma transacción que
+cada alta, cambio o baja de ventas y pagos; las altas masivas usan
+``imputar_clientes``, con consultas por bloque de clientes y no por cliente.
+
+``ComprobantePendiente`` guarda esa cola y la antigüedad por cliente
+(0–30, 31–60, 61–90 y más de 90 días) sale de agruparla en una consulta.
+El comando ``reconciliar_saldos_clientes`` la regenera completa.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import DecimalField, Q, Sum, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from clientes.models import SaldoCliente
+from ventas.models import Venta
+from .models import ComprobantePendiente
+
+# (clave, días desde, días hasta); ``None`` deja el extremo abierto
+TRAMOS = (
+    ("dias_0_30", None, 30),
+    ("dias_31_60", 31, 60),
+    ("dias_61_90", 61, 90),
+    ("mas_de_90", 91, None),
+)
+
+CAMPOS = ("fecha", "total", "saldo")
+
+# Clientes por tanda de consultas en ``imputar_clientes``
+TAMANO_BLOQUE = 200
+
+
+def imputar(cliente_id, deuda, ventas):
+    """
+    Recorre ``ventas`` (tuplas ``(id, fecha, total)`` de la más nueva a la
+    más vieja) hasta cubrir ``deuda`` y devuelve los comprobantes pendientes.
+    """
+    pendientes = []
+    restante = deuda
+    for venta_id, fecha, total in ventas:
+        if restante <= 0:
+            break
+        if total <= 0:
+            continue
+        saldo = min(total, restante)
+        pendientes.append(ComprobantePendiente(
+            venta_id=venta_id, cliente_id=cliente_id, fecha=fecha, total=total, saldo=saldo
+        ))
+        restante -= saldo
+    return pendientes
+
+
+def guardar_diferencias(pendientes, actuales):
+    """
+    Deja en la tabla ``pendientes`` partiendo de ``actuales``
+    (``{venta_id: (fecha, total, saldo)}``): borra los que se cancelaron y
+    crea o actualiza los nuevos o modificados. Devuelve la cantidad de cambios.
+    """
+    cambios = []
+    for pendiente in pendientes:
+        if actuales.pop(pendiente.venta_id, None) != tuple(getattr(pendiente, campo) for campo in CAMPOS):
+            cambios.append(pendiente)
+    if actuales:
+        ComprobantePendiente.objects.filter(venta_id__in=list(actuales)).delete()
+    if cambios:
+        ComprobantePendiente.objects.bulk_create(
+            cambios, batch_size=1000, update_conflicts=True, unique_fields=["venta"], update_fields=CAMPOS
+        )
+    return len(cambios) + len(actuales)
+
+
+def _deuda(total_ventas, total_pagos):
+    return max(Decimal("0"), total_ventas - total_pagos)
+
+
+def imputar_cliente(cliente_id):
+    """Recalcula los comprobantes pendientes de un cliente desde su saldo"""
+    saldo = SaldoCliente.objects.filter(cliente_id=cliente_id).values_list("total_ventas", "total_pagos").first()
+    deuda = _deuda(*saldo) if saldo else Decimal("0")
+    actuales = {
+        venta_id: tuple(datos)
+        for venta_id, *datos in ComprobantePendiente.objects.filter(cliente_id=cliente_id)
+        .order_by().values_list("venta_id", *CAMPOS)
+    }
+    pendientes = []
+    if deuda:
+        ventas = (
+            Venta.objects.filter(cliente_id=cliente_id).order_by("-fecha", "-id")
+            .values_list("id", "fecha", "total")
+            # Casi siempre alcanza con los abiertos y alguno más
+            .iterator(chunk_size=len(actuales) + 10)
+        )
+        pendientes = imputar(cliente_id, deuda, ventas)
+    guardar_diferencias(pendientes, actuales)
+
+
+def _ventas_desde_la_mas_nueva(cliente_id):
+    return (
+        Venta.objects.filter(cliente_id=cliente_id).order_by("-fecha", "-id")
+        .values_list("id", "fecha", "total").iterator(chunk_size=100)
+    )
+
+
+def imputar_clientes(desde_por_cliente):
+    """
+    ``imputar_cliente`` para muchos clientes, con cinco consultas por bloque
+    de ``TAMANO_BLOQUE``. ``desde_por_cliente`` es ``{cliente_id: fecha}``
+    con la fecha de la venta más vieja que cambió (o ``None``).
+
+    La cola nueva de pendientes no empieza antes que esa fecha ni que el
+    pendiente abierto más viejo, así que alcanza con leer las ventas desde
+    ahí. Si esas ventas no cubren la deuda (saldos desparejos), el cliente se
+    recorre completo como en ``imputar_cliente``.
+    """
+    ids = list(desde_por_cliente)
+    for inicio in range(0, len(ids), TAMANO_BLOQUE):
+        bloque = ids[inicio:inicio + TAMANO_BLOQUE]
+        deudas = {
+            cliente_id: _deuda(total_ventas, total_pagos)
+            for cliente_id, total_ventas, total_pagos in SaldoCliente.objects.filter(
+                cliente_id__in=bloque
+            ).values_list("cliente_id", "total_ventas", "total_pagos")
+        }
+        desde = {cliente_id: desde_por_cliente[cliente_id] for cliente_id in bloque}
+        actuales = {}
+        for venta_id, cliente_id, *datos in (
+            ComprobantePendiente.objects.filter(cliente_id__in=bloque)
+            .order_by().values_list("venta_id", "cliente_id", *CAMPOS)
+        ):
+            actuales[venta_id] = tuple(datos)
+            fecha = datos[0]
+            if desde[cliente_id] is None or fecha < desde[cliente_id]:
+                desde[cliente_id] = fecha
+
+        con_deuda = [cliente_id for cliente_id in bloque if deudas.get(cliente_id)]
+        filtro = Q()
+        for cliente_id in con_deuda:
+            if desde[cliente_id] is not None:
+                filtro |= Q(cliente_id=cliente_id, fecha__gte=desde[cliente_id])
+        ventas = defaultdict(list)
+        if filtro:
+            for venta_id, cliente_id, fecha, total in (
+                Venta.objects.filter(filtro).order_by("-fecha", "-id")
+                .values_list("id", "cliente_id", "fecha", "total")
+            ):
+                ventas[cliente_id].append((venta_id, fecha, total))
+
+        pendientes = []
+        for cliente_id in con_deuda:
+            deuda = deudas[cliente_id]
+            propios = imputar(cliente_id, deuda, ventas[cliente_id])
+            if sum((pendiente.saldo for pendiente in propios), Decimal("0")) < deuda:
+                propios = imputar(cliente_id, deuda, _ventas_desde_la_mas_nueva(cliente_id))
+            pendientes.extend(propios)
+        guardar_diferencias(pendientes, actuales)
+
+
+def regenerar_pendientes():
+    """
+    Reconstruye toda la tabla desde ``SaldoCliente`` y las ventas; devuelve
+    ``(pendientes, cambios)``. Recorre el historial completo, es para la carga
+    inicial y las reparaciones.
+    """
+    deudas = {
+        cliente_id: _deuda(total_ventas, total_pagos)
+        for cliente_id, total_ventas, total_pagos in SaldoCliente.objects.filter(
+            total_ventas__gt=0
+        ).values_list("cliente_id", "total_ventas", "total_pagos")
+    }
+    actuales = {
+        venta_id: tuple(datos)
+        for venta_id, *datos in ComprobantePendiente.objects.order_by().values_list("venta_id", *CAMPOS)
+    }
+    pendientes = []
+    for cliente_id, deuda in deudas.items():
+        if deuda:
+            pendientes.extend(imputar(cliente_id, deuda, _ventas_desde_la_mas_nueva(cliente_id)))
+    return len(pendientes), guardar_diferencias(pendientes, actuales)
+
+
+def _cero():
+    return Value(Decimal("0"), output_field=DecimalField(max_digits=14, decimal_places=2))
+
+
+def sumas_por_tramo(hoy=None):
+    """``Sum`` condicionales del saldo por tramo de antigüedad, para ``aggregate`` o ``annotate``"""
+    hoy = hoy or timezone.localdate()
+    sumas = {"total": Coalesce(Sum("saldo"), _cero())}
+    for clave, desde, hasta in TRAMOS:
+        condicion = Q()
+        if desde is not None:
+            condicion &= Q(fecha__lte=hoy - timedelta(days=desde))
+        if hasta is not None:
+            condicion &= Q(fecha__gte=hoy - timedelta(days=hasta))
+        sumas[clave] = Coalesce(Sum("saldo", filter=condicion), _cero())
+    return sumas
+
+
+def antiguedad_por_cliente(hoy=None):
+    """Una fila por cliente con deuda: total y saldo de cada tramo"""
+    return (
+        ComprobantePendiente.objects.order_by()
+        .values("cliente_id", "cliente__nombre")
+        .annotate(**sumas_por_tramo(hoy))
+        .order_by("-total", "cliente_id")
+    )
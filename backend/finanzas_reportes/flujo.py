@@ -0,0 +1,174 @@
+"""
+Flujo de fondos diario.
+
+``FlujoDiario`` acumula cantidad y monto de movimientos financieros por
+(fecha, tipo, origen). Cada alta, baja o cambio de fecha, tipo, origen o
+monto de un ``MovimientoFinanciero`` resta la contribución anterior y suma la
+nueva dentro de la misma transacción, así las series de ``/api/finanzas/flujo/``
+leen a lo sumo una fila por día, tipo y origen sin importar cuántos
+movimientos haya.
+"""
+
+from collections import defaultdict
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+# Campos de MovimientoFinanciero que afectan al flujo
+CAMPOS_FLUJO = frozenset(["fecha", "tipo", "origen", "monto"])
+
+AGRUPACIONES = ("dia", "semana", "mes")
+
+
+def _monto(monto):
+    """Redondea como lo hace la columna ``MovimientoFinanciero.monto``"""
+    return Decimal(monto or 0).quantize(Decimal("0.01"))
+
+
+def _dia(fecha):
+    """La fecha como la guarda la columna (``fecha`` puede venir como datetime o texto)"""
+    from .models import MovimientoFinanciero
+
+    return MovimientoFinanciero._meta.get_field("fecha").to_python(fecha)
+
+
+def aplicar_diferencia(fecha, tipo, origen, movimientos, total):
+    """Suma ``movimientos`` y ``total`` (pueden ser negativos) a la fila del día"""
+    from .models import FlujoDiario
+
+    filas = FlujoDiario.objects.filter(fecha=fecha, tipo=tipo, origen=origen)
+    cambios = {"movimientos": F("movimientos") + movimientos, "total": F("total") + total}
+    if filas.update(**cambios):
+        return
+    try:
+        with transaction.atomic():
+            FlujoDiario.objects.create(
+                fecha=fecha, tipo=tipo, origen=origen, movimientos=movimientos, total=total
+            )
+    except IntegrityError:
+        # Otra transacción creó la fila mientras tanto
+        filas.update(**cambios)
+
+
+def registrar_movimiento(movimiento, anterior=None):
+    """
+    Ajusta el flujo después de guardar ``movimiento``. ``anterior`` es la
+    tupla ``(fecha, tipo, origen, monto)`` previa, o ``None`` si es nuevo.
+    """
+    clave = (_dia(movimiento.fecha), movimiento.tipo, movimiento.origen)
+    monto = _monto(movimiento.monto)
+    if anterior is None:
+        aplicar_diferencia(*clave, 1, monto)
+        return
+
+    *clave_anterior, monto_anterior = anterior
+    if tuple(clave_anterior) == clave:
+        if monto != monto_anterior:
+            aplicar_diferencia(*clave, 0, monto - monto_anterior)
+        return
+    aplicar_diferencia(*clave_anterior, -1, -monto_anterior)
+    aplicar_diferencia(*clave, 1, monto)
+
+
+def registrar_movimientos(movimientos):
+    """Suma al flujo movimientos creados con ``bulk_create`` (una actualización por día, tipo y origen)"""
+    diferencias = defaultdict(lambda: [0, Decimal("0")])
+    for movimiento in movimientos:
+        diferencia = diferencias[(_dia(movimiento.fecha), movimiento.tipo, movimiento.origen)]
+        diferencia[0] += 1
+        diferencia[1] += _monto(movimiento.monto)
+    for clave, (cantidad, total) in diferencias.items():
+        aplicar_diferencia(*clave, cantidad, total)
+
+
+def quitar_movimiento(movimiento):
+    """Descuenta un movimiento eliminado del flujo"""
+    aplicar_diferencia(_dia(movimiento.fecha), movimiento.tipo, movimiento.origen, -1, -_monto(movimiento.monto))
+
+
+def flujo_desde_movimientos():
+    """
+    Recalcula el flujo a partir de ``MovimientoFinanciero`` con una consulta
+    agrupada. Devuelve ``{(fecha, tipo, origen): (movimientos, total)}``.
+    """
+    from .models import MovimientoFinanciero
+
+    filas = MovimientoFinanciero.objects.values("fecha", "tipo", "origen").annotate(
+        cantidad=Count("id"), monto=Sum("monto")
+    ).order_by()
+    return {
+        (fila["fecha"], fila["tipo"], fila["origen"]): (fila["cantidad"], fila["monto"] or Decimal("0"))
+        for fila in filas
+    }
+
+
+def inicio_de_periodo(fecha, agrupacion):
+    if agrupacion == "semana":
+        return fecha - timedelta(days=fecha.weekday())
+    if agrupacion == "mes":
+        return fecha.replace(day=1)
+    return fecha
+
+
+def siguiente_periodo(periodo, agrupacion):
+    if agrupacion == "semana":
+        return periodo + timedelta(days=7)
+    if agrupacion == "mes":
+        return (periodo + timedelta(days=32)).replace(day=1)
+    return periodo + timedelta(days=1)
+
+
+def _ingresos_y_egresos():
+    from .models import MovimientoFinanciero
+
+    return {
+        "ingresos": Sum("total", filter=Q(tipo=MovimientoFinanciero.Tipo.INGRESO), default=Decimal("0")),
+        "egresos": Sum("total", filter=Q(tipo=MovimientoFinanciero.Tipo.EGRESO), default=Decimal("0")),
+        "movimientos": Sum("movimientos", default=0),
+    }
+
+
+def serie_de_flujo(desde, hasta, agrupacion="dia", origen=None):
+    """
+    Ingresos, egresos, neto y saldo acumulado por período entre ``desde`` y
+    ``hasta`` (inclusive), con los períodos sin movimientos en cero. El saldo
+    parte de la suma de todo lo anterior a ``desde``. Dos consultas sobre
+    ``FlujoDiario``.
+    """
+    from .models import FlujoDiario
+
+    filas = FlujoDiario.objects.order_by()
+    if origen:
+        filas = filas.filter(origen=origen)
+
+    previo = filas.filter(fecha__lt=desde).aggregate(**_ingresos_y_egresos())
+    saldo_inicial = previo["ingresos"] - previo["egresos"]
+
+    truncar = {"semana": TruncWeek("fecha"), "mes": TruncMonth("fecha")}.get(agrupacion, F("fecha"))
+    por_periodo = {
+        inicio_de_periodo(fila["periodo"], agrupacion): fila
+        for fila in filas.filter(fecha__gte=desde, fecha__lte=hasta)
+        .annotate(periodo=truncar).values("periodo").annotate(**_ingresos_y_egresos())
+    }
+
+    serie = []
+    saldo = saldo_inicial
+    periodo = inicio_de_periodo(desde, agrupacion)
+    while periodo <= hasta:
+        fila = por_periodo.get(periodo, {})
+        ingresos = fila.get("ingresos", Decimal("0"))
+        egresos = fila.get("egresos", Decimal("0"))
+        saldo += ingresos - egresos
+        serie.append({
+            "periodo": periodo,
+            "movimientos": fila.get("movimientos", 0),
+            "ingresos": ingresos,
+            "egresos": egresos,
+            "neto": ingresos - egresos,
+            "saldo": saldo,
+        })
+        periodo = siguiente_periodo(periodo, agrupacion)
+    return saldo_inicial, serie
@@ -0,0 +1,69 @@
+"""
+Comando para regenerar el flujo diario desde los movimientos financieros.
+Sirve para la carga inicial y para reparar desvíos (por ejemplo después de
+modificar movimientos con ``QuerySet.update``, que no pasa por ``save``).
+"""
+
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from finanzas_reportes.flujo import flujo_desde_movimientos
+from finanzas_reportes.models import FlujoDiario
+
+
+class Command(BaseCommand):
+    help = 'Regenera FlujoDiario a partir de MovimientoFinanciero'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Solo informar las diferencias, sin escribir'
+        )
+        parser.add_argument(
+            '--lote',
+            type=int,
+            default=1000,
+            help='Filas por lote de escritura (default: 1000)'
+        )
+
+    def handle(self, *args, **options):
+        dry_run = options.get('dry_run', False)
+        lote = options.get('lote') or 1000
+        inicio = time.perf_counter()
+
+        with transaction.atomic():
+            esperado = flujo_desde_movimientos()
+            actual = {
+                (fila.fecha, fila.tipo, fila.origen): fila
+                for fila in FlujoDiario.objects.select_for_update()
+            }
+
+            cambios = [
+                FlujoDiario(fecha=fecha, tipo=tipo, origen=origen, movimientos=movimientos, total=total)
+                for (fecha, tipo, origen), (movimientos, total) in esperado.items()
+                if (fecha, tipo, origen) not in actual
+                or (actual[(fecha, tipo, origen)].movimientos, actual[(fecha, tipo, origen)].total) != (movimientos, total)
+            ]
+            sobrantes = [fila.pk for clave, fila in actual.items() if clave not in esperado]
+
+            if not dry_run:
+                FlujoDiario.objects.bulk_create(
+                    cambios,
+                    batch_size=lote,
+                    update_conflicts=True,
+                    unique_fields=['fecha', 'tipo', 'origen'],
+                    update_fields=['movimientos', 'total']
+                )
+                FlujoDiario.objects.filter(pk__in=sobrantes).delete()
+
+        mensaje = (
+            f'Flujo diario: {len(esperado)} filas esperadas, {len(cambios)} corregidas, '
+            f'{len(sobrantes)} eliminadas en {time.perf_counter() - inicio:.2f}s'
+        )
+        if dry_run:
+            self.stdout.write(self.style.WARNING(f'MODO DRY-RUN: {mensaje}'))
+        else:
+            self.stdout.write(self.style.SUCCESS(mensaje))
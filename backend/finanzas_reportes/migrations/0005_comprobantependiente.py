@@ -0,0 +1,32 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:27
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0010_recomendaciones'),
+        ('finanzas_reportes', '0004_movimientofinanciero_origen_and_more'),
+        ('ventas', '0004_indice_cliente_fecha'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ComprobantePendiente',
+            fields=[
+                ('venta', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='pendiente', serialize=False, to='ventas.venta')),
+                ('fecha', models.DateField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('saldo', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('cliente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='comprobantes_pendientes', to='clientes.cliente')),
+            ],
+            options={
+                'verbose_name': 'comprobante pendiente',
+                'verbose_name_plural': 'comprobantes pendientes',
+                'ordering': ['cliente', 'fecha', 'venta'],
+                'indexes': [models.Index(fields=['cliente', 'fecha'], name='pendiente_cliente_fecha_idx')],
+            },
+        ),
+    ]
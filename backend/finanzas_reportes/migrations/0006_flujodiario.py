@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:30
+
+from decimal import Decimal
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('finanzas_reportes', '0005_comprobantependiente'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FlujoDiario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('tipo', models.CharField(choices=[('INGRESO', 'Ingreso'), ('EGRESO', 'Egreso')], max_length=10)),
+                ('origen', models.CharField(choices=[('MANUAL', 'Manual'), ('COMPRA', 'Compra'), ('VENTA', 'Venta'), ('PAGO_EMPLEADO', 'Pago empleado')], max_length=20)),
+                ('movimientos', models.IntegerField(default=0)),
+                ('total', models.DecimalField(decimal_places=2, default=Decimal('0'), max_digits=14)),
+            ],
+            options={
+                'verbose_name': 'flujo diario',
+                'verbose_name_plural': 'flujos diarios',
+                'ordering': ['-fecha', 'tipo', 'origen'],
+                'unique_together': {('fecha', 'tipo', 'origen')},
+            },
+        ),
+    ]
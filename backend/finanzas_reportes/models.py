@@ -1,9 +1,10 @@
 from decimal import Decimal
 
-from django.db import models
+from django.db import models, transaction
 from django.utils import timezone
 
 from clientes.models import Cliente
+from clientes.saldos import registrar_pago
 
 
 class PagoCliente(models.Model):
@@ -24,6 +25,21 @@ class PagoCliente(models.Model):
     def __str__(self):
         return f"Pago {self.monto} de {self.cliente.nombre} ({self.get_medio_display()})"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"cliente", "cliente_id", "monto"}.intersection(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = None
+            if not self._state.adding:
+                anterior = PagoCliente.objects.select_for_update().filter(pk=self.pk).values_list(
+                    "cliente_id", "monto"
+                ).first()
+            super().save(*args, **kwargs)
+            # El saldo del cliente se ajusta en la misma transacción que el pago
+            registrar_pago(self, anterior)
+
 
 class MovimientoFinanciero(models.Model):
     class Tipo(models.TextChoices):
@@ -63,4 +79,69 @@ class MovimientoFinanciero(models.Model):
         verbose_name_plural = "movimientos financieros"
 
     def __str__(self) -> str:
-        return f"{self.get_tipo_display()} - {self.monto} ({self.get_origen_display()})"
\ No newline at end of file
+        return f"{self.get_tipo_display()} - {self.monto} ({self.get_origen_display()})"
+
+    def save(self, *args, **kwargs):
+        from .flujo import CAMPOS_FLUJO, registrar_movimiento
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not CAMPOS_FLUJO.intersection(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = None
+            if not self._state.adding:
+                anterior = MovimientoFinanciero.objects.select_for_update().filter(pk=self.pk).values_list(
+                    "fecha", "tipo", "origen", "monto"
+                ).first()
+            super().save(*args, **kwargs)
+            # El flujo diario se ajusta en la misma transacción que el movimiento
+            registrar_movimiento(self, anterior)
+
+
+class FlujoDiario(models.Model):
+    """
+    Cantidad y monto de movimientos financieros por día, tipo y origen.
+
+    Se mantiene de forma incremental al guardar o eliminar movimientos (ver
+    finanzas_reportes.flujo); el comando ``reconstruir_flujo_diario`` lo
+    regenera desde ``MovimientoFinanciero``.
+    """
+    fecha = models.DateField()
+    tipo = models.CharField(max_length=10, choices=MovimientoFinanciero.Tipo.choices)
+    origen = models.CharField(max_length=20, choices=MovimientoFinanciero.Origen.choices)
+    movimientos = models.IntegerField(default=0)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=Decimal("0"))
+
+    class Meta:
+        ordering = ["-fecha", "tipo", "origen"]
+        verbose_name = "flujo diario"
+        verbose_name_plural = "flujos diarios"
+        unique_together = ["fecha", "tipo", "origen"]
+
+    def __str__(self) -> str:
+        return f"{self.fecha} - {self.get_tipo_display()} - {self.get_origen_display()}: {self.total}"
+
+
+class ComprobantePendiente(models.Model):
+    """
+    Venta con saldo por cobrar. Los pagos de cada cliente se imputan a sus
+    ventas de la más antigua a la más nueva y solo quedan filas para lo que
+    falta cubrir (ver finanzas_reportes.cuentas_por_cobrar).
+    """
+    venta = models.OneToOneField(
+        "ventas.Venta", on_delete=models.CASCADE, primary_key=True, related_name="pendiente"
+    )
+    cliente = models.ForeignKey(Cliente, on_delete=models.CASCADE, related_name="comprobantes_pendientes")
+    fecha = models.DateField()
+    total = models.DecimalField(max_digits=12, decimal_places=2)
+    saldo = models.DecimalField(max_digits=12, decimal_places=2)
+
+    class Meta:
+        ordering = ["cliente", "fecha", "venta"]
+        indexes = [models.Index(fields=["cliente", "fecha"], name="pendiente_cliente_fecha_idx")]
+        verbose_name = "comprobante pendiente"
+        verbose_name_plural = "comprobantes pendientes"
+
+    def __str__(self) -> str:
+        return f"Venta {self.venta_id}: {self.saldo} de {self.total}"
@@ -1,5 +1,8 @@
-﻿from rest_framework import serializers
+﻿from datetime import timedelta
 
+from rest_framework import serializers
+
+from .flujo import AGRUPACIONES
 from .models import MovimientoFinanciero, PagoCliente
 
 
@@ -61,3 +64,24 @@ class GastoManualSerializer(serializers.Serializer):
             monto=validated_data["monto"],
             descripcion=validated_data["descripcion"],
         )
+
+
+class FlujoParametrosSerializer(serializers.Serializer):
+    """Parámetros de ``/api/finanzas/flujo/``; por defecto los últimos 365 días, por día"""
+    MAXIMO_DIAS = 366 * 5
+
+    agrupacion = serializers.ChoiceField(choices=AGRUPACIONES, default="dia")
+    desde = serializers.DateField(required=False)
+    hasta = serializers.DateField(required=False)
+    origen = serializers.ChoiceField(choices=MovimientoFinanciero.Origen.choices, required=False)
+
+    def validate(self, data):
+        from django.utils import timezone
+
+        data.setdefault("hasta", timezone.localdate())
+        data.setdefault("desde", data["hasta"] - timedelta(days=364))
+        if data["desde"] > data["hasta"]:
+            raise serializers.ValidationError("desde debe ser anterior a hasta")
+        if (data["hasta"] - data["desde"]).days > self.MAXIMO_DIAS:
+            raise serializers.ValidationError(f"El período no puede superar {self.MAXIMO_DIAS} días")
+        return data
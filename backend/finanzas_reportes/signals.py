@@ -0,0 +1,11 @@
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .flujo import quitar_movimiento
+from .models import MovimientoFinanciero
+
+
+@receiver(post_delete, sender=MovimientoFinanciero)
+def descontar_movimiento_del_flujo(sender, instance, **kwargs):
+    """Quita el movimiento eliminado del flujo diario (también al borrar su venta o compra)"""
+    quitar_movimiento(instance)
@@ -1,3 +1,232 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from io import StringIO
+from rest_framework.test import APIClient
+
+from clientes.models import Cliente
+from ventas.models import Venta
+from .cuentas_por_cobrar import regenerar_pendientes
+from .models import ComprobantePendiente, FlujoDiario, MovimientoFinanciero, PagoCliente
+
+
+class CuentasPorCobrarTests(TestCase):
+    def setUp(self):
+        self.hoy = timezone.localdate()
+        self.cliente = Cliente.objects.create(nombre='Despensa Norte', identificacion='90-1')
+        self.otro = Cliente.objects.create(nombre='Kiosco Sur', identificacion='90-2')
+        self.api = APIClient()
+        self.api.force_authenticate(get_user_model().objects.create_user(
+            username='cobranzas', email='cobranzas@example.com', password='secreta123'
+        ))
+
+    def venta(self, total, dias, cliente=None):
+        return Venta.objects.create(
+            cliente=cliente or self.cliente, total=Decimal(total), fecha=self.hoy - timedelta(days=dias)
+        )
+
+    def pago(self, monto, cliente=None):
+        return PagoCliente.objects.create(cliente=cliente or self.cliente, monto=Decimal(monto), fecha=self.hoy)
+
+    def pendientes(self, cliente=None):
+        return dict(
+            ComprobantePendiente.objects.filter(cliente=cliente or self.cliente).values_list('venta_id', 'saldo')
+        )
+
+    def test_pagos_se_imputan_a_las_ventas_mas_antiguas(self):
+        vieja, media, nueva = self.venta('100', 100), self.venta('50', 45), self.venta('30', 5)
+        self.assertEqual(self.pendientes(), {vieja.pk: 100, media.pk: 50, nueva.pk: 30})
+
+        pago = self.pago('120')
+        self.assertEqual(self.pendientes(), {media.pk: 30, nueva.pk: 30})
+
+        pago.monto = Decimal('200')
+        pago.save()
+        self.assertEqual(self.pendientes(), {})
+
+        pago.delete()
+        self.assertEqual(self.pendientes(), {vieja.pk: 100, media.pk: 50, nueva.pk: 30})
+
+    def test_cambios_de_ventas(self):
+        vieja, nueva = self.venta('100', 20), self.venta('40', 10)
+        self.pago('100')
+        self.assertEqual(self.pendientes(), {nueva.pk: 40})
+
+        # Una venta cargada con fecha anterior pasa a cubrirse primero
+        atrasada = self.venta('50', 30)
+        self.assertEqual(self.pendientes(), {vieja.pk: 50, nueva.pk: 40})
+
+        nueva.total = Decimal('10')
+        nueva.save()
+        self.assertEqual(self.pendientes(), {vieja.pk: 50, nueva.pk: 10})
+
+        atrasada.delete()
+        self.assertEqual(self.pendientes(), {nueva.pk: 10})
+
+    def test_cambio_de_fecha_vuelve_a_imputar(self):
+        vieja, nueva = self.venta('100', 100), self.venta('100', 5)
+        self.pago('100')
+        self.assertEqual(self.pendientes(), {nueva.pk: 100})
+
+        # Solo cambia la fecha: el saldo es el mismo pero la venta pasa a cubrirse primero
+        nueva.fecha = self.hoy - timedelta(days=200)
+        nueva.save()
+        self.assertEqual(self.pendientes(), {vieja.pk: 100})
+        self.assertEqual(regenerar_pendientes()[1], 0)
+
+        nueva.fecha = self.hoy - timedelta(days=5)
+        nueva.save(update_fields=['fecha'])
+        self.assertEqual(self.pendientes(), {nueva.pk: 100})
+        self.assertEqual(regenerar_pendientes()[1], 0)
+
+    def test_resumen_por_tramos(self):
+        self.venta('100', 100)
+        self.venta('50', 45)
+        self.venta('30', 5)
+        self.pago('120')
+        self.venta('70', 75, cliente=self.otro)
+        self.pago('100', cliente=self.otro)
+
+        resumen = self.api.get('/api/finanzas/movimientos/resumen/pendiente/').json()
+        self.assertEqual(Decimal(resumen['pendiente_cobro']), Decimal('60'))
+        self.assertEqual(Decimal(resumen['saldo_a_favor']), Decimal('30'))
+        self.assertEqual(Decimal(resumen['total_ventas']), Decimal('250'))
+        self.assertEqual(
+            {clave: Decimal(valor) for clave, valor in resumen['antiguedad'].items()},
+            {'dias_0_30': 30, 'dias_31_60': 30, 'dias_61_90': 0, 'mas_de_90': 0},
+        )
+
+        filas = self.api.get('/api/finanzas/movimientos/resumen/antiguedad/').json()['results']
+        self.assertEqual(len(filas), 1)
+        self.assertEqual(filas[0]['cliente'], self.cliente.pk)
+        self.assertEqual((Decimal(filas[0]['total']), Decimal(filas[0]['dias_31_60'])), (60, 30))
+
+        comprobantes = self.api.get(f'/api/clientes/{self.cliente.pk}/comprobantes-pendientes/').json()
+        self.assertEqual([(c['dias'], Decimal(c['saldo'])) for c in comprobantes], [(45, 30), (5, 30)])
+
+    def test_imputar_no_recorre_el_historial(self):
+        def consultas_de_un_pago():
+            with CaptureQueriesContext(connection) as consultas:
+                self.pago('5')
+            return len(consultas)
+
+        self.venta('10', 3)
+        corto = consultas_de_un_pago()
+        for dias in range(200, 0, -1):
+            self.venta('10', dias)
+        self.pago('1990')
+        largo = consultas_de_un_pago()
+        self.assertEqual(corto, largo)
+        self.assertEqual(len(self.pendientes()), 1)
+
+    def test_reconciliar_regenera_pendientes(self):
+        vieja, nueva = self.venta('100', 40), self.venta('60', 10)
+        self.pago('120')
+        esperado = self.pendientes()
+        ComprobantePendiente.objects.all().delete()
+        Venta.objects.filter(pk=vieja.pk).update(total=Decimal('80'))
+
+        call_command('reconciliar_saldos_clientes', stdout=StringIO())
+        self.assertNotEqual(self.pendientes(), esperado)
+        self.assertEqual(self.pendientes(), {nueva.pk: 20})
+
+
+class FlujoDiarioTests(TestCase):
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(get_user_model().objects.create_user(
+            username='tesoreria', email='tesoreria@example.com', password='secreta123'
+        ))
+        self.cliente = Cliente.objects.create(nombre='Almacén Oeste', identificacion='91-1')
+
+    def movimiento(self, fecha, monto, tipo=MovimientoFinanciero.Tipo.INGRESO, origen=MovimientoFinanciero.Origen.MANUAL):
+        return MovimientoFinanciero.objects.create(fecha=fecha, monto=Decimal(monto), tipo=tipo, origen=origen)
+
+    def flujo(self):
+        return {
+            (str(fila.fecha), fila.tipo, fila.origen): (fila.movimientos, fila.total)
+            for fila in FlujoDiario.objects.exclude(movimientos=0)
+        }
+
+    def test_altas_cambios_y_bajas(self):
+        ingreso = self.movimiento('2026-03-02', '100')
+        self.movimiento('2026-03-02', '50')
+        gasto = self.movimiento('2026-03-03', '30', tipo=MovimientoFinanciero.Tipo.EGRESO)
+        self.assertEqual(self.flujo(), {
+            ('2026-03-02', 'INGRESO', 'MANUAL'): (2, Decimal('150')),
+            ('2026-03-03', 'EGRESO', 'MANUAL'): (1, Decimal('30')),
+        })
+
+        ingreso.monto = Decimal('120')
+        ingreso.save()
+        gasto.fecha = '2026-03-04'
+        gasto.save()
+        self.assertEqual(self.flujo(), {
+            ('2026-03-02', 'INGRESO', 'MANUAL'): (2, Decimal('170')),
+            ('2026-03-04', 'EGRESO', 'MANUAL'): (1, Decimal('30')),
+        })
+
+        gasto.delete()
+        self.assertEqual(self.flujo(), {('2026-03-02', 'INGRESO', 'MANUAL'): (2, Decimal('170'))})
+
+    def test_ventas_individuales_y_por_lote(self):
+        producto_linea = {'descripcion': 'Queso', 'cantidad': '1', 'precio_unitario': '40'}
+        respuesta = self.api.post('/api/ventas/', {'cliente': self.cliente.pk, 'lineas': [producto_linea]}, format='json')
+        venta = respuesta.json()
+        self.api.put(f"/api/ventas/{venta['id']}/", {
+            'cliente': self.cliente.pk, 'lineas': [{**producto_linea, 'precio_unitario': '45'}],
+        }, format='json')
+        self.api.post('/api/ventas/lote/', {'ventas': [
+            {'clave': f'f-{i}', 'cliente': self.cliente.pk, 'fecha': venta['fecha'], 'lineas': [producto_linea]}
+            for i in range(3)
+        ]}, format='json')
+        self.assertEqual(self.flujo(), {(venta['fecha'], 'INGRESO', 'VENTA'): (4, Decimal('165'))})
+
+        Venta.objects.get(pk=venta['id']).delete()
+        self.assertEqual(self.flujo(), {(venta['fecha'], 'INGRESO', 'VENTA'): (3, Decimal('120'))})
+
+    def test_serie_con_saldo_acumulado(self):
+        self.movimiento('2025-12-20', '1000')
+        self.movimiento('2026-01-05', '300')
+        self.movimiento('2026-01-20', '200', tipo=MovimientoFinanciero.Tipo.EGRESO)
+        self.movimiento('2026-03-10', '50', origen=MovimientoFinanciero.Origen.VENTA)
+
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.api.get('/api/finanzas/flujo/', {
+                'agrupacion': 'mes', 'desde': '2026-01-01', 'hasta': '2026-03-31',
+            })
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        self.assertEqual(len(consultas), 2)
+        data = respuesta.json()
+        self.assertEqual(Decimal(data['saldo_inicial']), Decimal('1000'))
+        self.assertEqual(
+            [(punto['periodo'], Decimal(punto['neto']), Decimal(punto['saldo'])) for punto in data['serie']],
+            [('2026-01-01', 100, 1100), ('2026-02-01', 0, 1100), ('2026-03-01', 50, 1150)],
+        )
+        self.assertEqual(Decimal(data['saldo_final']), Decimal('1150'))
+
+        semanas = self.api.get('/api/finanzas/flujo/', {
+            'agrupacion': 'semana', 'desde': '2026-01-07', 'hasta': '2026-01-31', 'origen': 'MANUAL',
+        }).json()
+        self.assertEqual(semanas['serie'][0]['periodo'], '2026-01-05')
+        self.assertEqual(Decimal(semanas['saldo_inicial']), Decimal('1300'))
+        self.assertEqual(Decimal(semanas['egresos']), Decimal('200'))
+
+        dias = self.api.get('/api/finanzas/flujo/').json()
+        self.assertEqual(len(dias['serie']), 365)
+
+        self.assertEqual(self.api.get('/api/finanzas/flujo/', {'agrupacion': 'anio'}).status_code, 400)
+
+    def test_reconstruir(self):
+        self.movimiento('2026-02-01', '80')
+        MovimientoFinanciero.objects.update(monto=Decimal('90'))
+        FlujoDiario.objects.create(fecha='2020-01-01', tipo='EGRESO', origen='MANUAL', movimientos=1, total=5)
 
-# Create your tests here.
+        call_command('reconstruir_flujo_diario', stdout=StringIO())
+        self.assertEqual(self.flujo(), {('2026-02-01', 'INGRESO', 'MANUAL'): (1, Decimal('90'))})
@@ -1,9 +1,10 @@
 from rest_framework.routers import DefaultRouter
 
-from .views import MovimientoFinancieroViewSet, PagoClienteViewSet
+from .views import FlujoViewSet, MovimientoFinancieroViewSet, PagoClienteViewSet
 
 router = DefaultRouter()
 router.register(r"pagos", PagoClienteViewSet, basename="pago-cliente")
 router.register(r"movimientos", MovimientoFinancieroViewSet, basename="movimiento-financiero")
+router.register(r"flujo", FlujoViewSet, basename="flujo")
 
 urlpatterns = router.urls
\ No newline at end of file
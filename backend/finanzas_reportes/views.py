@@ -1,13 +1,17 @@
 ﻿from decimal import Decimal
-from django.db.models import Sum
+from django.db.models import Sum, Value
+from django.db.models.functions import Coalesce
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import filters, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
-from ventas.models import Venta
-from .models import MovimientoFinanciero, PagoCliente
+from clientes.models import SaldoCliente
+from .cuentas_por_cobrar import TRAMOS, antiguedad_por_cliente, sumas_por_tramo
+from .flujo import serie_de_flujo
+from .models import ComprobantePendiente, MovimientoFinanciero, PagoCliente
 from .serializers import (
+    FlujoParametrosSerializer,
     GastoManualSerializer,
     MovimientoFinancieroSerializer,
     PagoClienteSerializer,
@@ -61,13 +65,68 @@ class MovimientoFinancieroViewSet(viewsets.ModelViewSet):
 
     @action(detail=False, methods=["get"], url_path="resumen/pendiente")
     def resumen_pendiente(self, request):
-        total_ventas = Venta.objects.aggregate(total=Sum("total")) or {}
-        total_pagos = PagoCliente.objects.aggregate(total=Sum("monto")) or {}
-        total_ventas_val = total_ventas.get("total") or Decimal("0")
-        total_pagos_val = total_pagos.get("total") or Decimal("0")
-        pendiente = total_ventas_val - total_pagos_val
+        """Totales de cuenta corriente y deuda por tramo de antigüedad"""
+        totales = SaldoCliente.objects.aggregate(
+            total_ventas=Coalesce(Sum("total_ventas"), Value(Decimal("0"))),
+            total_pagos=Coalesce(Sum("total_pagos"), Value(Decimal("0"))),
+        )
+        antiguedad = ComprobantePendiente.objects.aggregate(**sumas_por_tramo())
+        pendiente = antiguedad.pop("total")
         return Response({
-            "total_ventas": str(total_ventas_val),
-            "total_pagos": str(total_pagos_val),
+            "total_ventas": str(totales["total_ventas"]),
+            "total_pagos": str(totales["total_pagos"]),
             "pendiente_cobro": str(pendiente),
-        })
\ No newline at end of file
+            # Pagos que exceden lo vendido (el global descontaba esto de lo pendiente)
+            "saldo_a_favor": str(pendiente - (totales["total_ventas"] - totales["total_pagos"])),
+            "antiguedad": {clave: str(valor) for clave, valor in antiguedad.items()},
+        })
+
+    @action(detail=False, methods=["get"], url_path="resumen/antiguedad")
+    def resumen_antiguedad(self, request):
+        """Deuda de cada cliente por tramo de antigüedad, de mayor a menor"""
+        filas = antiguedad_por_cliente()
+        pagina = self.paginate_queryset(filas)
+        datos = [
+            {
+                "cliente": fila["cliente_id"],
+                "cliente_nombre": fila["cliente__nombre"],
+                **{clave: str(fila[clave]) for clave in ("total", *(tramo[0] for tramo in TRAMOS))},
+            }
+            for fila in (pagina if pagina is not None else filas)
+        ]
+        if pagina is not None:
+            return self.get_paginated_response(datos)
+        return Response(datos)
+
+
+class FlujoViewSet(viewsets.ViewSet):
+    """
+    Serie de flujo de fondos por día, semana o mes con saldo acumulado, leída
+    de ``FlujoDiario`` (ver finanzas_reportes.flujo).
+
+    Parámetros: ``agrupacion`` (dia, semana, mes), ``desde``, ``hasta`` y ``origen``.
+    """
+
+    def list(self, request):
+        parametros = FlujoParametrosSerializer(data=request.query_params)
+        parametros.is_valid(raise_exception=True)
+        datos = parametros.validated_data
+        saldo_inicial, serie = serie_de_flujo(
+            datos["desde"], datos["hasta"], datos["agrupacion"], datos.get("origen")
+        )
+        return Response({
+            "agrupacion": datos["agrupacion"],
+            "desde": datos["desde"],
+            "hasta": datos["hasta"],
+            "saldo_inicial": str(saldo_inicial),
+            "ingresos": str(sum((punto["ingresos"] for punto in serie), Decimal("0"))),
+            "egresos": str(sum((punto["egresos"] for punto in serie), Decimal("0"))),
+            "saldo_final": str(serie[-1]["saldo"] if serie else saldo_inicial),
+            "serie": [
+                {
+                    **punto,
+                    **{campo: str(punto[campo]) for campo in ("ingresos", "egresos", "neto", "saldo")},
+                }
+                for punto in serie
+            ],
+        })
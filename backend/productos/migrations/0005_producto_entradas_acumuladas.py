@@ -0,0 +1,51 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:38
+
+from decimal import Decimal
+from django.db import migrations, models
+from django.db.models import DecimalField, F, Sum
+
+
+def llenar_acumulados(apps, schema_editor):
+    """
+    Carga en los acumuladores las entradas con costo ya registradas. Sin esto
+    la primera entrada nueva de cada producto reemplazaría ``avg_cost`` por
+    su propio costo (ver ``compras.stock.aplicar_movimiento``).
+    """
+    Producto = apps.get_model('productos', 'Producto')
+    MovimientoStock = apps.get_model('compras', 'MovimientoStock')
+    filas = MovimientoStock.objects.filter(
+        tipo='entrada', costo_unitario__gt=0, cantidad__gt=0
+    ).values('producto_id').annotate(
+        total_cantidad=Sum('cantidad'),
+        total_valor=Sum(F('cantidad') * F('costo_unitario'), output_field=DecimalField(max_digits=18, decimal_places=4)),
+    ).order_by()
+    Producto.objects.bulk_update(
+        [
+            Producto(pk=fila['producto_id'], entradas_cantidad=fila['total_cantidad'], entradas_valor=fila['total_valor'])
+            for fila in filas
+        ],
+        ['entradas_cantidad', 'entradas_valor'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0004_producto_avg_cost_producto_is_demo_and_more'),
+        ('compras', '0003_ordencompra_ordencompraitem_movimientostock_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='producto',
+            name='entradas_cantidad',
+            field=models.DecimalField(decimal_places=2, default=Decimal('0'), help_text='Cantidad acumulada de entradas con costo (base de avg_cost)', max_digits=18),
+        ),
+        migrations.AddField(
+            model_name='producto',
+            name='entradas_valor',
+            field=models.DecimalField(decimal_places=4, default=Decimal('0'), help_text='Valor acumulado de entradas con costo (base de avg_cost)', max_digits=18),
+        ),
+        migrations.RunPython(llenar_acumulados, migrations.RunPython.noop),
+    ]
@@ -2,11 +2,13 @@ from decimal import Decimal
 
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 
 class Marca(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     activo = models.BooleanField(default=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ["nombre"]
@@ -20,6 +22,7 @@ class Marca(models.Model):
 class Categoria(models.Model):
     nombre = models.CharField(max_length=100, unique=True)
     activo = models.BooleanField(default=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
     
     class Meta:
         ordering = ["nombre"]
@@ -30,6 +33,15 @@ class Categoria(models.Model):
         return self.nombre
 
 
+class ProductoQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        # El stock se mueve con UPDATE ... F() (compras.stock); la fecha de
+        # modificación tiene que acompañarlo para las versiones del catálogo
+        # (core.condicional)
+        kwargs.setdefault("fecha_actualizacion", timezone.now())
+        return super().update(**kwargs)
+
+
 class Producto(models.Model):
     UNIDADES_CHOICES = [
         ('kg', 'Kilogramos'),
@@ -75,8 +87,23 @@ class Producto(models.Model):
         validators=[MinValueValidator(0)],
         help_text="Costo promedio móvil"
     )
+    entradas_cantidad = models.DecimalField(
+        max_digits=18,
+        decimal_places=2,
+        default=Decimal("0"),
+        help_text="Cantidad acumulada de entradas con costo (base de avg_cost)"
+    )
+    entradas_valor = models.DecimalField(
+        max_digits=18,
+        decimal_places=4,
+        default=Decimal("0"),
+        help_text="Valor acumulado de entradas con costo (base de avg_cost)"
+    )
     activo = models.BooleanField(default=True)
     is_demo = models.BooleanField(default=False, help_text="Marca si es dato de demostración")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    objects = ProductoQuerySet.as_manager()
 
     class Meta:
         ordering = ["nombre"]
@@ -89,6 +116,13 @@ class Producto(models.Model):
             display = f"{self.nombre} ({self.sku})"
         return display
 
+    def save(self, *args, **kwargs):
+        # auto_now solo se guarda si el campo está en update_fields
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None:
+            kwargs["update_fields"] = {*update_fields, "fecha_actualizacion"}
+        super().save(*args, **kwargs)
+
     def _normalizar_cantidad(self, cantidad) -> Decimal:
         if cantidad is None:
             raise ValueError("Debes indicar una cantidad válida")
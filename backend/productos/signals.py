@@ -0,0 +1,19 @@
+from django.db.models.signals import post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Categoria, Marca, Producto
+
+
+@receiver(post_save, sender=Marca)
+def tocar_productos_de_la_marca(sender, instance, created, **kwargs):
+    """Los productos muestran el nombre de la marca: cambia la versión de su listado"""
+    if not created:
+        Producto.objects.filter(marca=instance).update(fecha_actualizacion=timezone.now())
+
+
+@receiver(post_save, sender=Categoria)
+def tocar_productos_de_la_categoria(sender, instance, created, **kwargs):
+    """Los productos muestran el nombre de la categoría: cambia la versión de su listado"""
+    if not created:
+        Producto.objects.filter(categoria=instance).update(fecha_actualizacion=timezone.now())
@@ -1,3 +1,119 @@
-from django.test import TestCase
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.db.migrations.executor import MigrationExecutor
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from compras.models import MovimientoStock as MovimientoStockActual
+from .models import Categoria, Marca, Producto
+
+
+class GetCondicionalCatalogoTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.marca = Marca.objects.create(nombre='La Serenísima')
+        self.categoria = Categoria.objects.create(nombre='Quesos')
+        self.producto = Producto.objects.create(
+            nombre='Cremoso 1kg', sku='CR-1', marca=self.marca, categoria=self.categoria
+        )
+        Producto.objects.create(nombre='Rallado 150g', sku='RA-1', marca=self.marca)
+
+    def etag(self, url='/api/productos/productos/'):
+        respuesta = self.client.get(url)
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta['Cache-Control'], 'private, no-cache')
+        return respuesta['ETag']
+
+    def get_condicional(self, etag, url='/api/productos/productos/'):
+        return self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_304_con_una_consulta_y_sin_cuerpo(self):
+        etag = self.etag()
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.get_condicional(f'W/{etag}, "otro"')
+        self.assertEqual(respuesta.status_code, 304)
+        self.assertEqual(respuesta['ETag'], etag)
+        self.assertFalse(respuesta.content)
+        self.assertEqual(len(consultas), 1)
+
+    def test_cambios_que_invalidan(self):
+        etag = self.etag()
+        # Movimiento de stock por QuerySet.update (como compras.stock)
+        self.client.post(f'/api/productos/productos/{self.producto.pk}/agregar-stock/', {'cantidad': '5'})
+        self.assertEqual(self.get_condicional(etag).status_code, 200)
+
+        etag = self.etag()
+        self.producto.refresh_from_db()
+        self.producto.quitar_stock(Decimal('1'))
+        self.assertEqual(self.get_condicional(etag).status_code, 200)
+
+        etag = self.etag()
+        self.marca.nombre = 'Serenísima'
+        self.marca.save()
+        self.assertEqual(self.get_condicional(etag).status_code, 200)
+
+        etag = self.etag()
+        Producto.objects.filter(sku='RA-1').delete()
+        self.assertEqual(self.get_condicional(etag).status_code, 200)
+
+    def test_etag_depende_de_filtros_y_listado(self):
+        self.assertNotEqual(self.etag(), self.etag('/api/productos/productos/?search=Cremoso'))
+
+        etag = self.etag('/api/productos/marcas/')
+        Marca.objects.create(nombre='Milkaut')
+        self.assertEqual(self.get_condicional(etag, '/api/productos/marcas/').status_code, 200)
+
+        etag = self.etag('/api/productos/categorias/')
+        self.categoria.activo = False
+        self.categoria.save()
+        respuesta = self.get_condicional(etag, '/api/productos/categorias/')
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()['count'], 0)
+
+
+class LlenarAcumuladosMigracionTests(TransactionTestCase):
+    antes = [
+        ('productos', '0004_producto_avg_cost_producto_is_demo_and_more'),
+        ('compras', '0003_ordencompra_ordencompraitem_movimientostock_and_more'),
+    ]
+    despues = [('productos', '0005_producto_entradas_acumuladas')]
+
+    def migrar(self, destino):
+        executor = MigrationExecutor(connection)
+        destino = destino or executor.loader.graph.leaf_nodes()
+        executor.migrate(destino)
+        return executor.loader.project_state(destino).apps
+
+    def tearDown(self):
+        self.migrar(None)
+
+    def test_avg_cost_se_mantiene_con_entradas_previas(self):
+        apps = self.migrar(self.antes)
+        usuario = apps.get_model('authentication', 'User').objects.create(username='deposito', email='deposito@example.com')
+        producto = apps.get_model('productos', 'Producto').objects.create(
+            nombre='Manteca 200g', sku='MA-200', stock=Decimal('15'), avg_cost=Decimal('110.00')
+        )
+        MovimientoStock = apps.get_model('compras', 'MovimientoStock')
+        for cantidad, costo in [('10', '100'), ('10', '120')]:
+            MovimientoStock.objects.create(
+                producto=producto, usuario=usuario, tipo='entrada', cantidad=Decimal(cantidad), costo_unitario=Decimal(costo)
+            )
+        MovimientoStock.objects.create(producto=producto, usuario=usuario, tipo='salida', cantidad=Decimal('5'))
+
+        apps = self.migrar(self.despues)
+        migrado = apps.get_model('productos', 'Producto').objects.get(pk=producto.pk)
+        self.assertEqual(
+            (migrado.entradas_cantidad, migrado.entradas_valor, migrado.avg_cost),
+            (Decimal('20'), Decimal('2200'), Decimal('110.00')),
+        )
+
+        # La primera entrada después del deploy promedia con el historial
+        self.migrar(None)
+        MovimientoStockActual.objects.create(
+            producto_id=producto.pk, usuario=get_user_model().objects.get(pk=usuario.pk), tipo='entrada',
+            cantidad=Decimal('20'), costo_unitario=Decimal('140'),
+        )
+        self.assertEqual(Producto.objects.get(pk=producto.pk).avg_cost, Decimal('125.00'))
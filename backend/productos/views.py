@@ -6,11 +6,13 @@ from rest_framework import filters, permissions, status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
+from core.condicional import GetCondicionalMixin
+
 from .models import Producto, Marca, Categoria
 from .serializers import ProductoSerializer, MarcaSerializer, CategoriaSerializer
 
 
-class ProductoViewSet(viewsets.ModelViewSet):
+class ProductoViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Producto.objects.all()
     serializer_class = ProductoSerializer
@@ -63,7 +65,7 @@ class ProductoViewSet(viewsets.ModelViewSet):
         return cantidad
 
 
-class MarcaViewSet(viewsets.ModelViewSet):
+class MarcaViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Marca.objects.filter(activo=True)
     serializer_class = MarcaSerializer
@@ -73,7 +75,7 @@ class MarcaViewSet(viewsets.ModelViewSet):
     ordering = ["nombre"]
 
 
-class CategoriaViewSet(viewsets.ModelViewSet):
+class CategoriaViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     permission_classes = [permissions.AllowAny]
     queryset = Categoria.objects.filter(activo=True)
     serializer_class = CategoriaSerializer
@@ -0,0 +1,12 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import CuentaPorPagar, Proveedor
+
+
+@receiver(post_save, sender=CuentaPorPagar)
+@receiver(post_delete, sender=CuentaPorPagar)
+def tocar_proveedor_de_la_cuenta(sender, instance, **kwargs):
+    """El listado de proveedores muestra deuda y cuentas pendientes: cambia su versión"""
+    Proveedor.objects.filter(pk=instance.proveedor_id).update(updated_at=timezone.now())
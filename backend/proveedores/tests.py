@@ -1,3 +1,90 @@
-from django.test import TestCase
+from datetime import date
+from decimal import Decimal
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connections
+from django.test import TestCase, TransactionTestCase
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from authentication.tokens import tokens_para
+from .models import CuentaPorPagar, Proveedor
+
+
+class GetCondicionalProveedoresTests(TestCase):
+    url = '/api/proveedores/proveedores/'
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.force_authenticate(get_user_model().objects.create_user(
+            username='compras', email='compras@example.com', password='secreta123'
+        ))
+        self.proveedor = Proveedor.objects.create(nombre='Tambo El Ceibo')
+
+    def test_cuentas_por_pagar_cambian_la_version(self):
+        etag = self.api.get(self.url)['ETag']
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        cuenta = CuentaPorPagar.objects.create(
+            proveedor=self.proveedor, monto=Decimal('1500'), fecha_vencimiento=date(2026, 11, 30)
+        )
+        respuesta = self.api.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(respuesta.status_code, 200)
+
+        etag = respuesta['ETag']
+        cuenta.delete()
+        self.assertEqual(self.api.get(self.url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+
+class LecturaEnReplicaTests(TransactionTestCase):
+    # En los tests la réplica es un espejo de default: ve lo confirmado
+    databases = {'default', 'replica'}
+    url = '/api/proveedores/proveedores/estadisticas/'
+
+    def setUp(self):
+        cache.clear()
+        # Autenticado como el front: con el token en el header, sin cookies
+        self.api = self.cliente_con_token('reportes')
+        proveedor = Proveedor.objects.create(nombre='Cooperativa Norte')
+        CuentaPorPagar.objects.create(proveedor=proveedor, monto=Decimal('800'), fecha_vencimiento=date(2026, 12, 1))
+
+    def cliente_con_token(self, username):
+        user = get_user_model().objects.create_user(
+            username=username, email=f'{username}@example.com', password='secreta123'
+        )
+        api = APIClient()
+        api.credentials(HTTP_AUTHORIZATION=f'Bearer {tokens_para(user).access_token}')
+        return api
+
+    def get(self, url=None, api=None):
+        with CaptureQueriesContext(connections['default']) as principal, \
+                CaptureQueriesContext(connections['replica']) as replica:
+            respuesta = (api or self.api).get(url or self.url)
+        self.assertEqual(respuesta.status_code, 200)
+        # Qué bases se consultaron
+        return respuesta.json(), bool(principal), bool(replica)
+
+    def test_reportes_en_replica_salvo_despues_de_escribir(self):
+        datos, principal, replica = self.get()
+        self.assertEqual((principal, replica), (False, True))
+        self.assertEqual(datos['total_proveedores'], 1)
+
+        resumen, principal, replica = self.get('/api/proveedores/cuentas-por-pagar/resumen_por_proveedor/')
+        self.assertEqual((principal, replica), (False, True))
+        self.assertEqual(resumen[0]['cuentas_pendientes'], 1)
+
+        # Después de escribir, el usuario lee de la principal hasta que venza la fijación
+        self.assertEqual(self.api.post('/api/proveedores/proveedores/', {'nombre': 'Tambo Sur'}).status_code, 201)
+        datos, principal, replica = self.get()
+        self.assertEqual((principal, replica), (True, False))
+        self.assertEqual(datos['total_proveedores'], 2)
+
+        # La fijación es por usuario del token, no por sesión ni cookie
+        self.assertFalse(self.api.cookies)
+        self.assertEqual(self.get(api=self.cliente_con_token('otro'))[1:], (False, True))
+        # Al vencer la fijación vuelve a la réplica
+        cache.clear()
+        self.assertEqual(self.get()[1:], (False, True))
+        # Las vistas sin marcar siguen en la principal
+        self.assertFalse(self.get('/api/proveedores/proveedores/')[2])
@@ -7,12 +7,16 @@ from django.db.models import Sum, Count, Q, Min
 from datetime import datetime, timedelta
 from django.utils import timezone
 
+from core.condicional import GetCondicionalMixin
+from core.replica import lectura_en_replica
+
 from .models import Proveedor, CuentaPorPagar
 from .serializers import ProveedorSerializer, ProveedorListSerializer, CuentaPorPagarSerializer
 
 
-class ProveedorViewSet(viewsets.ModelViewSet):
+class ProveedorViewSet(GetCondicionalMixin, viewsets.ModelViewSet):
     queryset = Proveedor.objects.all()
+    campo_version = "updated_at"
     serializer_class = ProveedorSerializer
     permission_classes = [IsAuthenticated]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
@@ -34,6 +38,7 @@ class ProveedorViewSet(viewsets.ModelViewSet):
         return queryset
     
     @action(detail=False, methods=['get'])
+    @lectura_en_replica
     def estadisticas(self, request):
         """Estadísticas generales de proveedores"""
         queryset = self.get_queryset()
@@ -173,6 +178,7 @@ class CuentaPorPagarViewSet(viewsets.ModelViewSet):
         return Response(serializer.data)
     
     @action(detail=False, methods=['get'])
+    @lectura_en_replica
     def resumen_por_proveedor(self, request):
         """Resumen de cuentas por pagar agrupadas por proveedor"""
         queryset = self.filter_queryset(self.get_queryset())
@@ -186,4 +192,5 @@ class CuentaPorPagarViewSet(viewsets.ModelViewSet):
             proxima_fecha=Min('fecha_vencimiento')
         ).order_by('proxima_fecha')
         
-        return Response(resumen)
\ No newline at end of file
+        # Se evalúa acá y no al renderizar, para que lea de la réplica
+        return Response(list(resumen))
\ No newline at end of file
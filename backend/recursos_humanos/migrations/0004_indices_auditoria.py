@@ -0,0 +1,31 @@
+# Generated by Django 5.0.14 on 2026-10-17 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recursos_humanos', '0003_equipo_lider'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='auditoriaempleado',
+            index=models.Index(fields=['-fecha', '-id'], name='audemp_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriaempleado',
+            index=models.Index(fields=['empleado', '-fecha'], name='audemp_empleado_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriaequipo',
+            index=models.Index(fields=['-fecha', '-id'], name='audeq_fecha_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='auditoriaequipo',
+            index=models.Index(fields=['equipo', '-fecha'], name='audeq_equipo_fecha_idx'),
+        ),
+    ]
@@ -125,6 +125,10 @@ class AuditoriaEquipo(models.Model):
     
     class Meta:
         ordering = ["-fecha"]
+        indexes = [
+            models.Index(fields=["-fecha", "-id"], name="audeq_fecha_id_idx"),
+            models.Index(fields=["equipo", "-fecha"], name="audeq_equipo_fecha_idx"),
+        ]
         verbose_name = "Auditoría de Equipo"
         verbose_name_plural = "Auditorías de Equipos"
 
@@ -154,6 +158,10 @@ class AuditoriaEmpleado(models.Model):
     
     class Meta:
         ordering = ["-fecha"]
+        indexes = [
+            models.Index(fields=["-fecha", "-id"], name="audemp_fecha_id_idx"),
+            models.Index(fields=["empleado", "-fecha"], name="audemp_empleado_fecha_idx"),
+        ]
         verbose_name = "Auditoría de Empleado"
         verbose_name_plural = "Auditorías de Empleados"
 
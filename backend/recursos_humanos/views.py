@@ -4,6 +4,8 @@ from rest_framework.decorators import action
 from rest_framework.response import Response
 from django.db import transaction
 
+from core.paginacion import PaginacionCursor
+
 from .models import Empleado, PagoEmpleado, Equipo, Rol, AuditoriaEquipo, AuditoriaEmpleado
 from .serializers import (
     EmpleadoSerializer, PagoEmpleadoSerializer, EquipoSerializer, 
@@ -308,7 +310,8 @@ class AuditoriaEquipoViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ["equipo", "accion", "usuario"]
     search_fields = ["equipo__nombre", "usuario__username", "comentario"]
     ordering_fields = ["fecha"]
-    ordering = ["-fecha"]
+    ordering = ["-fecha", "-id"]
+    pagination_class = PaginacionCursor
 
 
 class AuditoriaEmpleadoViewSet(viewsets.ReadOnlyModelViewSet):
@@ -318,4 +321,5 @@ class AuditoriaEmpleadoViewSet(viewsets.ReadOnlyModelViewSet):
     filterset_fields = ["empleado", "accion", "usuario"]
     search_fields = ["empleado__nombre", "empleado__apellido", "usuario__username", "comentario"]
     ordering_fields = ["fecha"]
-    ordering = ["-fecha"]
\ No newline at end of file
+    ordering = ["-fecha", "-id"]
+    pagination_class = PaginacionCursor
\ No newline at end of file
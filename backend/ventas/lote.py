@@ -0,0 +1,170 @@
+"""
+Alta masiva de ventas (``VentaViewSet.lote``) para las rendiciones de fin de
+recorrido: los vendedores cargan las ventas sin conexión y las suben juntas.
+
+Cada venta trae una ``clave`` generada en el dispositivo que se guarda en
+``Venta.clave_idempotencia``, así reenviar un lote (por un corte a mitad de
+la subida) no duplica nada: las ventas ya registradas se informan como
+``duplicada`` con el id original.
+
+La validación de cada venta no toca la base; clientes, productos y claves se
+verifican con una consulta cada uno para todo el lote, y ventas, líneas y
+movimientos se insertan con ``bulk_create``. Como ``bulk_create`` no pasa por
+``save``, la cuenta corriente y la imputación de pagos se ajustan con
+``aplicar_diferencias`` (consultas por bloque de clientes) y el flujo diario
+una vez por fecha.
+"""
+
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from rest_framework import serializers
+
+from clientes.models import Cliente
+from clientes.saldos import aplicar_diferencias
+from finanzas_reportes.flujo import registrar_movimientos
+from finanzas_reportes.models import MovimientoFinanciero
+from productos.models import Producto
+from .models import LineaVenta, Venta
+from .serializers import VentaLoteSerializer
+
+TAMANO_INSERCION = 500
+
+
+def _resultado(clave, estado, venta_id=None, errores=None):
+    resultado = {"clave": clave, "estado": estado, "venta": venta_id}
+    if errores:
+        resultado["errores"] = errores
+    return resultado
+
+
+def validar_items(items):
+    """
+    Valida la forma de cada ítem con un único ``VentaLoteSerializer``.
+    Devuelve ``(validas, errores)``: ``validas`` es una lista de
+    ``(indice, datos)`` y ``errores`` un dict ``{indice: resultado}``.
+    """
+    serializer = VentaLoteSerializer()
+    validas, errores = [], {}
+    for indice, item in enumerate(items):
+        try:
+            validas.append((indice, serializer.run_validation(item)))
+        except serializers.ValidationError as exc:
+            clave = item.get("clave") if isinstance(item, dict) else None
+            errores[indice] = _resultado(clave, "error", errores=serializers.as_serializer_error(exc))
+    return validas, errores
+
+
+def _guardar(validas):
+    """Verifica contra la base y registra las ventas válidas; devuelve ``{indice: resultado}``"""
+    resultados = {}
+    clientes = dict(
+        Cliente.objects.filter(pk__in={datos["cliente"] for _, datos in validas})
+        .order_by().values_list("pk", "nombre")
+    )
+    productos = {
+        linea["producto"] for _, datos in validas for linea in datos["lineas"] if linea.get("producto") is not None
+    }
+    productos_existentes = set(Producto.objects.filter(pk__in=productos).order_by().values_list("pk", flat=True))
+    registradas = dict(
+        Venta.objects.filter(clave_idempotencia__in={datos["clave"] for _, datos in validas})
+        .order_by().values_list("clave_idempotencia", "pk")
+    )
+
+    nuevas = []  # (indice, venta, lineas)
+    repetidas = []  # (indice, clave) repetidas dentro del mismo lote
+    claves_del_lote = set()
+    for indice, datos in validas:
+        clave = datos["clave"]
+        if clave in registradas:
+            resultados[indice] = _resultado(clave, "duplicada", registradas[clave])
+            continue
+        if clave in claves_del_lote:
+            repetidas.append((indice, clave))
+            continue
+
+        errores = {}
+        if datos["cliente"] not in clientes:
+            errores["cliente"] = [f"Cliente inexistente: {datos['cliente']}"]
+        faltantes = sorted(
+            {linea["producto"] for linea in datos["lineas"] if linea.get("producto") is not None}
+            - productos_existentes
+        )
+        if faltantes:
+            errores["lineas"] = [f"Productos inexistentes: {', '.join(map(str, faltantes))}"]
+        if errores:
+            resultados[indice] = _resultado(clave, "error", errores=errores)
+            continue
+
+        claves_del_lote.add(clave)
+        lineas = [
+            LineaVenta(
+                descripcion=linea["descripcion"],
+                producto_id=linea.get("producto"),
+                cantidad=linea["cantidad"],
+                precio_unitario=linea["precio_unitario"],
+            )
+            for linea in datos["lineas"]
+        ]
+        total = sum((linea.subtotal for linea in lineas), Decimal("0")).quantize(Decimal("0.01"))
+        venta = Venta(
+            cliente_id=datos["cliente"], numero=datos["numero"], total=total, clave_idempotencia=clave
+        )
+        if datos.get("fecha"):
+            venta.fecha = datos["fecha"]
+        nuevas.append((indice, venta, lineas))
+
+    Venta.objects.bulk_create([venta for _, venta, _ in nuevas], batch_size=TAMANO_INSERCION)
+    lineas = []
+    movimientos = []
+    por_cliente = defaultdict(lambda: [0, Decimal("0")])
+    desde = {}
+    for indice, venta, lineas_venta in nuevas:
+        for linea in lineas_venta:
+            linea.venta = venta
+        lineas.extend(lineas_venta)
+        movimientos.append(MovimientoFinanciero(
+            venta=venta,
+            fecha=venta.fecha,
+            tipo=MovimientoFinanciero.Tipo.INGRESO,
+            origen=MovimientoFinanciero.Origen.VENTA,
+            monto=venta.total,
+            descripcion=f"Venta #{venta.numero or venta.id} - {clientes[venta.cliente_id]}",
+        ))
+        por_cliente[venta.cliente_id][0] += 1
+        por_cliente[venta.cliente_id][1] += venta.total
+        desde[venta.cliente_id] = min(desde.get(venta.cliente_id, venta.fecha), venta.fecha)
+        registradas[venta.clave_idempotencia] = venta.id
+        resultados[indice] = _resultado(venta.clave_idempotencia, "creada", venta.id)
+    LineaVenta.objects.bulk_create(lineas, batch_size=TAMANO_INSERCION)
+    MovimientoFinanciero.objects.bulk_create(movimientos, batch_size=TAMANO_INSERCION)
+    registrar_movimientos(movimientos)
+
+    aplicar_diferencias(
+        {cliente_id: (cantidad, total, 0) for cliente_id, (cantidad, total) in por_cliente.items()}, desde
+    )
+
+    for indice, clave in repetidas:
+        resultados[indice] = _resultado(clave, "duplicada", registradas[clave])
+    return resultados
+
+
+def registrar_lote(items):
+    """
+    Registra las ventas de ``items`` (datos sin validar) y devuelve un
+    resultado por ítem en el mismo orden, con ``estado`` ``creada``,
+    ``duplicada`` o ``error``. Las ventas con error no frenan al resto.
+    """
+    validas, resultados = validar_items(items)
+    for intento in range(2):
+        try:
+            with transaction.atomic():
+                resultados.update(_guardar(validas))
+            break
+        except IntegrityError:
+            # Otra subida del mismo lote registró alguna clave mientras tanto:
+            # al repetir, esas ventas aparecen como duplicadas
+            if intento:
+                raise
+    return [resultados[indice] for indice in range(len(items))]
@@ -0,0 +1,20 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('productos', '0005_producto_entradas_acumuladas'),
+        ('ventas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lineaventa',
+            name='producto',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='lineas_venta', to='productos.producto'),
+        ),
+    ]
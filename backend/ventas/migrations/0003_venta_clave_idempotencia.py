@@ -0,0 +1,24 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:22
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('ventas', '0002_lineaventa_producto'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='venta',
+            name='clave_idempotencia',
+            field=models.CharField(blank=True, help_text='Clave generada por el dispositivo; evita duplicar ventas al reenviar un lote', max_length=64, null=True, unique=True),
+        ),
+        migrations.AlterField(
+            model_name='venta',
+            name='fecha',
+            field=models.DateField(default=django.utils.timezone.localdate),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.0.14 on 2026-10-17 21:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0010_recomendaciones'),
+        ('ventas', '0003_venta_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='venta',
+            index=models.Index(fields=['cliente', 'fecha', 'id'], name='venta_cliente_fecha_idx'),
+        ),
+    ]
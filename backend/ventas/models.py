@@ -1,21 +1,48 @@
-from django.db import models
+from django.db import models, transaction
+from django.utils import timezone
 from clientes.models import Cliente
+from clientes.saldos import registrar_venta
 
 class Venta(models.Model):
     cliente = models.ForeignKey(Cliente, on_delete=models.PROTECT, related_name="ventas")
-    fecha = models.DateField(auto_now_add=True)
+    # Editable para las ventas cargadas sin conexión que se suben después (ver ventas.lote)
+    fecha = models.DateField(default=timezone.localdate)
     numero = models.CharField(max_length=20, blank=True)  # ej. Nro factura
     total = models.DecimalField(max_digits=12, decimal_places=2, default=0)
+    clave_idempotencia = models.CharField(
+        max_length=64, unique=True, null=True, blank=True,
+        help_text="Clave generada por el dispositivo; evita duplicar ventas al reenviar un lote",
+    )
 
     class Meta:
         ordering = ["-fecha", "-id"]
+        # Recorrido de las ventas más nuevas de un cliente al imputar pagos
+        indexes = [models.Index(fields=["cliente", "fecha", "id"], name="venta_cliente_fecha_idx")]
 
     def __str__(self):
         return f"Venta #{self.numero or self.id} - {self.cliente.nombre}"
 
+    def save(self, *args, **kwargs):
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and not {"cliente", "cliente_id", "total", "fecha"}.intersection(update_fields):
+            return super().save(*args, **kwargs)
+
+        with transaction.atomic():
+            anterior = None
+            if not self._state.adding:
+                anterior = Venta.objects.select_for_update().filter(pk=self.pk).values_list(
+                    "cliente_id", "total", "fecha"
+                ).first()
+            super().save(*args, **kwargs)
+            # El saldo del cliente se ajusta en la misma transacción que la venta
+            registrar_venta(self, anterior)
+
 class LineaVenta(models.Model):
     venta = models.ForeignKey(Venta, on_delete=models.CASCADE, related_name="lineas")
-    descripcion = models.CharField(max_length=200)     # si más adelante tienen Producto, acá va FK
+    descripcion = models.CharField(max_length=200)
+    producto = models.ForeignKey(
+        "productos.Producto", on_delete=models.SET_NULL, null=True, blank=True, related_name="lineas_venta"
+    )
     cantidad = models.DecimalField(max_digits=10, decimal_places=2, default=1)
     precio_unitario = models.DecimalField(max_digits=12, decimal_places=2, default=0)
 
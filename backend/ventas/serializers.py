@@ -1,19 +1,25 @@
 ﻿from decimal import Decimal
 
+from django.db import transaction
 from django.utils import timezone
 from rest_framework import serializers
 
 from clientes.models import Cliente
 from finanzas_reportes.models import MovimientoFinanciero, PagoCliente
+from productos.models import Producto
 from .models import LineaVenta, Venta
 
 
 class LineaVentaSerializer(serializers.ModelSerializer):
+    # Escribible para que las ediciones identifiquen las líneas existentes
+    id = serializers.IntegerField(required=False)
+    # Los productos se validan juntos en VentaSerializer.validate_lineas (una consulta)
+    producto = serializers.IntegerField(source="producto_id", required=False, allow_null=True)
     subtotal = serializers.DecimalField(max_digits=12, decimal_places=2, read_only=True)
 
     class Meta:
         model = LineaVenta
-        fields = ("id", "descripcion", "cantidad", "precio_unitario", "subtotal")
+        fields = ("id", "descripcion", "producto", "cantidad", "precio_unitario", "subtotal")
 
 
 class VentaSerializer(serializers.ModelSerializer):
@@ -24,43 +30,94 @@ class VentaSerializer(serializers.ModelSerializer):
         model = Venta
         fields = ("id", "fecha", "numero", "cliente", "cliente_nombre", "total", "lineas")
 
-    def _sync_movimiento(self, venta: Venta) -> None:
-        MovimientoFinanciero.objects.update_or_create(
-            venta=venta,
-            defaults={
-                "fecha": venta.fecha,
-                "tipo": MovimientoFinanciero.Tipo.INGRESO,
-                "origen": MovimientoFinanciero.Origen.VENTA,
-                "monto": venta.total,
-                "descripcion": f"Venta #{venta.numero or venta.id} - {venta.cliente.nombre}",
-            },
-        )
-
-    def create(self, validated_data):
-        lineas_data = validated_data.pop("lineas", [])
-        venta = Venta.objects.create(**validated_data)
+    def validate_lineas(self, lineas):
+        productos = {linea["producto_id"] for linea in lineas if linea.get("producto_id") is not None}
+        existentes = set(Producto.objects.filter(pk__in=productos).order_by().values_list("pk", flat=True))
+        if productos - existentes:
+            raise serializers.ValidationError(
+                f"Productos inexistentes: {', '.join(map(str, sorted(productos - existentes)))}"
+            )
+        ids = [linea["id"] for linea in lineas if "id" in linea]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Hay líneas repetidas")
+        return lineas
+
+    def _sync_movimiento(self, venta: Venta, movimiento=None) -> None:
+        datos = {
+            "fecha": venta.fecha,
+            "tipo": MovimientoFinanciero.Tipo.INGRESO,
+            "origen": MovimientoFinanciero.Origen.VENTA,
+            "monto": venta.total,
+            "descripcion": f"Venta #{venta.numero or venta.id} - {venta.cliente.nombre}",
+        }
+        # Con save para que el flujo diario (finanzas_reportes.flujo) siga al movimiento
+        movimiento = movimiento or MovimientoFinanciero(venta=venta)
+        for campo, valor in datos.items():
+            setattr(movimiento, campo, valor)
+        movimiento.save()
+
+    def _guardar_lineas(self, venta: Venta, lineas_data) -> Decimal:
+        """
+        Compara las líneas recibidas con las existentes por ``id``: las nuevas
+        van en un ``bulk_create``, las modificadas en un ``bulk_update`` y las
+        que faltan en un único ``delete``. Devuelve el total de la venta.
+        """
+        existentes = {linea.id: linea for linea in venta.lineas.all()}
+        nuevas, modificadas, campos = [], [], set()
         total = Decimal("0")
-        for linea_data in lineas_data:
-            linea = LineaVenta.objects.create(venta=venta, **linea_data)
+        for datos in lineas_data:
+            datos = dict(datos)
+            linea_id = datos.pop("id", None)
+            if linea_id is None:
+                linea = LineaVenta(venta=venta, **datos)
+                nuevas.append(linea)
+            else:
+                linea = existentes.pop(linea_id, None)
+                if linea is None:
+                    raise serializers.ValidationError({"lineas": [f"La línea {linea_id} no pertenece a la venta"]})
+                cambios = [campo for campo, valor in datos.items() if getattr(linea, campo) != valor]
+                if cambios:
+                    for campo in cambios:
+                        setattr(linea, campo, datos[campo])
+                    modificadas.append(linea)
+                    campos.update(cambios)
             total += linea.subtotal
-        venta.total = total
-        venta.save(update_fields=["total"])
-        self._sync_movimiento(venta)
+
+        if existentes:
+            LineaVenta.objects.filter(pk__in=existentes).delete()
+        if modificadas:
+            LineaVenta.objects.bulk_update(modificadas, sorted(campos))
+        LineaVenta.objects.bulk_create(nuevas)
+        return total
+
+    def create(self, validated_data):
+        # El total de un alta sale siempre de las líneas
+        validated_data.pop("total", None)
+        # En un alta todas las líneas son nuevas aunque traigan id
+        lineas_data = [
+            {campo: valor for campo, valor in linea.items() if campo != "id"}
+            for linea in validated_data.pop("lineas", [])
+        ]
+        total = sum(
+            (linea.get("cantidad", Decimal("1")) * linea.get("precio_unitario", Decimal("0")) for linea in lineas_data),
+            Decimal("0"),
+        )
+        with transaction.atomic():
+            venta = Venta.objects.create(**validated_data, total=total)
+            LineaVenta.objects.bulk_create([LineaVenta(venta=venta, **linea) for linea in lineas_data])
+            self._sync_movimiento(venta)
         return venta
 
     def update(self, instance, validated_data):
         lineas_data = validated_data.pop("lineas", None)
-        for attr, value in validated_data.items():
-            setattr(instance, attr, value)
-        if lineas_data is not None:
-            instance.lineas.all().delete()
-            total = Decimal("0")
-            for linea_data in lineas_data:
-                linea = LineaVenta.objects.create(venta=instance, **linea_data)
-                total += linea.subtotal
-            instance.total = total
-        instance.save()
-        self._sync_movimiento(instance)
+        with transaction.atomic():
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if lineas_data is not None:
+                instance.total = self._guardar_lineas(instance, lineas_data)
+            instance.save()
+            # VentaViewSet trae el movimiento con select_related
+            self._sync_movimiento(instance, getattr(instance, "movimiento_financiero", None))
         return instance
 
 
@@ -108,4 +165,30 @@ class RegistroPagoSerializer(serializers.Serializer):
     def create(self, validated_data):
         if not validated_data.get("fecha"):
             validated_data["fecha"] = timezone.now().date()
-        return PagoCliente.objects.create(**validated_data)
\ No newline at end of file
+        return PagoCliente.objects.create(**validated_data)
+
+MAXIMO_LOTE_VENTAS = 5000
+
+
+class LineaLoteSerializer(serializers.Serializer):
+    descripcion = serializers.CharField(max_length=200)
+    producto = serializers.IntegerField(required=False, allow_null=True)
+    cantidad = serializers.DecimalField(max_digits=10, decimal_places=2, default=Decimal("1"))
+    precio_unitario = serializers.DecimalField(max_digits=12, decimal_places=2)
+
+
+class VentaLoteSerializer(serializers.Serializer):
+    """
+    Una venta de un lote. Cliente y productos se validan juntos para todo el
+    lote en ``ventas.lote.registrar_lote``.
+    """
+    clave = serializers.CharField(max_length=64)
+    cliente = serializers.IntegerField()
+    numero = serializers.CharField(max_length=20, required=False, allow_blank=True, default="")
+    fecha = serializers.DateField(required=False)
+    lineas = LineaLoteSerializer(many=True, allow_empty=False)
+
+
+class LoteVentasSerializer(serializers.Serializer):
+    # Cada venta se valida por separado para informar el resultado de cada una
+    ventas = serializers.ListField(allow_empty=False, max_length=MAXIMO_LOTE_VENTAS)
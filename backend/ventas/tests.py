@@ -1,3 +1,222 @@
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from rest_framework.test import APIClient
+
+from clientes.models import Cliente
+from finanzas_reportes.cuentas_por_cobrar import regenerar_pendientes
+from finanzas_reportes.models import ComprobantePendiente, MovimientoFinanciero, PagoCliente
+from productos.models import Producto
+from .models import LineaVenta, Venta
+
+
+class LineasVentaTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='ventas', email='ventas@example.com', password='secreta123'
+        ))
+        self.cliente = Cliente.objects.create(nombre='Almacén Sur', identificacion='70-1')
+        self.producto = Producto.objects.create(nombre='Muzzarella 1kg', sku='MZ-1')
+
+    def crear(self, cantidad_lineas):
+        respuesta = self.client.post('/api/ventas/', {
+            'cliente': self.cliente.pk,
+            'lineas': [
+                {'descripcion': f'Item {i}', 'cantidad': '1', 'precio_unitario': '10', 'producto': self.producto.pk}
+                for i in range(cantidad_lineas)
+            ],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        return respuesta.json()
+
+    def editar(self, venta):
+        """Cambia el precio de la mitad, borra dos líneas y agrega una"""
+        lineas = venta['lineas'][2:]
+        for linea in lineas[::2]:
+            linea['precio_unitario'] = '20'
+        lineas.append({'descripcion': 'Nuevo', 'cantidad': '3', 'precio_unitario': '5'})
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.put(
+                f"/api/ventas/{venta['id']}/", {'cliente': self.cliente.pk, 'lineas': lineas}, format='json'
+            )
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json(), len(consultas)
+
+    def test_alta_con_total_y_movimiento(self):
+        venta = self.crear(3)
+        self.assertEqual(Decimal(venta['total']), Decimal('30'))
+        self.assertEqual(LineaVenta.objects.filter(venta_id=venta['id'], producto=self.producto).count(), 3)
+        self.assertEqual(MovimientoFinanciero.objects.get(venta_id=venta['id']).monto, Decimal('30'))
+
+    def test_alta_ignora_el_total_enviado(self):
+        respuesta = self.client.post('/api/ventas/', {
+            'cliente': self.cliente.pk,
+            'total': '999',
+            'lineas': [{'descripcion': 'Item', 'cantidad': '2', 'precio_unitario': '10'}],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 201, respuesta.content)
+        self.assertEqual(Decimal(respuesta.json()['total']), Decimal('20'))
+
+    def test_edicion_por_diferencias(self):
+        venta = self.crear(6)
+        conservadas = [linea['id'] for linea in venta['lineas'][2:]]
+        editada, _consultas = self.editar(venta)
+
+        # 4 conservadas (2 con precio 20) + 1 nueva de 15
+        self.assertEqual(Decimal(editada['total']), Decimal('75'))
+        self.assertEqual([linea['id'] for linea in editada['lineas'][:4]], conservadas)
+        self.assertEqual(LineaVenta.objects.filter(venta_id=venta['id']).count(), 5)
+        self.assertEqual(MovimientoFinanciero.objects.get(venta_id=venta['id']).monto, Decimal('75'))
+        self.assertEqual(Cliente.objects.get(pk=self.cliente.pk).deuda, Decimal('75'))
+
+    def test_consultas_no_dependen_de_la_cantidad_de_lineas(self):
+        _venta, pocas = self.editar(self.crear(10))
+        _venta, muchas = self.editar(self.crear(100))
+        self.assertEqual(pocas, muchas)
+        # 12 sentencias, 4 de la imputación de pagos (finanzas_reportes.cuentas_por_cobrar),
+        # 2 del flujo diario (bloqueo del movimiento y FlujoDiario) y los SAVEPOINT/RELEASE
+        # de las transacciones anidadas
+        self.assertLessEqual(muchas, 24)
+
+    def test_linea_de_otra_venta_no_se_modifica(self):
+        otra = self.crear(1)
+        venta = self.crear(1)
+        respuesta = self.client.put(f"/api/ventas/{venta['id']}/", {
+            'cliente': self.cliente.pk,
+            'lineas': [{'id': otra['lineas'][0]['id'], 'descripcion': 'X', 'cantidad': '1', 'precio_unitario': '99'}],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertEqual(LineaVenta.objects.get(pk=otra['lineas'][0]['id']).precio_unitario, Decimal('10'))
+        self.assertEqual(Venta.objects.get(pk=venta['id']).total, Decimal('10'))
+
+    def test_producto_inexistente(self):
+        respuesta = self.client.post('/api/ventas/', {
+            'cliente': self.cliente.pk,
+            'lineas': [{'descripcion': 'X', 'cantidad': '1', 'precio_unitario': '1', 'producto': 999}],
+        }, format='json')
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn('999', str(respuesta.json()['lineas']))
+
+
+class LoteVentasTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(get_user_model().objects.create_user(
+            username='reparto', email='reparto@example.com', password='secreta123'
+        ))
+        self.clientes = [
+            Cliente.objects.create(nombre=f'Kiosco {i}', identificacion=f'80-{i}') for i in range(3)
+        ]
+        self.producto = Producto.objects.create(nombre='Ricota 500g', sku='RI-1')
+
+    def venta(self, clave, cliente, precio='10', **extra):
+        return {
+            'clave': clave,
+            'cliente': cliente.pk,
+            'lineas': [
+                {'descripcion': 'Ricota', 'producto': self.producto.pk, 'cantidad': '2', 'precio_unitario': precio},
+                {'descripcion': 'Flete', 'precio_unitario': '1.50'},
+            ],
+            **extra,
+        }
+
+    def subir(self, ventas):
+        with CaptureQueriesContext(connection) as consultas:
+            respuesta = self.client.post('/api/ventas/lote/', {'ventas': ventas}, format='json')
+        self.assertEqual(respuesta.status_code, 200, respuesta.content)
+        return respuesta.json(), [consulta['sql'] for consulta in consultas.captured_queries]
+
+    def test_alta_masiva_con_saldos_y_movimientos(self):
+        ventas = [self.venta(f'r1-{i}', self.clientes[i % 3], fecha='2026-10-01') for i in range(9)]
+        data, _consultas = self.subir(ventas)
+
+        self.assertEqual((data['creadas'], data['duplicadas'], data['con_error']), (9, 0, 0))
+        ids = [resultado['venta'] for resultado in data['resultados']]
+        self.assertEqual([resultado['clave'] for resultado in data['resultados']], [v['clave'] for v in ventas])
+        self.assertEqual(LineaVenta.objects.filter(venta_id__in=ids).count(), 18)
+        venta = Venta.objects.get(clave_idempotencia='r1-0')
+        self.assertEqual(venta.total, Decimal('21.50'))
+        self.assertEqual(str(venta.fecha), '2026-10-01')
+        self.assertEqual(MovimientoFinanciero.objects.get(venta=venta).monto, Decimal('21.50'))
+        cliente = Cliente.objects.get(pk=self.clientes[0].pk)
+        self.assertEqual(cliente.deuda, Decimal('64.50'))
+        self.assertEqual(cliente.cuenta.cantidad_ventas, 3)
+
+    def test_reenvio_no_duplica(self):
+        ventas = [self.venta(f'r2-{i}', self.clientes[0]) for i in range(3)]
+        primera, _consultas = self.subir(ventas)
+        segunda, _consultas = self.subir(ventas + [self.venta('r2-3', self.clientes[0])])
+
+        self.assertEqual((segunda['creadas'], segunda['duplicadas']), (1, 3))
+        self.assertEqual(
+            [resultado['venta'] for resultado in segunda['resultados'][:3]],
+            [resultado['venta'] for resultado in primera['resultados']],
+        )
+        self.assertEqual(Venta.objects.count(), 4)
+        self.assertEqual(Cliente.objects.get(pk=self.clientes[0].pk).deuda, Decimal('86.00'))
+
+    def test_errores_por_venta(self):
+        data, _consultas = self.subir([
+            self.venta('r3-0', self.clientes[0]),
+            self.venta('r3-1', self.clientes[0], precio='abc'),
+            {'clave': 'r3-2', 'cliente': 999, 'lineas': [{'descripcion': 'X', 'precio_unitario': '1'}]},
+            {'clave': 'r3-3', 'cliente': self.clientes[1].pk,
+             'lineas': [{'descripcion': 'X', 'precio_unitario': '1', 'producto': 999}]},
+            self.venta('r3-0', self.clientes[1]),
+            'no es una venta',
+        ])
+
+        estados = [resultado['estado'] for resultado in data['resultados']]
+        self.assertEqual(estados, ['creada', 'error', 'error', 'error', 'duplicada', 'error'])
+        self.assertIn('lineas', data['resultados'][1]['errores'])
+        self.assertIn('cliente', data['resultados'][2]['errores'])
+        self.assertIn('999', str(data['resultados'][3]['errores']['lineas']))
+        self.assertEqual(data['resultados'][4]['venta'], data['resultados'][0]['venta'])
+        self.assertEqual(Venta.objects.count(), 1)
+
+    def test_consultas_no_dependen_del_tamano_del_lote(self):
+        self.subir([self.venta(f'r4-{i}', cliente) for i, cliente in enumerate(self.clientes)])
+        _data, pocas = self.subir([self.venta(f'r5-{i}', self.clientes[i % 3]) for i in range(6)])
+        _data, muchas = self.subir([self.venta(f'r6-{i}', self.clientes[i % 3]) for i in range(600)])
+
+        def sin_inserts(consultas):
+            return [sql for sql in consultas if not sql.startswith('INSERT')]
+
+        self.assertEqual(len(sin_inserts(pocas)), len(sin_inserts(muchas)))
+        # Los INSERT (ventas, líneas, movimientos y comprobantes pendientes) van
+        # por tandas, en SQLite limitadas a 999 parámetros
+        self.assertLess(len(muchas) - len(sin_inserts(muchas)), 30)
+
+    def test_consultas_no_dependen_de_la_cantidad_de_clientes(self):
+        muchos = self.clientes + [
+            Cliente.objects.create(nombre=f'Almacén {i}', identificacion=f'81-{i}') for i in range(60)
+        ]
+        # La primera venta del día crea la fila del flujo diario
+        self.subir([self.venta('r7-0', self.clientes[0])])
+        _data, pocas = self.subir([self.venta(f'r7-{i}', cliente) for i, cliente in enumerate(self.clientes, 1)])
+        _data, muchas = self.subir([self.venta(f'r8-{i}', cliente) for i, cliente in enumerate(muchos)])
+
+        def sin_inserts(consultas):
+            return [sql for sql in consultas if not sql.startswith('INSERT')]
+
+        self.assertEqual(len(sin_inserts(pocas)), len(sin_inserts(muchas)))
+        self.assertEqual(Cliente.objects.get(pk=muchos[-1].pk).deuda, Decimal('21.50'))
+
+    def test_venta_atrasada_se_imputa_como_el_recalculo_completo(self):
+        cliente = self.clientes[0]
+        self.subir([self.venta(f'r9-{i}', cliente, fecha=f'2026-10-0{i + 2}') for i in range(4)])
+        PagoCliente.objects.create(cliente=cliente, monto=Decimal('50'))
+        # Más vieja que el pendiente abierto más viejo
+        self.subir([self.venta('r9-9', cliente, fecha='2026-09-15')])
+
+        pendientes = list(ComprobantePendiente.objects.filter(cliente=cliente).values_list('venta_id', 'saldo'))
+        self.assertEqual(sum(saldo for _venta, saldo in pendientes), Decimal('57.50'))
+        self.assertEqual(regenerar_pendientes()[1], 0)
 
-# Create your tests here.
+    def test_lote_vacio(self):
+        respuesta = self.client.post('/api/ventas/lote/', {'ventas': []}, format='json')
+        self.assertEqual(respuesta.status_code, 400)
@@ -1,10 +1,14 @@
+from collections import Counter
+
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 
 from finanzas_reportes.serializers import PagoClienteSerializer
+from .lote import registrar_lote
 from .models import Venta
 from .serializers import (
+    LoteVentasSerializer,
     RegistroPagoSerializer,
     VentaRapidaSerializer,
     VentaSerializer,
@@ -12,7 +16,7 @@ from .serializers import (
 
 
 class VentaViewSet(viewsets.ModelViewSet):
-    queryset = Venta.objects.select_related("cliente").prefetch_related("lineas").all()
+    queryset = Venta.objects.select_related("cliente", "movimiento_financiero").prefetch_related("lineas").all()
     serializer_class = VentaSerializer
 
     @action(detail=False, methods=["post"], url_path="agregar-simple")
@@ -29,4 +33,23 @@ class VentaViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
         pago = serializer.save()
         data = PagoClienteSerializer(pago, context={"request": request}).data
-        return Response(data, status=status.HTTP_201_CREATED)
\ No newline at end of file
+        return Response(data, status=status.HTTP_201_CREATED)
+
+    @action(detail=False, methods=["post"], url_path="lote")
+    def lote(self, request):
+        """
+        Registra de una vez las ventas de un recorrido. Cada venta lleva una
+        ``clave`` única generada en el dispositivo, así el lote se puede
+        reenviar sin duplicar ventas. Responde el resultado de cada una.
+        """
+        serializer = LoteVentasSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        resultados = registrar_lote(serializer.validated_data["ventas"])
+        estados = Counter(resultado["estado"] for resultado in resultados)
+        data = {
+            "creadas": estados["creada"],
+            "duplicadas": estados["duplicada"],
+            "con_error": estados["error"],
+            "resultados": resultados,
+        }
+        return Response(data, status=status.HTTP_200_OK)
@@ -28,6 +28,7 @@ export function ClienteFormDialog({
   const [formData, setFormData] = useState<Partial<Cliente>>({
     nombre: "",
     identificacion: "",
+    sucursal: "",
     telefono: "",
     correo: "",
     direccion: "",
@@ -44,6 +45,7 @@ export function ClienteFormDialog({
       setFormData({
         nombre: cliente.nombre || "",
         identificacion: cliente.identificacion || "",
+        sucursal: cliente.sucursal || "",
         telefono: cliente.telefono || "",
         correo: cliente.correo || "",
         direccion: cliente.direccion || "",
@@ -59,6 +61,7 @@ export function ClienteFormDialog({
       setFormData({
         nombre: "",
         identificacion: "",
+        sucursal: "",
         telefono: "",
         correo: "",
         direccion: "",
@@ -111,7 +114,7 @@ export function ClienteFormDialog({
             {cliente ? "Editar Cliente" : "Nuevo Cliente"}
           </DialogTitle>
           <DialogDescription>
-            {cliente ? "Modifica los datos del cliente existente." : "Completa la información para crear un nuevo cliente. Puedes crear múltiples sucursales con el mismo CUIT usando nombres diferentes."}
+            {cliente ? "Modifica los datos del cliente existente." : "Completa la información para crear un nuevo cliente. Puedes crear múltiples sucursales con el mismo CUIT indicando una sucursal distinta."}
           </DialogDescription>
         </DialogHeader>
 
@@ -139,6 +142,16 @@ export function ClienteFormDialog({
                 required
               />
             </div>
+
+            <div className="space-y-2">
+              <Label htmlFor="sucursal">Sucursal</Label>
+              <Input
+                id="sucursal"
+                value={formData.sucursal}
+                onChange={(e) => handleInputChange("sucursal", e.target.value)}
+                placeholder="Ej: Norte (obligatoria si el CUIT ya existe)"
+              />
+            </div>
           </div>
 
           {/* Información de contacto */}
@@ -229,8 +229,20 @@ export function ClientesPage() {
   // Funciones de importación y exportación
   const handleImport = async (file: File) => {
     try {
-      const result = await clientesService.importar(file)
-      toast.success(`Importación completada: ${result.procesados} clientes procesados`)
+      let result = await clientesService.importar(file)
+      toast.info("Importación iniciada, procesando el archivo...")
+      while (result.estado === "pendiente" || result.estado === "procesando") {
+        await new Promise((resolve) => setTimeout(resolve, 2000))
+        result = await clientesService.getImportacion(result.id)
+      }
+      if (result.estado === "fallida") {
+        toast.error(`Error al importar clientes: ${result.mensaje}`)
+        return
+      }
+      toast.success(
+        `Importación completada: ${result.creados} creados, ${result.actualizados} actualizados` +
+        (result.filas_con_error ? `, ${result.filas_con_error} filas con error` : "")
+      )
       await loadClientes()
     } catch (error) {
       console.error("Error al importar:", error)
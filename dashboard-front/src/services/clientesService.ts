@@ -140,12 +140,12 @@ class ClientesService {
     return response.blob();
   }
 
-  // Importar clientes
-  async import(file: File): Promise<ImportResult> {
+  // Importar clientes (se procesa en segundo plano; seguir el avance con getImportacion)
+  async importar(file: File): Promise<ImportResult> {
     const formData = new FormData();
     formData.append('file', file);
 
-    const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}import/`, {
+    const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}importar/`, {
       method: 'POST',
       body: formData,
     });
@@ -157,6 +157,19 @@ class ClientesService {
     return response.json();
   }
 
+  // Estado y avance de una importación
+  async getImportacion(importacionId: number): Promise<ImportResult> {
+    const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}importaciones/${importacionId}/`, {
+      method: 'GET',
+    });
+
+    if (!response.ok) {
+      throw new Error(`Error al obtener la importación: ${response.statusText}`);
+    }
+
+    return response.json();
+  }
+
   // Obtener estado de cuenta
   async getEstadoCuenta(clienteId: number): Promise<EstadoCuenta> {
     const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}${clienteId}/estado-cuenta/`, {
@@ -255,7 +268,7 @@ class ClientesService {
     return response.json();
   }
 
-  // Obtener vista tree (agrupada por inicial)
+  // Obtener vista tree: letras iniciales con la cantidad de clientes de cada una
   async getTree() {
     const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}tree/`, {
       method: 'GET',
@@ -268,6 +281,20 @@ class ClientesService {
     return response.json();
   }
 
+  // Obtener los clientes de una letra del tree (paginados por cursor: usar `next` de la respuesta)
+  async getTreeClientes(letra: string, cursorUrl?: string) {
+    const url = cursorUrl ?? `${this.baseUrl}tree/${encodeURIComponent(letra)}/`;
+    const response = await authService.makeAuthenticatedRequest(url, {
+      method: 'GET',
+    });
+
+    if (!response.ok) {
+      throw new Error(`Error al obtener clientes de la letra ${letra}: ${response.statusText}`);
+    }
+
+    return response.json();
+  }
+
   // Obtener perfil completo del cliente
   async getPerfil(clienteId: number) {
     const response = await authService.makeAuthenticatedRequest(`${this.baseUrl}${clienteId}/perfil/`, {
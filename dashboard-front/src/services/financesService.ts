@@ -37,10 +37,39 @@ export interface GastoManual {
   origen?: 'MANUAL' | 'COMPRA' | 'VENTA' | 'PAGO_EMPLEADO';
 }
 
+export interface AntiguedadDeuda {
+  dias_0_30: string;
+  dias_31_60: string;
+  dias_61_90: string;
+  mas_de_90: string;
+}
+
 export interface ResumenFinanciero {
   total_ventas: string;
   total_pagos: string;
   pendiente_cobro: string;
+  saldo_a_favor: string;
+  antiguedad: AntiguedadDeuda;
+}
+
+export interface PuntoFlujo {
+  periodo: string;
+  movimientos: number;
+  ingresos: string;
+  egresos: string;
+  neto: string;
+  saldo: string;
+}
+
+export interface FlujoFondos {
+  agrupacion: 'dia' | 'semana' | 'mes';
+  desde: string;
+  hasta: string;
+  saldo_inicial: string;
+  ingresos: string;
+  egresos: string;
+  saldo_final: string;
+  serie: PuntoFlujo[];
 }
 
 export interface EstadisticasFinancieras {
@@ -220,6 +249,22 @@ export const financesService = {
     return response.json();
   },
 
+  async getFlujo(params: { agrupacion?: 'dia' | 'semana' | 'mes'; desde?: string; hasta?: string; origen?: string } = {}): Promise<FlujoFondos> {
+    const query = new URLSearchParams(
+      Object.entries(params).filter(([, valor]) => valor) as [string, string][]
+    ).toString();
+    const url = `${API_BASE}/flujo/${query ? `?${query}` : ''}`;
+    const response = await fetch(url, {
+      headers: getAuthHeaders()
+    });
+
+    if (!response.ok) {
+      throw new Error(`Error al obtener flujo de fondos: ${response.statusText}`);
+    }
+
+    return response.json();
+  },
+
   // ESTADÍSTICAS CONSOLIDADAS
   async getEstadisticasFinancieras(): Promise<EstadisticasFinancieras> {
     try {
@@ -14,6 +14,7 @@ export interface Cliente {
   id: number;
   nombre: string;
   identificacion: string; // CUIT/DNI
+  sucursal?: string; // Distingue clientes con el mismo CUIT
   direccion: string;
   telefono: string;
   correo: string;
@@ -99,9 +100,16 @@ export interface ExportOptions {
 }
 
 export interface ImportResult {
-  exitosos: number;
-  errores: number;
-  detalles: string[];
+  id: number;
+  nombre_archivo: string;
+  estado: 'pendiente' | 'procesando' | 'terminada' | 'fallida';
+  progreso: number; // 0 a 100
+  filas_procesadas: number;
+  creados: number;
+  actualizados: number;
+  filas_con_error: number;
+  mensaje: string;
+  reporte_errores: string | null; // URL del CSV con las filas rechazadas
 }
 
 // Tipos para WhatsApp